@@ -0,0 +1,4 @@
+# benchmarks
+
+# Synthetic-workbook benchmarks and golden-file checks for text2dat; run "python -m benchmarks --help"
+# from the FLO2D folder.
@@ -0,0 +1,118 @@
+# __main__.py
+
+# Benchmark suite for text2dat, run from the FLO2D folder:
+#	python -m benchmarks                                         (default size matrix, golden check)
+#	python -m benchmarks --columns 10 300 5000 --rows 100 10000 100000 --output today.json
+#	python -m benchmarks --compare yesterday.json --output today.json
+#	python -m benchmarks --check                                 (golden check only)
+#	python -m benchmarks --update-golden                         (after an intended output change)
+# Results are written as JSON so runs can be compared over time; --compare prints the time ratio
+# of every stage against an earlier results file.
+
+import argparse, json, os, platform, sys, tempfile, time
+
+def compareResults(results, previous):
+	# Prints new/old time ratios for the cases both runs share
+	def key(case):
+		return (case["layout"], case["format"], case["columns"], case["rows"])
+	old = {key(case): case for case in previous.get("cases", [])}
+	print("\n Compared with {}".format(previous.get("created", "previous run")))
+	for case in results["cases"]:
+		before = old.get(key(case))
+		if before is None:
+			continue
+		ratios = []
+		for stage, values in case["stages"].items():
+			if stage in before["stages"] and before["stages"][stage]["seconds"] > 0:
+				ratios.append("{} {:.2f}x".format(stage, values["seconds"] / before["stages"][stage]["seconds"]))
+		print(" {:8} {:5} {:>5} x {:>6}  {}".format(case["layout"], case["format"], case["columns"], case["rows"], "  ".join(ratios)))
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(prog="benchmarks", description="Benchmark text2dat on synthetic HYDROGRAPHS workbooks.")
+	parser.add_argument("--columns", type=int, nargs="+", default=[10, 100], help="inflow columns per workbook (10 to 5000)")
+	parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000], help="time rows per workbook (100 to 100000)")
+	parser.add_argument("--layouts", nargs="+", default=["standard", "denver"], help="layout profiles")
+	parser.add_argument("--formats", nargs="+", default=[".xlsx"], choices=[".xlsx", ".xls"], help="workbook formats")
+	parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+	parser.add_argument("--workdir", default=None, help="keep generated workbooks here and reuse them on later runs")
+	parser.add_argument("--output", default=None, help="write the results JSON here")
+	parser.add_argument("--compare", default=None, help="earlier results JSON to compare with")
+	parser.add_argument("--check", action="store_true", help="only run the golden-file correctness check")
+	parser.add_argument("--update-golden", action="store_true", help="regenerate the golden .dat files from the reference loop")
+	args = parser.parse_args(argv)
+
+	from . import golden
+	if args.update_golden:
+		golden.updateGolden()
+		print(" Golden files rewritten in " + golden.GOLDEN)
+		return 0
+
+	checks = golden.checkGolden()
+	failed = [check for check in checks if not check[2]]
+	print("\n Golden check: {} of {} conversions match".format(len(checks) - len(failed), len(checks)))
+	for case, path, ok in failed:
+		print(" MISMATCH {} ({})".format(case, path))
+	if args.check:
+		return 1 if failed else 0
+
+	import numpy
+	from text2dat import getProfile
+	from . import stages, synthetic
+	results = {
+		"created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+		"python": platform.python_version(),
+		"numpy": numpy.__version__,
+		"platform": platform.platform(),
+		"golden": {"checked": len(checks), "failed": ["{} ({})".format(case, path) for case, path, ok in failed]},
+		"cases": [],
+	}
+
+	temporary = None
+	workdir = args.workdir
+	if workdir is None:
+		temporary = tempfile.TemporaryDirectory()
+		workdir = temporary.name
+	os.makedirs(workdir, exist_ok=True)
+	try:
+		print("\n {:8} {:5} {:>5} x {:>6} {}".format("layout", "file", "cols", "rows", "".join(" {:>9}".format(stage) for stage in stages.STAGES)))
+		for name in args.layouts:
+			profile = getProfile(name)
+			for extension in args.formats:
+				for columns in args.columns:
+					for rows in args.rows:
+						path = os.path.join(workdir, "Synthetic_{}_{}x{}_US{}".format(profile.name, columns, rows, extension))
+						start = time.perf_counter()
+						if not os.path.exists(path):
+							try:
+								synthetic.writeWorkbook(workdir, columns, rows, profile, extension)
+							except ValueError as e:
+								print(" {:8} {:5} {:>5} x {:>6} skipped: {}".format(profile.name, extension, columns, rows, e))
+								continue
+						generate = time.perf_counter() - start
+						measured, outputBytes = stages.measure(path, profile, os.path.join(workdir, "INFLOW_bench.dat"), not args.no_memory)
+						results["cases"].append({
+							"layout": profile.name,
+							"format": extension,
+							"columns": columns,
+							"rows": rows,
+							"workbookBytes": os.path.getsize(path),
+							"outputBytes": outputBytes,
+							"generateSeconds": generate,
+							"stages": measured,
+						})
+						print(" {:8} {:5} {:>5} x {:>6} {}".format(profile.name, extension, columns, rows, "".join(" {:8.3f}s".format(measured[stage]["seconds"]) for stage in stages.STAGES)))
+	finally:
+		if temporary is not None:
+			temporary.cleanup()
+
+	if args.output:
+		with open(args.output, "w") as file:
+			json.dump(results, file, indent=1)
+		print("\n Results written to " + args.output)
+	if args.compare:
+		with open(args.compare) as file:
+			compareResults(results, json.load(file))
+	return 1 if failed else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
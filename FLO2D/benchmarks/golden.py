@@ -0,0 +1,82 @@
+# golden.py
+
+# Correctness checks for the benchmark suite. Small synthetic workbooks are converted through
+# every text2dat path (in-memory and streaming, .xlsx and .xls) and compared byte for byte with
+# the golden .dat files in benchmarks/golden. The golden files come from referenceInflow(), the
+# original cell-by-cell loop of text2dat.py, so performance work cannot silently change output.
+
+import io, os, tempfile
+from . import synthetic
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+# (columns, rows, seed) of the golden workbooks, generated for every layout profile; the denver
+# layout reads a fixed 58 rows, so every case needs at least 55 data rows
+CASES = [(12, 150, 0), (3, 60, 1)]
+
+def referenceInflow(rows, profile):
+	# The original text2dat.py / text2dat_DenverFLO2D.py loop over a list of sheet rows
+	numRow = len(rows)
+	numCol = max(len(row) for row in rows)
+
+	def cell(i, j):
+		return rows[i][j] if j < len(rows[i]) else ''
+
+	for sr in range(0,10):
+		if (cell(sr,0) == 0 and cell(sr,1) == 0) or (cell(sr,0) == "0" and cell(sr,1) == "0"):
+			surfaceRow = sr
+			break
+
+	lines = []
+	rowEnd = numRow if profile.rowLimit is None else profile.rowLimit
+	for j in range (0,numCol):
+		if cell(surfaceRow - 1,j) != '':
+			lines.append('{}	{}	{:.0f}'.format("F",0,float(cell(surfaceRow - 1,j))) + "\n")
+			for i in range (surfaceRow, rowEnd):
+				# Insures empty rows are not read in
+				if cell(i,1) != '':
+					lines.append('{}	{:.2f}	{:.2f}'.format("H",float(cell(i,profile.timeCol)),float(cell(i,j))) + "\n")
+	return "".join(lines)
+
+def goldenPath(profile, columns, rows, seed):
+	return os.path.join(GOLDEN, "INFLOW_{}_{}x{}_{}.dat".format(profile.name, columns, rows, seed))
+
+def syntheticSheet(columns, rows, profile, seed):
+	sheet = []
+	for block in synthetic.syntheticRows(columns, rows, profile, seed):
+		sheet.extend(block)
+	return sheet
+
+def updateGolden():
+	# Rewrites the golden files from the reference loop
+	from text2dat import PROFILES
+	os.makedirs(GOLDEN, exist_ok=True)
+	for profile in PROFILES.values():
+		for columns, rows, seed in CASES:
+			with open(goldenPath(profile, columns, rows, seed), "w", newline="") as file:
+				file.write(referenceInflow(syntheticSheet(columns, rows, profile, seed), profile))
+
+def checkGolden():
+	# Returns a list of (case, path, ok) for every golden case and conversion path
+	from text2dat import PROFILES, writeInflow
+	results = []
+	with tempfile.TemporaryDirectory() as folder:
+		for profile in PROFILES.values():
+			for columns, rows, seed in CASES:
+				with open(goldenPath(profile, columns, rows, seed), newline="") as file:
+					golden = file.read()
+				case = "{} {}x{} seed {}".format(profile.name, columns, rows, seed)
+				results.append((case, "reference", referenceInflow(syntheticSheet(columns, rows, profile, seed), profile) == golden))
+				extensions = [".xlsx"]
+				try:
+					import xlwt
+					extensions.append(".xls")
+				except ImportError:
+					pass
+				for extension in extensions:
+					path = synthetic.writeWorkbook(folder, columns, rows, profile, extension, seed)
+					for stream in (False, True):
+						output = io.StringIO()
+						writeInflow(path, output, profile, stream)
+						results.append((case, extension + (" stream" if stream else ""), output.getvalue() == golden))
+	return results
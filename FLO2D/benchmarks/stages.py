@@ -0,0 +1,69 @@
+# stages.py
+
+# Times and memory-profiles each stage of a text2dat conversion on one workbook:
+#	open     read the sheet into rows (readers.readSheet)
+#	locate   find the surface row and node IDs (sheetLayout)
+#	extract  build the time vector and flow array (layoutHydrographs)
+#	format   format the F/H records (writeHydrographs into memory)
+#	write    write the formatted text to disk
+#	stream   the whole conversion with stream=True, for comparison
+# Memory is the tracemalloc peak of a stage, measured in a second pass so it does not slow the
+# timings.
+
+import gc, io, os, time, tracemalloc
+
+STAGES = ["open", "locate", "extract", "format", "write", "stream"]
+
+def runStages(path, profile, output):
+	# Runs every stage once; yields (stage, callable) pairs in order so the caller can time them
+	from text2dat import readers
+	from text2dat.core import layoutHydrographs, sheetLayout, writeHydrographs, writeInflow
+	state = {}
+
+	def openStage():
+		state["rows"] = readers.readSheet(path, profile.sheetName)
+
+	def locateStage():
+		state["layout"] = sheetLayout(state["rows"])
+
+	def extractStage():
+		state["hydrographs"] = layoutHydrographs(state["rows"], state["layout"], profile)
+
+	def formatStage():
+		text = io.StringIO()
+		writeHydrographs(text, *state["hydrographs"])
+		state["text"] = text.getvalue()
+
+	def writeStage():
+		with open(output, "w") as file:
+			file.write(state["text"])
+
+	def streamStage():
+		state.clear()
+		with open(output + ".stream", "w") as file:
+			writeInflow(path, file, profile, stream=True)
+
+	return [("open", openStage), ("locate", locateStage), ("extract", extractStage), ("format", formatStage), ("write", writeStage), ("stream", streamStage)]
+
+def measure(path, profile, output, memory=True):
+	# Returns ({stage: {"seconds": ..., "peakBytes": ...}}, size of the .dat) for one workbook
+	result = {}
+	gc.collect()
+	for stage, run in runStages(path, profile, output):
+		start = time.perf_counter()
+		run()
+		result[stage] = {"seconds": time.perf_counter() - start}
+	if memory:
+		gc.collect()
+		for stage, run in runStages(path, profile, output):
+			tracemalloc.start()
+			try:
+				run()
+				result[stage]["peakBytes"] = tracemalloc.get_traced_memory()[1]
+			finally:
+				tracemalloc.stop()
+	outputBytes = os.path.getsize(output)
+	for name in (output, output + ".stream"):
+		if os.path.exists(name):
+			os.remove(name)
+	return result, outputBytes
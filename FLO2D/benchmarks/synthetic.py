@@ -0,0 +1,123 @@
+# synthetic.py
+
+# Writes synthetic HYDROGRAPHS workbooks of any size for benchmarking text2dat. The sheet XML is
+# streamed into the .xlsx archive a block of rows at a time, so 5,000 x 100,000 sheets can be
+# generated without holding them in memory. .xls (via xlwt, when installed) is limited to
+# 256 columns and 65,536 rows.
+
+# Sheet layout (row and column indexes from 0):
+#	row 0        title
+#	row 1        node IDs over the inflow columns (standard: from column 2, denver: from column 3)
+#	row 2        surface flow row: 0 in every column
+#	rows 3...    column 0 the step number, column 1 the time (standard) or the step number
+#	             (denver, time in column 2), then one flow per inflow column
+# Every 97th data row is left empty to exercise the empty-row mask.
+
+import os, zipfile
+
+WORKBOOK_XML = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+	'<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+	'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+	'<sheets><sheet name="{}" sheetId="1" r:id="rId1"/></sheets></workbook>')
+WORKBOOK_RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+	'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+	'<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+	'</Relationships>')
+ROOT_RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+	'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+	'<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+	'</Relationships>')
+CONTENT_TYPES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+	'<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+	'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+	'<Default Extension="xml" ContentType="application/xml"/>'
+	'<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+	'<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+	'</Types>')
+SHEET_START = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+	'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+SHEET_END = '</sheetData></worksheet>'
+
+# Rows generated per block
+BLOCK = 2048
+
+def firstColumn(profile):
+	# First inflow column: right of the step, mask and time columns
+	return max(2, profile.timeCol + 1)
+
+def syntheticRows(columns, rows, profile, seed=0):
+	# Yields the sheet as lists of cell values ('' for empty), BLOCK data rows at a time
+	import numpy as np
+	random = np.random.default_rng(seed)
+	first = firstColumn(profile)
+	width = first + columns
+	nodeIds = 10000 + np.arange(columns) * 7 + int(random.integers(0, 1000))
+	yield [["Synthetic CUHP hydrographs"], [''] * first + [float(n) for n in nodeIds], [0.0] * width]
+
+	# Each node is a triangular hydrograph with noise, a random peak and a long flat tail
+	peaks = random.uniform(1.0, 5000.0, columns)
+	peakSteps = random.integers(1, max(2, rows // 4), columns)
+	for start in range(0, rows, BLOCK):
+		steps = np.arange(start + 1, min(start + BLOCK, rows) + 1)
+		shape = np.clip(1.0 - np.abs(steps[:, None] - peakSteps[None, :]) / (2.0 * peakSteps[None, :]), 0.0, None)
+		flows = np.round(peaks * shape + random.uniform(0.0, 0.01, (len(steps), columns)), 3)
+		block = []
+		for i, step in enumerate(steps.tolist()):
+			if step % 97 == 0:
+				block.append([])
+				continue
+			row = [float(step), round(step / 12.0, 6)]
+			if profile.timeCol == 2:
+				row = [float(step), float(step), round(step / 12.0, 6)]
+			block.append(row[:first] + [''] * (first - len(row[:first])) + flows[i].tolist())
+		yield block
+
+def cellXml(value):
+	if value == '':
+		return '<c/>'
+	if isinstance(value, str):
+		return '<c t="inlineStr"><is><t>{}</t></is></c>'.format(value)
+	return '<c><v>{!r}</v></c>'.format(value)
+
+def writeXlsx(path, columns, rows, profile, seed=0):
+	# Writes a synthetic .xlsx, streaming the sheet XML into the archive
+	with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+		archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+		archive.writestr("_rels/.rels", ROOT_RELS)
+		archive.writestr("xl/workbook.xml", WORKBOOK_XML.format(profile.sheetName))
+		archive.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+		with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as part:
+			part.write(SHEET_START.encode())
+			r = 1
+			for block in syntheticRows(columns, rows, profile, seed):
+				text = []
+				for row in block:
+					text.append('<row r="{}">{}</row>'.format(r, "".join([cellXml(value) for value in row])) if row else '')
+					r += 1
+				part.write("".join(text).encode())
+			part.write(SHEET_END.encode())
+	return path
+
+def writeXls(path, columns, rows, profile, seed=0):
+	# Writes a synthetic .xls through xlwt
+	import xlwt
+	if firstColumn(profile) + columns > 256 or rows + 3 > 65536:
+		raise ValueError(".xls sheets are limited to 256 columns and 65,536 rows")
+	book = xlwt.Workbook()
+	sheet = book.add_sheet(profile.sheetName)
+	r = 0
+	for block in syntheticRows(columns, rows, profile, seed):
+		for row in block:
+			for j, value in enumerate(row):
+				if value != '':
+					sheet.write(r, j, value)
+			r += 1
+	book.save(path)
+	return path
+
+def writeWorkbook(folder, columns, rows, profile, extension=".xlsx", seed=0):
+	# Writes Synthetic_<profile>_<columns>x<rows>_US.<ext> in folder and returns its path
+	path = os.path.join(folder, "Synthetic_{}_{}x{}_US{}".format(profile.name, columns, rows, extension))
+	if extension == ".xls":
+		return writeXls(path, columns, rows, profile, seed)
+	return writeXlsx(path, columns, rows, profile, seed)
@@ -0,0 +1,6 @@
+# conftest.py
+# The tests import text2dat and benchmarks as packages of the FLO2D folder
+
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,52 @@
+# test_decimate.py
+# The decimation summary printed by the command line, read back from the per-node report CSV, and
+# the peak and volume of decimated hydrographs against the original ones.
+
+import io
+import numpy as np
+import pytest
+from text2dat.decimate import Decimation, breakIndexes, decimateNode, readReport, retime, summarize, volume, writeReport
+
+def test_report_round_trip():
+	report = [{"node": 10473.0, "recordsIn": 100, "recordsOut": 40, "removed": 60, "volumeError": 0.0004, "peakError": 0.0},
+	          {"node": 10474.0, "recordsIn": 50, "recordsOut": 50, "removed": 0, "volumeError": -0.0009, "peakError": -0.002}]
+	file = io.StringIO()
+	writeReport(report, file)
+	file.seek(0)
+	assert readReport(file) == report
+	assert summarize(report) == "removed 60 of 150 H records; max volume error 0.090%, max peak error 0.200%"
+
+def hydrograph():
+	# Five-minute hydrograph peaking between the quarter hours, with an exponential recession
+	time = np.arange(0.0, 10.0 + 1e-9, 1.0 / 12.0)
+	flow = np.clip(1.0 - np.abs(time - 3.37) / 1.7, 0.0, None) * 500.0 + np.where(time > 3.37, 40.0 * np.exp(-(time - 3.37)), 0.0)
+	return time, flow
+
+@pytest.mark.parametrize("decimation", [Decimation(0.25), Decimation(0.25, 0.005), Decimation(None, 0.005), Decimation(1.0, 0.01, 0.0005)])
+def test_peak_and_volume_kept(decimation):
+	time, flow = hydrograph()
+	newTime, newFlow, report = decimateNode(10473.0, time, flow, decimation)
+	assert report["peakError"] == 0.0 and newFlow.max() == flow.max()
+	# The volume of the final output, against the original hydrograph
+	assert abs(volume(newTime, newFlow) / volume(time, flow) - 1.0) <= decimation.volumeTolerance
+	assert abs(report["volumeError"]) <= decimation.volumeTolerance
+	assert report["recordsOut"] < report["recordsIn"]
+	assert newTime[0] == time[0] and newTime[-1] == time[-1] and np.all(np.diff(newTime) > 1e-6)
+
+def test_retime_keeps_break_times():
+	time, flow = hydrograph()
+	newTime, newFlow = retime(time, flow, 0.25)
+	for i in breakIndexes(flow):
+		assert time[i] in newTime
+	# Off the break times the grid is uniform
+	assert 2.0 in newTime and 2.1 not in newTime
+
+def test_volume_refined():
+	# A spike between coarse grid times: the step is halved until the volume is kept, and below the
+	# original timestep the node is left as it is
+	time = np.arange(0.0, 4.0 + 1e-9, 0.1)
+	flow = np.zeros(len(time))
+	flow[[12, 25]] = [100.0, 60.0]
+	newTime, newFlow, report = decimateNode(1.0, time, flow, Decimation(1.0, None, 0.0001))
+	assert abs(report["volumeError"]) <= 0.0001
+	assert newFlow.max() == 100.0
@@ -0,0 +1,103 @@
+# test_events.py
+# Multi-event workbooks: one HYDROGRAPHS_<event> sheet per event, with blank separator rows in the
+# data, converted in one pass to INFLOW_<suffix>_<event>.dat files that match converting each sheet
+# as a workbook of its own.
+
+import os, zipfile
+import pytest
+from benchmarks.synthetic import CONTENT_TYPES, ROOT_RELS, SHEET_END, SHEET_START, cellXml, syntheticRows
+from text2dat.core import writeInflow
+from text2dat.events import eventPath, eventSheets, text2datEvents
+from text2dat.layout import STANDARD
+
+def sheetRows(seed, rows=300, columns=4):
+	# The synthetic sheet (every 97th data row empty) with a run of blank rows splitting the data
+	sheet = [row for block in syntheticRows(columns, rows, STANDARD, seed) for row in block]
+	return sheet[:120] + [[], [], []] + sheet[120:] + [[], []]
+
+def writeSheets(path, sheets):
+	# Writes an .xlsx with one worksheet per (name, rows); blank rows are left out of the sheet XML
+	workbook = "".join('<sheet name="{}" sheetId="{}" r:id="rId{}"/>'.format(name, i, i) for i, (name, rows) in enumerate(sheets, 1))
+	relationships = "".join('<Relationship Id="rId{}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+		'Target="worksheets/sheet{}.xml"/>'.format(i, i) for i in range(1, len(sheets) + 1))
+	with zipfile.ZipFile(path, "w") as archive:
+		archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+		archive.writestr("_rels/.rels", ROOT_RELS)
+		archive.writestr("xl/workbook.xml", '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+			'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>{}</sheets></workbook>'.format(workbook))
+		archive.writestr("xl/_rels/workbook.xml.rels", '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+			'{}</Relationships>'.format(relationships))
+		for i, (name, rows) in enumerate(sheets, 1):
+			xml = "".join('<row r="{}">{}</row>'.format(r, "".join(cellXml(value) for value in row)) for r, row in enumerate(rows, 1) if row)
+			archive.writestr("xl/worksheets/sheet{}.xml".format(i), SHEET_START + xml + SHEET_END)
+	return str(path)
+
+def expected(folder, name, rows):
+	# The INFLOW.dat text of rows converted as the HYDROGRAPHS sheet of a workbook of their own
+	workbook = writeSheets(folder / (name + ".xlsx"), [(STANDARD.sheetName, rows)])
+	savefile = str(folder / (name + ".dat"))
+	with open(savefile, "w") as file:
+		writeInflow(workbook, file, STANDARD)
+	with open(savefile) as file:
+		return file.read()
+
+def read(path):
+	with open(path) as file:
+		return file.read()
+
+def test_event_sheets():
+	names = ["Notes", "HYDROGRAPHS", "HYDROGRAPHS_", "HYDROGRAPHS_10yr", "HYDROGRAPHS_100yr", "hydrographs_5yr"]
+	assert eventSheets(names) == [("HYDROGRAPHS_10yr", "10yr"), ("HYDROGRAPHS_100yr", "100yr")]
+	assert eventPath(os.path.join("Project", "INFLOW_US.dat"), "100yr") == os.path.join("Project", "INFLOW_US_100yr.dat")
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_events_match_single_sheets(tmp_path, workers):
+	events = {"10yr": sheetRows(1), "100yr": sheetRows(2), "500yr": sheetRows(3)}
+	# The node ID layout is shared; the flows differ
+	for rows in events.values():
+		rows[1] = events["10yr"][1]
+	sheets = [("Notes", [["Not a hydrograph sheet"]])] + [("HYDROGRAPHS_" + event, rows) for event, rows in events.items()]
+	workbook = writeSheets(tmp_path / "Project_US.xlsx", sheets)
+
+	savefiles = text2datEvents(workbook, STANDARD, prompt=False, workers=workers)
+	assert [os.path.basename(path) for path in savefiles] == ["INFLOW_US_10yr.dat", "INFLOW_US_100yr.dat", "INFLOW_US_500yr.dat"]
+	assert not os.path.exists(str(tmp_path / "INFLOW_US.dat"))
+	outputs = [read(path) for path in savefiles]
+	assert len(set(outputs)) == 3
+	for (event, rows), output in zip(events.items(), outputs):
+		assert output == expected(tmp_path, "Single_" + event, rows), event
+		# One H line per node for the surface row and each data row, none for the blank rows
+		hLines = [line for line in output.splitlines() if line.split()[:1] == ["H"]]
+		assert len(hLines) == 4 * len([row for row in rows[2:] if row])
+
+def test_xls_events(tmp_path):
+	xlwt = pytest.importorskip("xlwt")
+	events = {"2yr": sheetRows(4, rows=150), "25yr": sheetRows(5, rows=150)}
+	events["25yr"][1] = events["2yr"][1]
+	book = xlwt.Workbook()
+	for event, rows in events.items():
+		sheet = book.add_sheet("HYDROGRAPHS_" + event)
+		for i, row in enumerate(rows):
+			for j, value in enumerate(row):
+				if value != '':
+					sheet.write(i, j, value)
+	workbook = str(tmp_path / "Project_DS.xls")
+	book.save(workbook)
+
+	savefiles = text2datEvents(workbook, STANDARD, prompt=False, workers=1)
+	assert [os.path.basename(path) for path in savefiles] == ["INFLOW_DS_2yr.dat", "INFLOW_DS_25yr.dat"]
+	for (event, rows), path in zip(events.items(), savefiles):
+		assert read(path) == expected(tmp_path, "Single_" + event, rows), event
+
+def test_layout_checked_on_every_sheet(tmp_path):
+	first, second = sheetRows(1), sheetRows(2)
+	# Same layout but for the last node ID
+	second[1] = first[1][:-1] + [first[1][-1] + 1.0]
+	workbook = writeSheets(tmp_path / "Project_US.xlsx", [("HYDROGRAPHS_10yr", first), ("HYDROGRAPHS_100yr", second)])
+	with pytest.raises(ValueError, match="differs from the first sheet"):
+		text2datEvents(workbook, STANDARD, prompt=False, workers=1)
+
+def test_no_event_sheets(tmp_path):
+	workbook = writeSheets(tmp_path / "Project_US.xlsx", [(STANDARD.sheetName, sheetRows(1))])
+	with pytest.raises(ValueError, match="No HYDROGRAPHS_<event> sheets"):
+		text2datEvents(workbook, STANDARD, prompt=False, workers=1)
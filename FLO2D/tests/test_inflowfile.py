@@ -0,0 +1,86 @@
+# test_inflowfile.py
+# INFLOW.dat files written by text2dat read back by readInflowDat, with CRLF line ends and FLO-2D
+# header and R lines, and the .hydb sidecar save/load round trip.
+
+import os
+import numpy as np
+from benchmarks.synthetic import writeXlsx
+from text2dat.core import writeInflow
+from text2dat.inflowfile import loadInflow, loadInflowStore, nodeHydrograph, readInflowDat, saveInflowStore, storePath
+from text2dat.layout import STANDARD
+
+def convert(folder, columns=3, rows=200):
+	workbook = str(folder / "Project_US_100yr.xlsx")
+	writeXlsx(workbook, columns, rows, STANDARD)
+	savefile = str(folder / "INFLOW_US_100yr.dat")
+	with open(savefile, "w") as file:
+		writeInflow(workbook, file, STANDARD)
+	return savefile
+
+def records(path):
+	# {node ID: [(time, flow)]} of the F and H lines, parsed line by line
+	nodes, node = {}, None
+	with open(path) as file:
+		for line in file:
+			fields = line.split()
+			if fields and fields[0] == "F":
+				node = int(fields[2])
+				nodes[node] = []
+			elif fields and fields[0] == "H":
+				nodes[node].append((float(fields[1]), float(fields[2])))
+	return nodes
+
+def assertSame(a, b):
+	for x, y in zip(a, b):
+		assert np.array_equal(x, y)
+
+def test_read_text2dat_output(tmp_path):
+	savefile = convert(tmp_path)
+	data = readInflowDat(savefile)
+	expected = records(savefile)
+	assert data.nodeIds.tolist() == list(expected)
+	for nodeId, pairs in expected.items():
+		time, flow = nodeHydrograph(data, nodeId)
+		assert list(zip(time.tolist(), flow.tolist())) == pairs
+		assert pairs[0] == (0.0, 0.0)
+	assert data.offsets[-1] == len(data.time) == sum(len(pairs) for pairs in expected.values())
+
+def test_crlf_and_header_lines(tmp_path):
+	savefile = convert(tmp_path)
+	with open(savefile, "rb") as file:
+		text = file.read()
+	# FLO-2D's IHOURDAILY/IDEPLT header line, an R record per node, and Windows line ends
+	edited = str(tmp_path / "INFLOW_edited.dat")
+	with open(edited, "wb") as file:
+		file.write(b"0\t0\r\n" + text.replace(b"\n", b"\r\n").replace(b"\r\nF", b"\r\nR\t1\t2\t3\r\nF"))
+	assert b"\r\n" in open(edited, "rb").read()
+	assertSame(readInflowDat(edited), readInflowDat(savefile))
+
+def test_store_round_trip(tmp_path):
+	savefile = convert(tmp_path)
+	data = readInflowDat(savefile)
+	sidecar = storePath(savefile)
+	assert sidecar.endswith("INFLOW_US_100yr.hydb")
+	saveInflowStore(data, sidecar, savefile)
+	loaded = loadInflowStore(sidecar)
+	assertSame(loaded, data)
+	assert not loaded.time.flags.writeable
+
+def test_load_inflow_rebuilds_stale_store(tmp_path):
+	savefile = convert(tmp_path)
+	first = loadInflow(savefile)
+	assert os.path.isfile(storePath(savefile))
+	assert isinstance(loadInflow(savefile).time, np.memmap)
+	# The .dat is rewritten with other hydrographs: the sidecar no longer matches and is rebuilt
+	os.remove(savefile)
+	convert(tmp_path, columns=2, rows=50)
+	second = loadInflow(savefile)
+	assert len(second.nodeIds) == 2 and len(first.nodeIds) == 3
+	assertSame(second, readInflowDat(savefile))
+	assertSame(loadInflowStore(storePath(savefile)), second)
+
+def test_empty_file(tmp_path):
+	path = tmp_path / "INFLOW_empty.dat"
+	path.write_bytes(b"")
+	data = readInflowDat(str(path))
+	assert len(data.nodeIds) == 0 and data.offsets.tolist() == [0]
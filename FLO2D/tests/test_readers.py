@@ -0,0 +1,41 @@
+# test_readers.py
+# The streaming .xlsx reader: rows and cells skipped by the sheet XML, shared strings, and memory
+# that stays flat with the number of rows since parsed rows are dropped from the tree.
+
+import io, tracemalloc, zipfile
+from benchmarks.synthetic import writeXlsx
+from text2dat.layout import STANDARD
+from text2dat.readers import MAIN, iterXlsxPart, iterXlsxRows, xlsxSharedStrings
+
+def sheetPart(rows):
+	return io.BytesIO(('<worksheet xmlns="{}"><sheetData>{}</sheetData></worksheet>'.format(MAIN[1:-1], rows)).encode())
+
+def test_skipped_rows_and_cells():
+	part = sheetPart('<row r="1"><c r="A1" t="s"><v>1</v></c><c r="C1"><v>2.5</v></c></row>'
+	                 '<row r="4"><c r="B4" t="inlineStr"><is><t>Node</t></is></c><c r="C4"/></row>')
+	assert list(iterXlsxPart(part, ["Time", "Flow"])) == [["Flow", '', 2.5], [], [], ['', "Node", '']]
+
+def test_shared_strings():
+	buffer = io.BytesIO()
+	with zipfile.ZipFile(buffer, "w") as archive:
+		archive.writestr("xl/sharedStrings.xml", '<sst xmlns="{}"><si><t>TIME</t></si><si><r><t>Node </t></r><r><t>12</t></r></si></sst>'.format(MAIN[1:-1]))
+	with zipfile.ZipFile(buffer) as archive:
+		assert xlsxSharedStrings(archive) == ["TIME", "Node 12"]
+
+def peakMemory(path):
+	tracemalloc.start()
+	try:
+		count = sum(1 for row in iterXlsxRows(path, STANDARD.sheetName))
+		return count, tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+def test_memory_flat_with_rows(tmp_path):
+	small, large = str(tmp_path / "small.xlsx"), str(tmp_path / "large.xlsx")
+	writeXlsx(small, 5, 2000, STANDARD)
+	writeXlsx(large, 5, 40000, STANDARD)
+	smallRows, smallPeak = peakMemory(small)
+	largeRows, largePeak = peakMemory(large)
+	assert largeRows - smallRows == 38000
+	# Keeping the 38,000 emptied row elements alone would take over 2 MB
+	assert largePeak - smallPeak < 1000000
@@ -0,0 +1,127 @@
+# test_watch.py
+# FolderWatcher.poll() driven with a fake clock: workbooks still being written are left alone,
+# settled ones are converted once through the atomic write, and unchanged ones are skipped
+# through the manifest after a restart.
+
+import json, os
+from concurrent.futures import Future
+from benchmarks.synthetic import writeXlsx
+from text2dat.layout import STANDARD
+from text2dat.watch import STATUS, FolderWatcher, wakes
+
+class SyncExecutor:
+	# Runs each job at once in this process, counting the jobs
+
+	def __init__(self):
+		self.jobs = 0
+
+	def submit(self, function, *arguments):
+		self.jobs += 1
+		future = Future()
+		try:
+			future.set_result(function(*arguments))
+		except Exception as e:
+			future.set_exception(e)
+		return future
+
+	def shutdown(self, wait=True):
+		pass
+
+def watcher(folder, settle=5.0):
+	folderWatcher = FolderWatcher(str(folder), STANDARD, workers=1, settle=settle)
+	folderWatcher.pool.shutdown()
+	folderWatcher.pool = SyncExecutor()
+	return folderWatcher
+
+def status(folder):
+	with open(os.path.join(str(folder), STATUS)) as file:
+		return json.load(file)
+
+def test_poll_settle_convert_and_restart(tmp_path):
+	workbook = str(tmp_path / "Project_US_100yr.xlsx")
+	savefile = str(tmp_path / "INFLOW_US_100yr.dat")
+	writeXlsx(workbook, 3, 20, STANDARD)
+	first = watcher(tmp_path)
+
+	first.poll(0.0)
+	# Still being written: the workbook grows before it has settled
+	writeXlsx(workbook, 3, 40, STANDARD)
+	first.poll(3.0)
+	first.poll(7.0)
+	assert first.pool.jobs == 0 and not os.path.exists(savefile)
+	assert status(tmp_path)["queueDepth"] == 0
+
+	# Settled for 5 seconds since the last change: converted once
+	first.poll(8.5)
+	assert first.pool.jobs == 1
+	first.poll(9.0)
+	assert os.path.isfile(savefile) and not os.path.exists(savefile + ".tmp")
+	assert status(tmp_path)["converted"] == 1
+	assert status(tmp_path)["files"]["Project_US_100yr.xlsx"]["status"] == "converted"
+	with open(savefile) as file:
+		converted = file.read()
+	assert converted.startswith("F\t0\t") and converted.count("F\t") == 3
+
+	# Polling on does not convert it again
+	first.poll(20.0)
+	first.poll(30.0)
+	assert first.pool.jobs == 1 and status(tmp_path)["converted"] == 1
+	first.close()
+
+	# After a restart the workbook is found current through INFLOW_manifest.json
+	modified = os.stat(savefile).st_mtime_ns
+	second = watcher(tmp_path)
+	second.poll(0.0)
+	second.poll(6.0)
+	second.poll(7.0)
+	assert second.pool.jobs == 1
+	assert status(tmp_path)["unchanged"] == 1 and status(tmp_path)["converted"] == 0
+	assert status(tmp_path)["files"]["Project_US_100yr.xlsx"]["status"] == "unchanged"
+	assert os.stat(savefile).st_mtime_ns == modified
+	second.close()
+
+def test_failed_conversion_is_reported_once(tmp_path):
+	workbook = tmp_path / "Project_US_10yr.xlsx"
+	workbook.write_bytes(b"not a workbook")
+	folderWatcher = watcher(tmp_path, settle=1.0)
+	for now in (0.0, 2.0, 3.0, 10.0):
+		folderWatcher.poll(now)
+	report = status(tmp_path)
+	assert folderWatcher.pool.jobs == 1 and report["failed"] == 1
+	assert report["files"]["Project_US_10yr.xlsx"]["status"] == "failed"
+	assert not os.path.exists(str(tmp_path / "INFLOW_US_10yr.dat"))
+	assert not os.path.exists(str(tmp_path / "INFLOW_US_10yr.dat.tmp"))
+
+def test_status_written_on_change(tmp_path):
+	workbook = str(tmp_path / "Project_US_5yr.xlsx")
+	writeXlsx(workbook, 2, 10, STANDARD)
+	folderWatcher = watcher(tmp_path, settle=1.0)
+	statusPath = str(tmp_path / STATUS)
+	folderWatcher.poll(0.0)
+	written = os.stat(statusPath).st_mtime_ns
+	os.utime(statusPath, ns=(written - 10**9, written - 10**9))
+	# Nothing changed: the status file is left alone
+	folderWatcher.poll(0.5)
+	assert os.stat(statusPath).st_mtime_ns == written - 10**9
+	folderWatcher.poll(2.0)
+	folderWatcher.poll(3.0)
+	assert status(tmp_path)["converted"] == 1
+	assert os.stat(statusPath).st_mtime_ns != written - 10**9
+	folderWatcher.close()
+
+class Change:
+	def __init__(self, src_path, dest_path=None):
+		self.src_path = src_path
+		if dest_path is not None:
+			self.dest_path = dest_path
+
+def test_wakeup_only_for_workbooks(tmp_path):
+	folder = str(tmp_path)
+	# The tool's own writes do not wake the poll
+	for name in (STATUS, STATUS + ".tmp", "INFLOW_US_5yr.dat", "INFLOW_US_5yr.dat.tmp", "INFLOW_manifest.json",
+			"INFLOW_US_5yr_decimation.csv", "~$Project_US_5yr.xlsx"):
+		assert not wakes(Change(os.path.join(folder, name)))
+	assert wakes(Change(os.path.join(folder, "Project_US_5yr.xlsx")))
+	assert wakes(Change(os.path.join(folder, "Project_US_5yr.XLS")))
+	# Excel saves to a temporary file and renames it over the workbook
+	assert wakes(Change(os.path.join(folder, "A1B2C3D4"), os.path.join(folder, "Project_US_5yr.xlsx")))
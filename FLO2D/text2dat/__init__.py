@@ -0,0 +1,16 @@
+# text2dat
+
+# Converts the HYDROGRAPHS sheet of CUHP workbooks into FLO-2D INFLOW.dat files.
+# Importing the package never prompts and never loads a workbook reader; xlrd (.xls), the
+# zip/XML reader (.xlsx) and numpy are imported the first time a workbook is converted.
+
+#	from text2dat import text2dat, writeInflow, readHydrographs, DENVER
+#	text2dat("Project_US_100yr.xlsx", DENVER, prompt=False)     # writes INFLOW_US_100yr.dat
+#	writeInflow("Project_US_100yr.xlsx", anyFileLikeObject)      # writes the F/H records
+#	nodeIds, time, flows = readHydrographs("Project_US_100yr.xlsx")
+
+# Run "python -m text2dat --help" from the FLO2D folder for the command line.
+
+from .core import SheetLayout, inflowPath, inflowSuffix, readHydrographs, sheetHydrographs, sheetLayout, text2dat, writeHydrographs, writeInflow
+from .events import text2datEvents
+from .layout import DENVER, PROFILES, STANDARD, LayoutProfile, getProfile
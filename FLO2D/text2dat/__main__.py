@@ -0,0 +1,71 @@
+# __main__.py
+
+# Command line for text2dat, run from the FLO2D folder:
+#	python -m text2dat                                   (drag and drop a workbook at the prompt)
+#	python -m text2dat Project_US_100yr.xlsx --profile denver
+#	python -m text2dat "C:\Project\CUHP" --cache --stream
+#	python -m text2dat "C:\Project\CUHP\*_US_*.xlsx" --workers 4
+#	python -m text2dat "C:\Project\CUHP" --simplify 0.005 --retime 0.0833
+#	python -m text2dat Project_US.xlsx --events                 (HYDROGRAPHS_<event> sheets)
+#	python -m text2dat "C:\Project\CUHP" --watch --settle 10      (convert workbooks as they land)
+
+import argparse, os, sys
+from .layout import PROFILES
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(prog="text2dat", description="Convert HYDROGRAPHS workbooks to FLO-2D INFLOW_<suffix>.dat files.")
+	parser.add_argument("paths", nargs="*", help="workbook, folder or glob of .xls/.xlsx workbooks (prompts for one workbook when omitted)")
+	parser.add_argument("--profile", choices=sorted(PROFILES), default="standard", help="sheet layout (denver: time in column C, rows up to 58)")
+	parser.add_argument("--denver", dest="profile", action="store_const", const="denver", help="same as --profile denver")
+	parser.add_argument("--workers", type=int, default=None, help="number of processes for folders and globs (default: number of cores)")
+	parser.add_argument("--stream", action="store_true", help="read each sheet row by row to keep memory flat")
+	parser.add_argument("--cache", action="store_true", help="skip workbooks whose INFLOW .dat is unchanged since the last run")
+	parser.add_argument("--retime", type=float, default=None, metavar="HOURS", help="resample every hydrograph onto a uniform timestep")
+	parser.add_argument("--simplify", type=float, default=None, metavar="FRACTION", help="drop H records within this fraction of each node's peak flow (e.g. 0.005)")
+	parser.add_argument("--events", action="store_true", help="convert every HYDROGRAPHS_<event> sheet to INFLOW_<suffix>_<event>.dat")
+	parser.add_argument("--watch", action="store_true", help="keep converting workbooks as they land in the folder given")
+	parser.add_argument("--interval", type=float, default=2.0, help="seconds between folder polls for --watch (default 2)")
+	parser.add_argument("--settle", type=float, default=5.0, help="seconds a workbook must stay unchanged before --watch converts it (default 5)")
+	parser.add_argument("--volume-tolerance", type=float, default=0.001, metavar="FRACTION", help="allowed volume error of --simplify and --retime against the original hydrograph (default 0.001)")
+	args = parser.parse_args(argv)
+	if args.events and (args.cache or args.stream):
+		parser.error("--events cannot be combined with --cache or --stream")
+
+	decimation = None
+	if args.retime or args.simplify is not None:
+		from .decimate import Decimation
+		decimation = Decimation(args.retime, args.simplify, args.volume_tolerance)
+
+	if args.watch:
+		if len(args.paths) != 1 or not os.path.isdir(args.paths[0]) or args.events:
+			parser.error("--watch takes one folder and cannot be combined with --events")
+		from .watch import FolderWatcher
+		FolderWatcher(args.paths[0], args.profile, args.workers, args.settle, args.stream, decimation).run(args.interval)
+		return 0
+
+	from .core import text2dat
+	if not args.paths or (len(args.paths) == 1 and os.path.isfile(args.paths[0])):
+		if args.paths:
+			path = args.paths[0]
+		else:
+			path = input("\n Please drag and drop the data file and then press enter.\n")
+			# Drag and drop quotes paths that contain spaces
+			path = path.strip().strip('"')
+		if args.events:
+			from .events import text2datEvents
+			savefiles = text2datEvents(path, args.profile, workers=args.workers, decimation=decimation)
+		else:
+			savefiles = [text2dat(path, args.profile, stream=args.stream, cache=args.cache, decimation=decimation)]
+		for savefile in savefiles:
+			print(savefile)
+		if decimation is not None:
+			from .core import decimationSummary
+			print(" Decimation: " + decimationSummary(savefiles))
+		return 0
+
+	from .batch import text2datBatch
+	results = text2datBatch(args.paths, args.profile, args.workers, args.stream, args.cache, decimation, args.events)
+	return 1 if not results or any(r[3] is not None for r in results) else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,98 @@
+# batch.py
+
+# Converts every hydrograph workbook in a folder (or matching a glob) to INFLOW_<suffix>.dat,
+# one workbook per process, and prints per-file timings and failures.
+
+import glob, os, time
+from . import cache as inflowCache
+from .core import cacheVariant, decimationSummary, inflowPath, saveInflow
+from .decimate import summarize
+from .layout import STANDARD, getProfile
+
+def findWorkbooks(patterns):
+	# A folder means every .xls/.xlsx in it; anything else is treated as a glob
+	if isinstance(patterns, str):
+		patterns = [patterns]
+	paths = set()
+	for pattern in patterns:
+		if os.path.isdir(pattern):
+			pattern = os.path.join(pattern, "*.xls*")
+		for path in glob.glob(pattern):
+			fileName = os.path.basename(path)
+			# Skips Excel lock files (~$Book.xlsx) that sit next to open workbooks
+			if fileName.lower().endswith((".xls", ".xlsx")) and not fileName.startswith("~$"):
+				paths.add(path)
+	return sorted(paths)
+
+def convertWorkbook(job):
+	# Runs one conversion in a worker process and reports (path, savefile, seconds, error, skipped, workbookHash, summary)
+	# summary is the decimation summary line of the outputs, or None
+	# The worker only reads the folder manifest; the parent records the results once all workers are done
+	path, profileName, stream, manifest, decimation, events = job
+	profile = getProfile(profileName)
+	start = time.perf_counter()
+	workbookHash = None
+	try:
+		if events:
+			from .events import text2datEvents
+			savefiles = text2datEvents(path, profile, prompt=False, workers=1, decimation=decimation)
+			summary = decimationSummary(savefiles) if decimation is not None else None
+			return path, ", ".join(os.path.basename(savefile) for savefile in savefiles), time.perf_counter() - start, None, False, workbookHash, summary
+		savefile = inflowPath(path, prompt=False)
+		if manifest is not None:
+			workbookHash = inflowCache.fileHash(path)
+			if inflowCache.isCurrent(manifest, path, cacheVariant(profile, decimation), savefile, workbookHash):
+				return path, savefile, time.perf_counter() - start, None, True, workbookHash, None
+		report = saveInflow(path, savefile, profile, stream, decimation)
+		summary = summarize(report) if report is not None else None
+		return path, savefile, time.perf_counter() - start, None, False, workbookHash, summary
+	except Exception as e:
+		return path, None, time.perf_counter() - start, "{}: {}".format(type(e).__name__, e), False, workbookHash, None
+
+def text2datBatch(patterns, profile=STANDARD, workers=None, stream=False, cache=False, decimation=None, events=False):
+	# Fans the conversions out over a process pool sized to the cores and prints a summary
+	# With cache=True unchanged workbooks are skipped using each folder's INFLOW_manifest.json
+	# With a decimate.Decimation each workbook also gets an INFLOW_<suffix>_decimation.csv report
+	# With events=True every <sheet>_<event> sheet is converted (see events.py); not cached
+	from concurrent.futures import ProcessPoolExecutor
+
+	profile = getProfile(profile)
+	paths = findWorkbooks(patterns)
+	if not paths:
+		print("\n No .xls/.xlsx workbooks found for " + ", ".join([patterns] if isinstance(patterns, str) else patterns))
+		return []
+
+	workers = min(workers or os.cpu_count() or 1, len(paths))
+	manifests = {}
+	if cache and not events:
+		for path in paths:
+			folder = os.path.dirname(os.path.abspath(path))
+			if folder not in manifests:
+				manifests[folder] = inflowCache.loadManifest(folder)
+	jobs = [(path, profile.name, stream, manifests.get(os.path.dirname(os.path.abspath(path))), decimation, events) for path in paths]
+
+	start = time.perf_counter()
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+		results = list(pool.map(convertWorkbook, jobs))
+	total = time.perf_counter() - start
+
+	if manifests:
+		for path, savefile, seconds, error, skipped, workbookHash, summary in results:
+			if error is None and not skipped:
+				inflowCache.record(manifests[os.path.dirname(os.path.abspath(path))], path, cacheVariant(profile, decimation), savefile, workbookHash)
+		for folder, manifest in manifests.items():
+			inflowCache.saveManifest(folder, manifest)
+
+	failures = [r for r in results if r[3] is not None]
+	skips = [r for r in results if r[4]]
+	print("\n Converted {} of {} workbooks ({} unchanged) in {:.2f} s on {} processes\n".format(len(results) - len(failures) - len(skips), len(results), len(skips), total, workers))
+	for path, savefile, seconds, error, skipped, workbookHash, summary in results:
+		if error is None:
+			print(" {:8.2f} s  {} -> {}{}".format(seconds, os.path.basename(path), os.path.basename(savefile), "  (unchanged)" if skipped else ""))
+			if summary is not None:
+				print("             " + summary)
+	if failures:
+		print("\n Failures:")
+		for path, savefile, seconds, error, skipped, workbookHash, summary in failures:
+			print(" {:8.2f} s  {}  {}".format(seconds, os.path.basename(path), error))
+	return results
@@ -0,0 +1,50 @@
+# cache.py
+
+# Manifest cache for text2dat conversions. INFLOW_manifest.json sits next to the INFLOW_*.dat
+# files and records, per workbook, the SHA-256 of the workbook, the converter variant
+# (layout profile name) and the SHA-256 of the .dat it produced. A conversion is skipped
+# only when all three still match, so a changed workbook, a switched variant, a missing
+# .dat or a hand-edited .dat all trigger regeneration.
+
+import hashlib, json, os
+
+MANIFEST = "INFLOW_manifest.json"
+
+def fileHash(path, blockSize=1 << 20):
+	digest = hashlib.sha256()
+	with open(path, "rb") as file:
+		for block in iter(lambda: file.read(blockSize), b""):
+			digest.update(block)
+	return digest.hexdigest()
+
+def loadManifest(folder):
+	try:
+		with open(os.path.join(folder, MANIFEST)) as file:
+			return json.load(file)
+	except (OSError, ValueError):
+		# A missing or damaged manifest just means nothing is cached yet
+		return {}
+
+def saveManifest(folder, manifest):
+	# Writes to a temporary file first so an interrupted run never leaves half a manifest
+	path = os.path.join(folder, MANIFEST)
+	with open(path + ".tmp", "w") as file:
+		json.dump(manifest, file, indent=1, sort_keys=True)
+	os.replace(path + ".tmp", path)
+
+def isCurrent(manifest, workbook, variant, savefile, workbookHash):
+	# True when savefile is exactly what a previous run produced from this workbook and variant
+	entry = manifest.get(os.path.basename(workbook))
+	if entry is None or entry.get("variant") != variant or entry.get("workbook") != workbookHash:
+		return False
+	if entry.get("output") != os.path.basename(savefile) or not os.path.isfile(savefile):
+		return False
+	return fileHash(savefile) == entry.get("outputHash")
+
+def record(manifest, workbook, variant, savefile, workbookHash):
+	manifest[os.path.basename(workbook)] = {
+		"workbook": workbookHash,
+		"variant": variant,
+		"output": os.path.basename(savefile),
+		"outputHash": fileHash(savefile),
+	}
@@ -0,0 +1,194 @@
+# core.py
+
+# Originally text2dat.py and text2dat_DenverFLO2D.py
+# Created by: Jake Ursetta
+# ICON Engineering
+
+# Date Created: 5/25/2016
+# Date Modified: 6/15/2016
+
+# Converts the HYDROGRAPHS sheet of a CUHP workbook into FLO-2D INFLOW.dat F/H records. The
+# differences between the standard and Denver FLO-2D sheets are layout profiles (see layout.py).
+
+import os
+from collections import namedtuple
+from . import readers
+from . import cache as inflowCache
+from .layout import STANDARD, getProfile
+
+# surfaceRow - sheet row index of the surface flow (0, 0) row; the node IDs are on the row above
+# nodeIds    - node ID of each inflow column
+# columns    - sheet column index of each inflow column
+SheetLayout = namedtuple("SheetLayout", ["surfaceRow", "nodeIds", "columns"])
+
+def inflowSuffix(fileName):
+	# Returns the DS/US part of the workbook name (e.g. 'US_50yr' for Project_US_50yr.xlsx), or None
+	if "DS" in fileName or "US" in fileName:
+		suffixIndex = fileName.find("DS")
+		if suffixIndex == -1:
+			suffixIndex = fileName.find("US")
+		saveSuffix = fileName[suffixIndex:]
+		return saveSuffix[:saveSuffix.find(".")]
+	return None
+
+def inflowPath(path, prompt=True):
+	# Returns the INFLOW_<suffix>.dat path that text2dat writes for this workbook
+	# With prompt=False a workbook without a DS/US suffix raises ValueError instead of asking for one
+
+	# Save project folder path and filename for saving purposes
+	project,fileName = os.path.split(os.path.abspath(path))
+
+	saveSuffix = inflowSuffix(fileName)
+	if saveSuffix is None:
+		if not prompt:
+			raise ValueError("No DS/US suffix in workbook name " + fileName)
+		saveSuffix = input("\n Please enter a suffix to textfile name.\n ex: 'US_50yr' would result in INFLOW_US_50yr.dat\n \n")
+
+	# Creates text file name
+	return os.path.join(project, "INFLOW_" + str(saveSuffix) + ".dat")
+
+def isSurfaceRow(row):
+	return len(row) > 1 and ((row[0] == 0 and row[1] == 0) or (row[0] == "0" and row[1] == "0"))
+
+def sheetLayout(rows):
+	# Finds the surface flow (0, 0) row in the first 10 rows and the node ID row above it
+	for sr in range(0,min(10, len(rows))):
+		if isSurfaceRow(rows[sr]):
+			break
+	else:
+		sr = 0
+	if not sr:
+		raise ValueError("Surface flow row (0, 0) with a node ID row above it not found in the first 10 rows")
+	header = rows[sr - 1]
+	# Reads in each column if the surface flow number exists
+	columns = [j for j in range(0,len(header)) if header[j] != '']
+	return SheetLayout(sr, [float(header[j]) for j in columns], columns)
+
+def checkLayout(rows, layout):
+	# Raises ValueError unless rows have the surface row and node IDs of layout
+	sr = layout.surfaceRow
+	if len(rows) <= sr or not isSurfaceRow(rows[sr]):
+		raise ValueError("Surface flow row (0, 0) is not on row {}".format(sr + 1))
+	header = rows[sr - 1]
+	columns = [j for j in range(0,len(header)) if header[j] != '']
+	if columns != layout.columns or [float(header[j]) for j in columns] != layout.nodeIds:
+		raise ValueError("Node ID row {} differs from the first sheet".format(sr))
+
+def layoutHydrographs(rows, layout, profile=STANDARD):
+	# Returns (nodeIds, time, flows) for sheet rows whose surface row and node IDs are known
+	import numpy as np
+	profile = getProfile(profile)
+
+	# Loads the data rows once into a 2-D array instead of reading them cell by cell
+	rows = rows[layout.surfaceRow:profile.rowLimit]
+	numCol = max([len(row) for row in rows] + [max(layout.columns + [profile.timeCol, 1]) + 1])
+	values = np.full((len(rows), numCol), '', dtype=object)
+	for i, row in enumerate(rows):
+		values[i,:len(row)] = row
+
+	# Keeps one time vector and the flows of every non-empty row
+	# Insures empty rows are not read in
+	data = values[values[:,1] != '']
+	time = data[:,profile.timeCol].astype(float)
+	flows = data[:,layout.columns].astype(float).reshape(len(data), len(layout.columns))
+	return layout.nodeIds, time, flows
+
+def sheetHydrographs(rows, profile=STANDARD):
+	# Returns (nodeIds, time, flows) from a list of sheet rows: the node ID of each inflow column,
+	# one time vector, and a time x node array of flows
+	return layoutHydrographs(rows, sheetLayout(rows), profile)
+
+def readHydrographs(path, profile=STANDARD):
+	# Returns (nodeIds, time, flows) for the hydrograph sheet of a workbook
+	profile = getProfile(profile)
+	return sheetHydrographs(readers.readSheet(path, profile.sheetName), profile)
+
+def writeNode(file, nodeId, time, flow):
+	# Writes the F record and H records of one inflow node in a single call
+	import numpy as np
+	hydrograph = np.column_stack((time, flow))
+	file.write("F	0	%.0f\n" % nodeId + ("H	%.2f	%.2f\n" * len(hydrograph)) % tuple(hydrograph.ravel().tolist()))
+
+def writeHydrographs(file, nodeIds, time, flows, decimation=None):
+	# Formats each hydrograph as one block of H records and writes it once per inflow node
+	# With a decimate.Decimation each node is decimated first and its report rows are returned
+	import numpy as np
+	if decimation is not None:
+		from .decimate import decimateNode
+		report = []
+		for k, nodeId in enumerate(nodeIds):
+			nodeTime, nodeFlow, nodeReport = decimateNode(nodeId, time, flows[:,k], decimation)
+			writeNode(file, nodeId, nodeTime, nodeFlow)
+			report.append(nodeReport)
+		return report
+
+	hydrograph = np.empty((len(time), 2))
+	hydrograph[:,0] = time
+	recordFormat = "H	%.2f	%.2f\n" * len(time)
+	for k, nodeId in enumerate(nodeIds):
+		hydrograph[:,1] = flows[:,k]
+		file.write("F	0	%.0f\n" % nodeId + recordFormat % tuple(hydrograph.ravel().tolist()))
+
+def writeInflow(path, file, profile=STANDARD, stream=False, decimation=None):
+	# Writes the INFLOW.dat records for a workbook to any file-like object
+	# With stream=True the sheet is read row by row and spooled (see stream.py) to keep memory flat
+	# With a decimate.Decimation the per-node decimation report is returned
+	profile = getProfile(profile)
+	if stream:
+		from .stream import writeInflowStream
+		return writeInflowStream(readers.iterSheetRows(path, profile.sheetName), file, profile, decimation)
+	return writeHydrographs(file, *readHydrographs(path, profile), decimation=decimation)
+
+def cacheVariant(profile, decimation=None):
+	# What the manifest records as the converter variant: the profile plus any decimation settings
+	if decimation is None:
+		return profile.name
+	from .decimate import key
+	return profile.name + "|" + key(decimation)
+
+def reportPath(savefile):
+	# INFLOW_US_50yr.dat -> INFLOW_US_50yr_decimation.csv
+	return os.path.splitext(savefile)[0] + "_decimation.csv"
+
+def decimationSummary(savefiles):
+	# The summarize() line of the decimation reports next to savefiles, or None without any
+	from .decimate import readReport, summarize
+	report = []
+	for savefile in savefiles:
+		if os.path.isfile(reportPath(savefile)):
+			with open(reportPath(savefile)) as file:
+				report += readReport(file)
+	return summarize(report) if report else None
+
+def saveInflow(path, savefile, profile=STANDARD, stream=False, decimation=None):
+	# Writes savefile and, when decimating, the decimation report next to it; returns the report
+	with open(savefile,"w") as file:
+		report = writeInflow(path, file, profile, stream, decimation)
+	if report is not None:
+		from .decimate import writeReport
+		with open(reportPath(savefile),"w") as file:
+			writeReport(report, file)
+	return report
+
+def text2dat(path, profile=STANDARD, prompt=True, stream=False, cache=False, decimation=None):
+	# Converts the hydrograph sheet of a workbook to INFLOW_<suffix>.dat next to it and returns its path
+	# With cache=True the conversion is skipped when INFLOW_manifest.json shows the workbook and
+	# its .dat are unchanged since the last run (see cache.py)
+	# With a decimate.Decimation the per-node report is written to INFLOW_<suffix>_decimation.csv
+	profile = getProfile(profile)
+	savefile = inflowPath(path, prompt)
+	variant = cacheVariant(profile, decimation)
+
+	if cache:
+		project = os.path.dirname(savefile)
+		manifest = inflowCache.loadManifest(project)
+		workbookHash = inflowCache.fileHash(path)
+		if inflowCache.isCurrent(manifest, path, variant, savefile, workbookHash):
+			return savefile
+
+	saveInflow(path, savefile, profile, stream, decimation)
+
+	if cache:
+		inflowCache.record(manifest, path, variant, savefile, workbookHash)
+		inflowCache.saveManifest(project, manifest)
+	return savefile
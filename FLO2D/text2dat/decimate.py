@@ -0,0 +1,161 @@
+# decimate.py
+
+# Optional hydrograph decimation applied to each inflow node before its H records are written.
+# Long flat tails and very fine CUHP timesteps inflate INFLOW.dat and slow FLO-2D's inflow
+# interpolation, so a node can be
+#	retimed    - resampled onto a uniform timestep (linear interpolation), and/or
+#	simplified - reduced to the points needed to stay within a flow tolerance of the original
+#	             (Douglas-Peucker on the time/flow curve).
+# Either way the first and last points, the peak, the start of the rise and the end of the
+# recession are always kept, so the peak flow is not cut. The volume of the final hydrograph is
+# checked against the original one: the simplify tolerance is tightened, and then the retime step
+# halved, until it is within volumeTolerance; a step finer than the original timestep leaves the
+# node as it is.
+# Tolerances are fractions of the node's peak flow and volume.
+
+from collections import namedtuple
+
+# step            - uniform timestep in the sheet's time units (hours), or None
+# tolerance       - allowed flow deviation as a fraction of the node peak, or None
+# volumeTolerance - allowed volume error as a fraction of the node volume
+Decimation = namedtuple("Decimation", ["step", "tolerance", "volumeTolerance"])
+Decimation.__new__.__defaults__ = (None, None, 0.001)
+
+REPORT_FIELDS = ["node", "recordsIn", "recordsOut", "removed", "volumeError", "peakError"]
+
+def key(decimation):
+	# Short description of the settings, recorded in the cache manifest
+	return "step={},tolerance={},volumeTolerance={}".format(*decimation)
+
+def volume(time, flow):
+	# Trapezoidal volume under a hydrograph
+	import numpy as np
+	if len(time) < 2:
+		return 0.0
+	return float(np.sum(np.diff(time) * (flow[1:] + flow[:-1])) / 2.0)
+
+def relativeError(new, old):
+	return (new - old) / old if old else 0.0
+
+def breakIndexes(flow):
+	# Indexes of the first and last points, the peak, the start of the rise and the end of the recession
+	import numpy as np
+	n = len(flow)
+	indexes = [0, n - 1, int(np.argmax(flow))]
+	rising = np.flatnonzero(flow != flow[0])
+	if len(rising):
+		indexes.append(max(rising[0] - 1, 0))
+	falling = np.flatnonzero(flow != flow[-1])
+	if len(falling):
+		indexes.append(min(falling[-1] + 1, n - 1))
+	return indexes
+
+def retime(time, flow, step):
+	# Resamples a hydrograph onto a uniform timestep from its first to its last time, keeping the
+	# times of the break points (see breakIndexes) so the peak is not interpolated away
+	import numpy as np
+	if len(time) < 2:
+		return time, flow
+	newTime = time[0] + step * np.arange(int(np.floor((time[-1] - time[0]) / step + 1e-9)) + 1)
+	breaks = time[breakIndexes(flow)]
+	# Grid times that are a break time but for rounding are left to the break time
+	near = np.abs(newTime[:, None] - breaks[None, :]).min(axis=1) <= step * 1e-6
+	newTime = np.union1d(newTime[~near], breaks)
+	return newTime, np.interp(newTime, time, flow)
+
+def simplifyMask(time, flow, tolerance):
+	# Returns the mask of points a Douglas-Peucker pass keeps for an absolute flow tolerance
+	import numpy as np
+	n = len(time)
+	keep = np.zeros(n, dtype=bool)
+	if n <= 2:
+		keep[:] = True
+		return keep
+	keep[breakIndexes(flow)] = True
+
+	kept = np.flatnonzero(keep)
+	segments = list(zip(kept[:-1], kept[1:]))
+	while segments:
+		a, b = segments.pop()
+		if b - a < 2:
+			continue
+		span = time[b] - time[a]
+		inner = slice(a + 1, b)
+		if span > 0:
+			line = flow[a] + (flow[b] - flow[a]) * (time[inner] - time[a]) / span
+		else:
+			line = np.full(b - a - 1, flow[a])
+		deviation = np.abs(flow[inner] - line)
+		i = int(np.argmax(deviation))
+		if deviation[i] > tolerance:
+			m = a + 1 + i
+			keep[m] = True
+			segments.append((a, m))
+			segments.append((m, b))
+	return keep
+
+def simplify(time, flow, tolerance, volumeTolerance=0.001, reference=None):
+	# Simplifies a hydrograph, halving the tolerance until the volume error against reference (by
+	# default the volume of the hydrograph given) is acceptable
+	import numpy as np
+	peak = float(np.max(np.abs(flow))) if len(flow) else 0.0
+	absolute = tolerance * peak
+	reference = volume(time, flow) if reference is None else reference
+	for attempt in range(30):
+		keep = simplifyMask(time, flow, absolute)
+		if abs(relativeError(volume(time[keep], flow[keep]), reference)) <= volumeTolerance:
+			return time[keep], flow[keep]
+		absolute /= 2.0
+	return time, flow
+
+def decimateNode(nodeId, time, flow, decimation):
+	# Returns (time, flow, report) for one inflow node. The retime step is halved until the volume
+	# of the result is within volumeTolerance of the original; once it is finer than the original
+	# timestep the node is only simplified.
+	import numpy as np
+	reference = volume(time, flow)
+	step = decimation.step
+	finest = float(np.min(np.diff(time))) if len(time) > 1 else 0.0
+	while True:
+		newTime, newFlow = time, flow
+		if step and step >= finest:
+			newTime, newFlow = retime(newTime, newFlow, step)
+		if decimation.tolerance is not None:
+			newTime, newFlow = simplify(newTime, newFlow, decimation.tolerance, decimation.volumeTolerance, reference)
+		if not step or step < finest or abs(relativeError(volume(newTime, newFlow), reference)) <= decimation.volumeTolerance:
+			break
+		step /= 2.0
+	peak = float(np.max(flow)) if len(flow) else 0.0
+	newPeak = float(np.max(newFlow)) if len(newFlow) else 0.0
+	report = {
+		"node": nodeId,
+		"recordsIn": len(time),
+		"recordsOut": len(newTime),
+		"removed": len(time) - len(newTime),
+		"volumeError": relativeError(volume(newTime, newFlow), volume(time, flow)),
+		"peakError": relativeError(newPeak, peak),
+	}
+	return newTime, newFlow, report
+
+def writeReport(report, file):
+	# Writes the per-node report as CSV
+	file.write(",".join(REPORT_FIELDS) + "\n")
+	for row in report:
+		file.write("{:.0f},{},{},{},{:.6f},{:.6f}\n".format(*[row[field] for field in REPORT_FIELDS]))
+
+def readReport(file):
+	# Reads a per-node report written by writeReport
+	report = []
+	for line in list(file)[1:]:
+		values = line.strip().split(",")
+		if len(values) == len(REPORT_FIELDS):
+			report.append(dict(zip(REPORT_FIELDS, [float(values[0])] + [int(value) for value in values[1:4]] + [float(value) for value in values[4:]])))
+	return report
+
+def summarize(report):
+	# One line for the console: records removed and the worst volume and peak errors
+	recordsIn = sum(row["recordsIn"] for row in report)
+	removed = sum(row["removed"] for row in report)
+	volumeError = max([abs(row["volumeError"]) for row in report] or [0.0])
+	peakError = max([abs(row["peakError"]) for row in report] or [0.0])
+	return "removed {} of {} H records; max volume error {:.3%}, max peak error {:.3%}".format(removed, recordsIn, volumeError, peakError)
@@ -0,0 +1,90 @@
+# events.py
+
+# Multi-event workbooks: one hydrograph sheet per return period, named after the profile's sheet
+# (HYDROGRAPHS_10yr, HYDROGRAPHS_100yr, ...). The workbook is opened once, the surface row and
+# node ID layout are parsed once from the first event sheet and checked on the others, and each
+# sheet is converted to INFLOW_<suffix>_<event>.dat on a process pool.
+#	.xlsx - the parent reads the shared strings and the raw XML of each sheet out of the archive;
+#	        workers parse their own sheet
+#	.xls  - the parent loads the workbook with xlrd and hands each worker the rows of its sheet
+
+import os
+from .core import checkLayout, inflowPath, layoutHydrographs, sheetLayout, writeHydrographs
+from .layout import STANDARD, getProfile
+
+def eventSheets(sheetNames, profile=STANDARD):
+	# Returns [(sheetName, event)] for sheets named <profile sheet>_<event>
+	prefix = getProfile(profile).sheetName + "_"
+	return [(name, name[len(prefix):]) for name in sheetNames if name.startswith(prefix) and len(name) > len(prefix)]
+
+def eventPath(savefile, event):
+	# INFLOW_US.dat -> INFLOW_US_100yr.dat
+	return os.path.splitext(savefile)[0] + "_" + event + ".dat"
+
+def convertEventSheet(job):
+	# Converts one event sheet in a worker; returns (savefile, decimation report or None)
+	from . import readers
+	rows, xml, strings, profile, layout, savefile, decimation = job
+	if xml is not None:
+		import io
+		rows = list(readers.iterXlsxPart(io.BytesIO(xml), strings))
+	checkLayout(rows, layout)
+	with open(savefile,"w") as file:
+		report = writeHydrographs(file, *layoutHydrographs(rows, layout, profile), decimation=decimation)
+	if report is not None:
+		from .core import reportPath
+		from .decimate import writeReport
+		with open(reportPath(savefile),"w") as file:
+			writeReport(report, file)
+	return savefile, report
+
+def eventJobs(path, profile, savefile, decimation):
+	# Opens the workbook once and yields one job per event sheet
+	from . import readers
+	if os.path.splitext(path)[1].lower() in readers.XLSX_EXTENSIONS:
+		import zipfile
+		with zipfile.ZipFile(path) as archive:
+			parts = readers.xlsxSheetPaths(archive)
+			sheets = eventSheets(parts, profile)
+			if not sheets:
+				raise ValueError("No {}_<event> sheets in {}".format(profile.sheetName, path))
+			strings = readers.xlsxSharedStrings(archive)
+			layout = None
+			for sheetName, event in sheets:
+				xml = archive.read(parts[sheetName])
+				if layout is None:
+					import io
+					head = []
+					for row in readers.iterXlsxPart(io.BytesIO(xml), strings):
+						head.append(row)
+						if len(head) == 10:
+							break
+					layout = sheetLayout(head)
+				yield (None, xml, strings, profile, layout, eventPath(savefile, event), decimation)
+	else:
+		import xlrd
+		book = xlrd.open_workbook(path)
+		sheets = eventSheets(book.sheet_names(), profile)
+		if not sheets:
+			raise ValueError("No {}_<event> sheets in {}".format(profile.sheetName, path))
+		layout = None
+		for sheetName, event in sheets:
+			sheet = book.sheet_by_name(sheetName)
+			rows = [sheet.row_values(i) for i in range(sheet.nrows)]
+			if layout is None:
+				layout = sheetLayout(rows)
+			yield (rows, None, None, profile, layout, eventPath(savefile, event), decimation)
+
+def text2datEvents(path, profile=STANDARD, prompt=True, workers=None, decimation=None):
+	# Converts every <sheet>_<event> sheet of a workbook and returns the .dat paths written
+	# workers=1 converts the sheets in this process
+	profile = getProfile(profile)
+	savefile = inflowPath(path, prompt)
+	jobs = eventJobs(path, profile, savefile, decimation)
+	if workers == 1:
+		return [convertEventSheet(job)[0] for job in jobs]
+
+	from concurrent.futures import ProcessPoolExecutor
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+		futures = [pool.submit(convertEventSheet, job) for job in jobs]
+		return [future.result()[0] for future in futures]
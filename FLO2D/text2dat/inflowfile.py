@@ -0,0 +1,180 @@
+# inflowfile.py
+
+# Reads INFLOW.dat files back into per-node arrays for QA, diffing and plotting.
+#	readInflowDat   - scans the text through a memory map in newline-aligned chunks and parses
+#	                  every number of a chunk in one numpy call; F and C lines start a node, H lines
+#	                  add a time/flow pair, anything else (header, R lines) is skipped
+#	saveInflowStore - writes a compact binary sidecar (.hydb) next to the .dat
+#	loadInflowStore - memory-maps the sidecar, so arrays are views into the file (zero-copy)
+#	loadInflow      - uses the sidecar when it still matches the .dat, otherwise rebuilds it
+#
+# InflowData holds every node in contiguous arrays: node k's hydrograph is
+# time[offsets[k]:offsets[k + 1]] and flow[offsets[k]:offsets[k + 1]].
+
+#	Sidecar layout (little-endian, 8-byte aligned):
+#	  8s  magic b"INFLOWB1"
+#	  u8  number of nodes, u8 number of H records, u8 size and i8 mtime_ns of the source .dat
+#	  i8  node IDs[nodes], i8 offsets[nodes + 1], f8 time[records], f8 flow[records]
+
+import mmap, os, warnings
+from collections import namedtuple
+
+InflowData = namedtuple("InflowData", ["nodeIds", "offsets", "time", "flow"])
+
+MAGIC = b"INFLOWB1"
+HEADER = 40
+STORE_EXTENSION = ".hydb"
+
+# Bytes parsed per chunk of a large file
+CHUNK = 64 << 20
+
+def nodeHydrograph(data, nodeId):
+	# Returns (time, flow) for one node ID
+	import numpy as np
+	k = np.flatnonzero(data.nodeIds == nodeId)
+	if not len(k):
+		raise KeyError(nodeId)
+	start, end = data.offsets[k[0]], data.offsets[k[0] + 1]
+	return data.time[start:end], data.flow[start:end]
+
+def parseChunk(chunk):
+	# Returns (record types, first numbers, second numbers) for the F/C/H lines of a chunk of text
+	import numpy as np
+	buffer = np.frombuffer(chunk, dtype=np.uint8)
+	starts = np.concatenate(([0], np.flatnonzero(buffer[:-1] == 10) + 1))
+	starts = starts[starts < len(buffer)]
+	# The first character of each line is its record type; blank lines and headers are dropped
+	kinds = buffer[starts]
+	wanted = np.isin(kinds, np.frombuffer(b"FCH", dtype=np.uint8))
+	if not wanted.all():
+		ends = np.concatenate((starts[1:], [len(buffer)]))
+		chunk = b"".join([chunk[a:b] for a, b in zip(starts[wanted], ends[wanted])])
+		kinds = kinds[wanted]
+	text = chunk.translate(bytes.maketrans(b"FCH", b"   ")).decode("ascii")
+	with warnings.catch_warnings():
+		# fromstring warns and stops at the first bad number; the count check below reports it
+		warnings.simplefilter("ignore", DeprecationWarning)
+		try:
+			numbers = np.fromstring(text, dtype=np.float64, sep=" ")
+		except ValueError:
+			numbers = np.empty(0)
+	if len(numbers) != 2 * len(kinds):
+		raise ValueError("Every F, C and H record must have exactly two numbers")
+	numbers = numbers.reshape(-1, 2)
+	return kinds, numbers[:,0], numbers[:,1]
+
+def readInflowDat(path):
+	# Parses an INFLOW.dat file into an InflowData
+	import numpy as np
+	kinds, first, second = [], [], []
+	with open(path, "rb") as file:
+		size = os.fstat(file.fileno()).st_size
+		if size:
+			with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+				start = 0
+				while start < size:
+					end = min(start + CHUNK, size)
+					if end < size:
+						end = view.rfind(b"\n", start, end) + 1 or size
+					chunkKinds, chunkFirst, chunkSecond = parseChunk(view[start:end])
+					kinds.append(chunkKinds)
+					first.append(chunkFirst)
+					second.append(chunkSecond)
+					start = end
+	if not kinds:
+		return InflowData(np.empty(0, np.int64), np.zeros(1, np.int64), np.empty(0), np.empty(0))
+	kinds = np.concatenate(kinds)
+	first = np.concatenate(first)
+	second = np.concatenate(second)
+
+	isNode = kinds != ord("H")
+	if len(kinds) and not isNode[0]:
+		raise ValueError("H record before the first F record in " + path)
+	# Each H record belongs to the node of the last F/C record before it
+	nodeLines = np.flatnonzero(isNode)
+	nodeIds = second[nodeLines].astype(np.int64)
+	offsets = np.append(nodeLines - np.arange(len(nodeLines)), len(kinds) - len(nodeLines)).astype(np.int64)
+	return InflowData(nodeIds, offsets, first[~isNode], second[~isNode])
+
+def storePath(path):
+	return os.path.splitext(path)[0] + STORE_EXTENSION
+
+def saveInflowStore(data, path, source=None):
+	# Writes data to the binary sidecar at path; source is the .dat it was read from, if any
+	import numpy as np
+	size, mtime = 0, 0
+	if source is not None:
+		status = os.stat(source)
+		size, mtime = status.st_size, status.st_mtime_ns
+	header = np.array([len(data.nodeIds), len(data.time), size], dtype="<u8").tobytes() + np.array([mtime], dtype="<i8").tobytes()
+	with open(path + ".tmp", "wb") as file:
+		file.write(MAGIC + header)
+		for array, dtype in zip(data, ("<i8", "<i8", "<f8", "<f8")):
+			file.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+	os.replace(path + ".tmp", path)
+
+def storeSource(path):
+	# Returns (size, mtime_ns) of the .dat recorded in a sidecar
+	import numpy as np
+	with open(path, "rb") as file:
+		header = file.read(HEADER)
+	if len(header) != HEADER or header[:8] != MAGIC:
+		raise ValueError("Not an INFLOW binary store: " + path)
+	return int(np.frombuffer(header, "<u8", 1, 24)[0]), int(np.frombuffer(header, "<i8", 1, 32)[0])
+
+def loadInflowStore(path):
+	# Memory-maps a binary sidecar; the returned arrays are read-only views into the file
+	import numpy as np
+	with open(path, "rb") as file:
+		header = file.read(HEADER)
+	if len(header) != HEADER or header[:8] != MAGIC:
+		raise ValueError("Not an INFLOW binary store: " + path)
+	nodes, records = (int(n) for n in np.frombuffer(header, "<u8", 2, 8))
+	if nodes + records == 0:
+		return InflowData(np.empty(0, np.int64), np.zeros(1, np.int64), np.empty(0), np.empty(0))
+	view = np.memmap(path, dtype=np.uint8, mode="r")
+	arrays = []
+	offset = HEADER
+	for dtype, count in (("<i8", nodes), ("<i8", nodes + 1), ("<f8", records), ("<f8", records)):
+		arrays.append(view[offset:offset + 8 * count].view(dtype))
+		offset += 8 * count
+	return InflowData(*arrays)
+
+def loadInflow(path, useStore=True):
+	# Loads an INFLOW.dat through its sidecar, rebuilding the sidecar when the .dat has changed
+	sidecar = storePath(path)
+	if useStore and os.path.isfile(sidecar):
+		try:
+			status = os.stat(path)
+			if storeSource(sidecar) == (status.st_size, status.st_mtime_ns):
+				return loadInflowStore(sidecar)
+		except (OSError, ValueError):
+			pass
+	data = readInflowDat(path)
+	if useStore:
+		saveInflowStore(data, sidecar, path)
+	return data
+
+def diffInflow(a, b, tolerance=0.005):
+	# Compares two InflowData node by node; returns [(nodeId, status, max time diff, max flow diff)]
+	# status is "same", "different", "length", "missing" (only in a) or "added" (only in b)
+	import numpy as np
+	result = []
+	positionsB = {int(nodeId): k for k, nodeId in enumerate(b.nodeIds)}
+	for k, nodeId in enumerate(a.nodeIds):
+		nodeId = int(nodeId)
+		if nodeId not in positionsB:
+			result.append((nodeId, "missing", None, None))
+			continue
+		j = positionsB.pop(nodeId)
+		timeA, flowA = a.time[a.offsets[k]:a.offsets[k + 1]], a.flow[a.offsets[k]:a.offsets[k + 1]]
+		timeB, flowB = b.time[b.offsets[j]:b.offsets[j + 1]], b.flow[b.offsets[j]:b.offsets[j + 1]]
+		if len(timeA) != len(timeB):
+			result.append((nodeId, "length", None, None))
+			continue
+		timeDiff = float(np.max(np.abs(timeA - timeB))) if len(timeA) else 0.0
+		flowDiff = float(np.max(np.abs(flowA - flowB))) if len(flowA) else 0.0
+		result.append((nodeId, "same" if max(timeDiff, flowDiff) <= tolerance else "different", timeDiff, flowDiff))
+	for nodeId in positionsB:
+		result.append((nodeId, "added", None, None))
+	return result
@@ -0,0 +1,27 @@
+# layout.py
+
+# Layout profiles for the HYDROGRAPHS sheet. The standard layout reads time from column 1 (B)
+# down to the last row of the sheet; the Denver FLO-2D layout (formerly text2dat_DenverFLO2D.py)
+# reads time from column 2 (C) and stops at row 58.
+
+from collections import namedtuple
+
+# name      - recorded in INFLOW_manifest.json so a cached .dat is redone when the profile changes
+# timeCol   - column holding the hydrograph time
+# rowLimit  - exclusive sheet row index to stop reading at, or None for the whole sheet
+# sheetName - sheet holding the hydrographs
+LayoutProfile = namedtuple("LayoutProfile", ["name", "timeCol", "rowLimit", "sheetName"])
+
+STANDARD = LayoutProfile("standard", 1, None, "HYDROGRAPHS")
+DENVER = LayoutProfile("denver", 2, 58, "HYDROGRAPHS")
+
+PROFILES = {profile.name: profile for profile in (STANDARD, DENVER)}
+
+def getProfile(profile):
+	# Accepts a LayoutProfile or the name of one
+	if isinstance(profile, LayoutProfile):
+		return profile
+	try:
+		return PROFILES[profile]
+	except KeyError:
+		raise ValueError("Unknown layout profile {!r}; expected one of {}".format(profile, ", ".join(PROFILES)))
@@ -0,0 +1,138 @@
+# readers.py
+
+# Row readers for the HYDROGRAPHS sheet. Each returns rows as lists of the values xlrd would give
+# (float, str, or '' for an empty cell), including empty rows so indexes match the sheet.
+#	.xlsx - the sheet XML is parsed incrementally straight out of the zip archive
+#	.xls  - xlrd has no row streaming for BIFF files, so only the requested sheet is loaded
+#	        (on_demand) and it is released as soon as its rows have been read
+# The zip/XML and xlrd modules are imported on first use, so only the format actually read
+# pays for its reader.
+
+import os, posixpath
+
+MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+DOCRELS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+XLSX_EXTENSIONS = (".xlsx", ".xlsm")
+
+def columnIndex(reference):
+	# 'AB12' -> 27
+	index = 0
+	for char in reference:
+		if char.isalpha():
+			index = index * 26 + ord(char.upper()) - 64
+		else:
+			break
+	return index - 1
+
+def xlsxSheetPaths(archive):
+	# Maps each sheet name to its part name through workbook.xml and its relationships
+	import xml.etree.ElementTree as ET
+	targets = {}
+	relations = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+	for relation in relations.iter(RELS + "Relationship"):
+		target = relation.get("Target")
+		if target.startswith("/"):
+			targets[relation.get("Id")] = target[1:]
+		else:
+			targets[relation.get("Id")] = posixpath.normpath(posixpath.join("xl", target))
+	workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+	return {sheet.get("name"): targets.get(sheet.get(DOCRELS + "id")) for sheet in workbook.iter(MAIN + "sheet")}
+
+def xlsxSharedStrings(archive):
+	# Reads the shared string table incrementally
+	import xml.etree.ElementTree as ET
+	strings = []
+	if "xl/sharedStrings.xml" not in archive.namelist():
+		return strings
+	with archive.open("xl/sharedStrings.xml") as part:
+		table = None
+		for event, element in ET.iterparse(part, ("start", "end")):
+			if event == "start":
+				if element.tag == MAIN + "sst":
+					table = element
+				continue
+			if element.tag == MAIN + "si":
+				strings.append("".join(text.text or "" for text in element.iter(MAIN + "t")))
+				table.remove(element)
+	return strings
+
+def cellValue(cell, strings):
+	# Converts one <c> element to the value xlrd would give: float, str or '' when empty
+	cellType = cell.get("t", "n")
+	if cellType == "inlineStr":
+		return "".join(text.text or "" for text in cell.iter(MAIN + "t"))
+	value = cell.find(MAIN + "v")
+	if value is None or value.text is None:
+		return ''
+	if cellType == "s":
+		return strings[int(value.text)]
+	if cellType in ("str", "e"):
+		return value.text
+	return float(value.text)
+
+def iterXlsxPart(part, strings):
+	# Yields the rows of one worksheet XML part. Each row is removed from sheetData once read, so
+	# the tree iterparse builds stays a few elements deep and wide whatever the size of the sheet.
+	import xml.etree.ElementTree as ET
+	nextRow = 0
+	sheetData = None
+	for event, element in ET.iterparse(part, ("start", "end")):
+		if event == "start":
+			if element.tag == MAIN + "sheetData":
+				sheetData = element
+			continue
+		if element.tag != MAIN + "row":
+			continue
+		rowNumber = int(element.get("r", nextRow + 1)) - 1
+		while nextRow < rowNumber:
+			yield []
+			nextRow += 1
+		values = []
+		for cell in element.iter(MAIN + "c"):
+			reference = cell.get("r")
+			if reference is not None:
+				j = columnIndex(reference)
+				values.extend([''] * (j - len(values)))
+			values.append(cellValue(cell, strings))
+		if sheetData is not None:
+			sheetData.remove(element)
+		element.clear()
+		nextRow = rowNumber + 1
+		yield values
+
+def iterXlsxRows(path, sheetName):
+	import zipfile
+	with zipfile.ZipFile(path) as archive:
+		sheetPath = xlsxSheetPaths(archive).get(sheetName)
+		if sheetPath is None:
+			raise ValueError("No sheet named " + sheetName)
+		strings = xlsxSharedStrings(archive)
+		with archive.open(sheetPath) as part:
+			for row in iterXlsxPart(part, strings):
+				yield row
+
+def iterXlsRows(path, sheetName):
+	import xlrd
+	book = xlrd.open_workbook(path, on_demand=True)
+	try:
+		sheet = book.sheet_by_name(sheetName)
+		for i in range(sheet.nrows):
+			yield sheet.row_values(i)
+		book.unload_sheet(sheetName)
+	finally:
+		book.release_resources()
+
+def iterSheetRows(path, sheetName="HYDROGRAPHS"):
+	if os.path.splitext(path)[1].lower() in XLSX_EXTENSIONS:
+		return iterXlsxRows(path, sheetName)
+	return iterXlsRows(path, sheetName)
+
+def readSheet(path, sheetName="HYDROGRAPHS"):
+	# Loads the whole sheet as a list of rows
+	if os.path.splitext(path)[1].lower() in XLSX_EXTENSIONS:
+		return list(iterXlsxRows(path, sheetName))
+	import xlrd
+	sheet = xlrd.open_workbook(path).sheet_by_name(sheetName)
+	return [sheet.row_values(i) for i in range(sheet.nrows)]
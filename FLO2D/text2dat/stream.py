@@ -0,0 +1,83 @@
+# stream.py
+
+# Streaming INFLOW.dat writer used by text2dat(path, stream=True). Memory stays flat however long
+# the hydrographs are: rows are spooled as float64 to a temporary file and written back out one
+# inflow node at a time through a memory map, so the output is byte-identical to the in-memory
+# conversion.
+
+import tempfile
+
+# Number of rows spooled or formatted per block
+CHUNK = 8192
+
+def cell(row, j):
+	# Missing trailing cells read as empty, like a padded xlrd row
+	return row[j] if j < len(row) else ''
+
+def isSurfaceRow(row):
+	return (cell(row,0) == 0 and cell(row,1) == 0) or (cell(row,0) == "0" and cell(row,1) == "0")
+
+def writeInflowStream(rows, file, profile, decimation=None):
+	# Writes the F/H records for an iterable of sheet rows to any file-like object
+	# With a decimate.Decimation each node is read back whole, decimated, and its report row returned
+	import numpy as np
+
+	previous = None
+	surfaceRow = None
+	columns = None
+	spool = tempfile.TemporaryFile()
+	try:
+		block = []
+		count = 0
+		for i, row in enumerate(rows):
+			if profile.rowLimit is not None and i >= profile.rowLimit:
+				break
+			if surfaceRow is None:
+				if i >= 10:
+					break
+				if not isSurfaceRow(row):
+					previous = row
+					continue
+				if previous is None:
+					raise ValueError("No node ID row above the surface flow row")
+				surfaceRow = i
+				header = previous
+				columns = [j for j in range(0,len(header)) if header[j] != '']
+			# Insures empty rows are not read in
+			if cell(row,1) == '':
+				continue
+			block.append([float(cell(row,profile.timeCol))] + [float(cell(row,j)) for j in columns])
+			if len(block) == CHUNK:
+				np.array(block, dtype=np.float64).tofile(spool)
+				count += len(block)
+				block = []
+		if surfaceRow is None:
+			raise ValueError("Surface flow row (0, 0) not found in the first 10 rows")
+		if block:
+			np.array(block, dtype=np.float64).tofile(spool)
+			count += len(block)
+		spool.flush()
+
+		# Writes each inflow node from the spooled columns, one block of rows at a time
+		spooled = None
+		if count:
+			spooled = np.memmap(spool, dtype=np.float64, mode="r", shape=(count, len(columns) + 1))
+		report = [] if decimation is not None else None
+		for k, j in enumerate(columns):
+			if decimation is not None:
+				from .core import writeNode
+				from .decimate import decimateNode
+				time = np.array(spooled[:,0]) if count else np.empty(0)
+				flow = np.array(spooled[:,k + 1]) if count else np.empty(0)
+				time, flow, nodeReport = decimateNode(float(header[j]), time, flow, decimation)
+				writeNode(file, float(header[j]), time, flow)
+				report.append(nodeReport)
+				continue
+			file.write("F	0	%.0f\n" % float(header[j]))
+			for start in range(0, count, CHUNK):
+				hydrograph = spooled[start:start + CHUNK, [0, k + 1]]
+				file.write(("H	%.2f	%.2f\n" * len(hydrograph)) % tuple(hydrograph.ravel().tolist()))
+		del spooled
+		return report
+	finally:
+		spool.close()
@@ -0,0 +1,248 @@
+# watch.py
+
+# Watch-folder mode: converts hydrograph workbooks as CUHP runs drop them into a project folder.
+#	- the folder is polled every interval seconds (watchdog, when installed, only wakes the poll
+#	  early, so plain polling is always the fallback)
+#	- a workbook is queued once its size and modification time have not changed for settle
+#	  seconds, so partially written files are left alone
+#	- at most workers conversions run at once on a process pool; the rest wait in the queue
+#	- each worker process keeps the sheet layout of every workbook it has converted, so a
+#	  re-saved workbook skips the surface row search when its node IDs have not moved
+#	- INFLOW files are written to a temporary name and renamed into place
+#	- INFLOW_manifest.json (see cache.py) stops unchanged workbooks being converted again, also
+#	  across restarts
+#	- INFLOW_status.json reports queue depth, running conversions, per-file latency and errors; it
+#	  is rewritten only when its content changes, and watchdog only wakes the poll for workbook
+#	  changes, so the tool's own status, INFLOW and manifest writes do not wake it
+
+import collections, json, os, threading, time
+from . import cache as inflowCache
+from .batch import findWorkbooks
+from .core import cacheVariant, inflowPath
+from .layout import STANDARD, getProfile
+
+STATUS = "INFLOW_status.json"
+
+# Layout of each workbook converted by this worker process
+LAYOUTS = {}
+
+# Errors kept in the status file
+MAX_ERRORS = 20
+
+def atomicWrite(path, write):
+	# Calls write(file) on a temporary file and renames it over path once it is complete
+	temporary = path + ".tmp"
+	try:
+		with open(temporary,"w") as file:
+			write(file)
+		os.replace(temporary, path)
+	finally:
+		if os.path.exists(temporary):
+			os.remove(temporary)
+
+def convertWatched(job):
+	# Converts one workbook in a worker process; returns (savefile, seconds, skipped, workbookHash)
+	from . import readers
+	from .core import checkLayout, layoutHydrographs, reportPath, sheetLayout, writeHydrographs, writeInflow
+	path, profileName, stream, decimation, manifest = job
+	profile = getProfile(profileName)
+	start = time.perf_counter()
+	savefile = inflowPath(path, prompt=False)
+	workbookHash = inflowCache.fileHash(path)
+	if manifest is not None and inflowCache.isCurrent(manifest, path, cacheVariant(profile, decimation), savefile, workbookHash):
+		return savefile, time.perf_counter() - start, True, workbookHash
+
+	report = []
+	if stream:
+		atomicWrite(savefile, lambda file: report.append(writeInflow(path, file, profile, True, decimation)))
+	else:
+		rows = readers.readSheet(path, profile.sheetName)
+		layout = LAYOUTS.get(path)
+		try:
+			if layout is None:
+				raise ValueError("Layout not parsed yet")
+			checkLayout(rows, layout)
+		except ValueError:
+			layout = LAYOUTS[path] = sheetLayout(rows)
+		hydrographs = layoutHydrographs(rows, layout, profile)
+		atomicWrite(savefile, lambda file: report.append(writeHydrographs(file, *hydrographs, decimation=decimation)))
+	if report[0] is not None:
+		from .decimate import writeReport
+		atomicWrite(reportPath(savefile), lambda file: writeReport(report[0], file))
+	return savefile, time.perf_counter() - start, False, workbookHash
+
+def isWorkbook(path):
+	# The files findWorkbooks picks up: .xls/.xlsx, not Excel lock files
+	fileName = os.path.basename(path or "")
+	return fileName.lower().endswith((".xls", ".xlsx")) and not fileName.startswith("~$")
+
+def wakes(change):
+	# Whether a watchdog event can change what scan() sees; a rename counts by its new name
+	return isWorkbook(change.src_path) or isWorkbook(getattr(change, "dest_path", None))
+
+def startWakeup(folder, event):
+	# Sets event whenever watchdog sees a change in folder; returns the observer, or None without watchdog
+	try:
+		from watchdog.events import FileSystemEventHandler
+		from watchdog.observers import Observer
+	except ImportError:
+		return None
+
+	class Handler(FileSystemEventHandler):
+		def on_any_event(self, change):
+			if wakes(change):
+				event.set()
+
+	observer = Observer()
+	observer.schedule(Handler(), folder, recursive=False)
+	observer.daemon = True
+	observer.start()
+	return observer
+
+class FolderWatcher:
+	# Polls folder and converts workbooks on a bounded process pool; call poll() repeatedly or run()
+
+	def __init__(self, folder, profile=STANDARD, workers=None, settle=5.0, stream=False, decimation=None, statusPath=None):
+		from concurrent.futures import ProcessPoolExecutor
+		self.folder = os.path.abspath(folder)
+		self.profile = getProfile(profile)
+		self.workers = workers or os.cpu_count() or 1
+		self.settle = settle
+		self.stream = stream
+		self.decimation = decimation
+		self.statusPath = statusPath or os.path.join(self.folder, STATUS)
+		self.variant = cacheVariant(self.profile, decimation)
+		self.manifest = inflowCache.loadManifest(self.folder)
+		self.pool = ProcessPoolExecutor(max_workers=self.workers)
+		# path -> (size, mtime_ns, time first seen with that signature)
+		self.seen = {}
+		# path -> signature last converted or found current
+		self.done = {}
+		# (path, signature, time queued) waiting for a worker
+		self.queue = collections.deque()
+		# future -> (path, signature, time queued)
+		self.running = {}
+		self.files = {}
+		self.errors = collections.deque(maxlen=MAX_ERRORS)
+		self.converted = 0
+		self.unchanged = 0
+		self.failed = 0
+		self.latencies = collections.deque(maxlen=100)
+		# Status last written, without its time
+		self.written = None
+
+	def scan(self, now):
+		# Queues every workbook whose signature has been stable for settle seconds
+		present = set()
+		for path in findWorkbooks(self.folder):
+			present.add(path)
+			try:
+				status = os.stat(path)
+			except OSError:
+				continue
+			signature = (status.st_size, status.st_mtime_ns)
+			previous = self.seen.get(path)
+			if previous is None or previous[:2] != signature:
+				self.seen[path] = signature + (now,)
+				continue
+			if now - previous[2] < self.settle or self.done.get(path) == signature:
+				continue
+			if any(item[0] == path for item in self.queue) or any(item[0] == path for item in self.running.values()):
+				continue
+			self.queue.append((path, signature, now))
+			self.files[os.path.basename(path)] = {"status": "queued"}
+		for path in list(self.seen):
+			if path not in present:
+				del self.seen[path]
+
+	def submit(self):
+		while self.queue and len(self.running) < self.workers:
+			path, signature, queued = self.queue.popleft()
+			job = (path, self.profile.name, self.stream, self.decimation, self.manifest)
+			self.running[self.pool.submit(convertWatched, job)] = (path, signature, queued)
+			self.files[os.path.basename(path)] = {"status": "running"}
+
+	def collect(self, now):
+		changed = False
+		for future in [future for future in self.running if future.done()]:
+			path, signature, queued = self.running.pop(future)
+			name = os.path.basename(path)
+			try:
+				savefile, seconds, skipped, workbookHash = future.result()
+			except Exception as e:
+				self.failed += 1
+				error = "{}: {}".format(type(e).__name__, e)
+				self.errors.append({"file": name, "error": error, "time": time.time()})
+				self.files[name] = {"status": "failed", "error": error}
+				# Not retried until the workbook changes again
+				self.done[path] = signature
+				continue
+			self.done[path] = signature
+			if skipped:
+				self.unchanged += 1
+				self.files[name] = {"status": "unchanged", "output": os.path.basename(savefile)}
+				continue
+			latency = now - queued
+			self.converted += 1
+			self.latencies.append(latency)
+			self.files[name] = {"status": "converted", "output": os.path.basename(savefile), "seconds": round(seconds, 3), "latency": round(latency, 3), "finished": time.time()}
+			inflowCache.record(self.manifest, path, self.variant, savefile, workbookHash)
+			changed = True
+		if changed:
+			inflowCache.saveManifest(self.folder, self.manifest)
+
+	def status(self):
+		return {
+			"folder": self.folder,
+			"updated": time.time(),
+			"queueDepth": len(self.queue),
+			"running": len(self.running),
+			"converted": self.converted,
+			"unchanged": self.unchanged,
+			"failed": self.failed,
+			"meanLatency": round(sum(self.latencies) / len(self.latencies), 3) if self.latencies else None,
+			"files": self.files,
+			"errors": list(self.errors),
+		}
+
+	def writeStatus(self):
+		# Writes the status file when anything but its time has changed since the last write
+		status = self.status()
+		content = json.dumps(dict(status, updated=None), sort_keys=True)
+		if content == self.written and os.path.exists(self.statusPath):
+			return
+		atomicWrite(self.statusPath, lambda file: json.dump(status, file, indent=1))
+		self.written = content
+
+	def poll(self, now=None):
+		# One scan/submit/collect cycle
+		now = time.monotonic() if now is None else now
+		self.collect(now)
+		self.scan(now)
+		self.submit()
+		self.writeStatus()
+
+	def idle(self):
+		return not self.queue and not self.running
+
+	def run(self, interval=2.0):
+		# Polls until interrupted (Ctrl+C)
+		wakeup = threading.Event()
+		observer = startWakeup(self.folder, wakeup)
+		print("\n Watching {} ({}); press Ctrl+C to stop\n".format(self.folder, "watchdog" if observer else "polling"))
+		try:
+			while True:
+				self.poll()
+				wakeup.wait(interval if self.idle() else min(interval, 0.25))
+				wakeup.clear()
+		except KeyboardInterrupt:
+			pass
+		finally:
+			if observer is not None:
+				observer.stop()
+			self.close()
+
+	def close(self):
+		self.pool.shutdown(wait=True)
+		self.collect(time.monotonic())
+		self.writeStatus()
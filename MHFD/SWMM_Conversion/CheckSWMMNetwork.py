@@ -0,0 +1,98 @@
+# CheckSWMMNetwork.py
+# Description: This script will check the drainage network of a project GDB created with the
+#   SWIMM to GDB tool, instead of checking design points and peak flow continuity by eye. The
+#   network is built from the INLETNODE/OUTLETNODE of the conduits and outlets (see
+#   swmmnetwork.py) and
+#       - flags links whose downstream node has a lower discharge than the upstream node, for each
+#         existing and future discharge field (drops below storages and dividers are expected)
+#       - suggests design points at confluences and outfalls, from the tributary area of each node
+#         (the subcatchment areas of the SWIMM model, or the number of upstream nodes without it)
+#       - reports links to missing nodes and nodes caught in loops
+#   With Fill DESIGNPT the suggested design points whose DESIGNPT is blank are labelled DP1, DP2,
+#   ... in upstream to downstream order; labels already entered are kept.
+
+# Inputs:
+    # Project GDB: project GDB created with SWIMM to GDB tool (or a .gpkg/.sqlite stand-in, see
+    #   gisbackend.py)
+    # SWIMM model (optional): .inp file, for the subcatchment area draining to each node
+    # Minimum branch area (optional): tributary area (acres, or upstream nodes without a model) a
+    #   branch needs to make a confluence a design point, default 0
+    # Fill DESIGNPT (optional): true to write the suggested design points
+
+# Output: messages, and DESIGNPT labels when Fill DESIGNPT is true
+
+# Command line (without ArcGIS, against a .gpkg/.sqlite copy of the project):
+#   python CheckSWMMNetwork.py Project.gpkg [Model.inp] [MinimumArea] [true]
+
+######################################################################################################
+
+import time
+import numpy as np
+from gisbackend import openBackend, toolParameters
+from resultmapping import DEFAULT_MAPPING, dischargeFields
+from swmmnetwork import NODE_FEATURES, fromInp, fromLayers
+from tracing import report
+
+# Flagged links listed per discharge field
+LISTED = 10
+
+def tributaryWeights(network, inpPath):
+    # Subcatchment area draining to each node, or one per node without a model
+    if not inpPath:
+        return np.ones(len(network))
+    modelNetwork, modelArea = fromInp(inpPath)
+    return np.array([modelArea[modelNetwork.index[name]] if name in modelNetwork.index else 0.0 for name in network.nodes])
+
+def labelDesignPoints(backend, names):
+    # DESIGNPT = DP1, DP2, ... for the named nodes whose DESIGNPT is blank, skipping labels in use
+    used = set()
+    for feature in NODE_FEATURES:
+        if backend.listFields(feature):
+            used.update(label.strip() for name, label in backend.readRows(feature, ["NAME", "DESIGNPT"]) if label)
+    labels, number = {}, 0
+    for name in names:
+        number += 1
+        while "DP{}".format(number) in used:
+            number += 1
+        labels[name] = "DP{}".format(number)
+
+    def update(row):
+        name = row[0].strip() if isinstance(row[0], str) else row[0]
+        if name not in labels or (row[1] or "").strip():
+            return None
+        return (row[0], labels[name])
+
+    return sum(backend.updateRows(feature, ["NAME", "DESIGNPT"], update) for feature in NODE_FEATURES if backend.listFields(feature))
+
+def checkNetwork(backend, inpPath="", minArea=0.0, fill=False):
+    start = time.perf_counter()
+    fields = dischargeFields(DEFAULT_MAPPING)
+    network, discharges = fromLayers(backend, fields)
+    levels, cyclic = network.order()
+    backend.message("\nNetwork of {} nodes and {} links built in {:.2f} s\n".format(len(network), len(network.links), time.perf_counter() - start))
+    if network.dangling:
+        backend.message("{} links to nodes that are not in the project GDB: {}".format(len(network.dangling), ", ".join(network.dangling[:LISTED])))
+    if len(cyclic):
+        backend.message("{} nodes in or below a loop: {}".format(len(cyclic), ", ".join(network.nodes[i] for i in cyclic[:LISTED])))
+
+    backend.message("\nDischarge decreasing downstream\n")
+    for field in fields:
+        q = discharges[field]
+        flagged = network.decreasingFlows(q)
+        if not len(flagged):
+            continue
+        backend.message("{}: {} links".format(field, len(flagged)))
+        for link in flagged[:LISTED]:
+            source, target = network.source[link], network.target[link]
+            backend.message("    {} {} {:.1f} -> {} {:.1f}".format(network.links[link], network.nodes[source], q[source], network.nodes[target], q[target]))
+
+    area = tributaryWeights(network, inpPath)
+    suggested = [network.nodes[i] for i in network.designPoints(area, minArea)]
+    backend.message("\n{} suggested design points: {}".format(len(suggested), ", ".join(suggested[:LISTED * 5])))
+    if fill:
+        backend.message("DESIGNPT filled on {} nodes".format(labelDesignPoints(backend, suggested)))
+    report(backend)
+
+if __name__ == "__main__":
+    GDB, inpPath, minArea, fill = toolParameters(4)
+    checkNetwork(openBackend(GDB), inpPath, float(minArea or 0), fill.lower() == "true")
@@ -0,0 +1,120 @@
+# CompareScenarios.py
+# Description: This script will compare the existing and future discharges filled by
+#   PopulateSWMMResults, instead of field calculations by hand one feature class at a time. The
+#   Q_Ex_* and Q_Fut_* fields of all six feature classes are read in one pass each into NumPy
+#   arrays, and for every return period the change (future - existing) and the percent change
+#   (of existing) are computed at once. An element is flagged for a return period when both the
+#   change and the percent change reach the thresholds (either direction).
+#   Written to the project GDB:
+#       ScenarioComparison  one row per feature class and return period: elements compared and
+#                           flagged, total existing and future discharge, mean and largest change
+#       NodeDeltas          the nodes, and LinkDeltas the links, with D_<period> (change),
+#                           P_<period> (percent change) and FLAGGED (number of return periods
+#                           flagged) of every element
+#   Elements with a blank discharge in either scenario are not compared for that return period;
+#   the percent change is blank where the existing discharge is 0.
+
+# Inputs:
+    # Project GDB: project GDB created with SWIMM to GDB tool and populated with SWMM results (or
+    #   a .gpkg/.sqlite stand-in, see gisbackend.py)
+    # Change threshold (optional): change in cfs an element must reach to be flagged, default 10
+    # Percent threshold (optional): percent change an element must reach to be flagged, default 10
+
+# Output: ScenarioComparison table and NodeDeltas / LinkDeltas feature classes within project GDB
+
+# Command line (without ArcGIS, against a .gpkg/.sqlite copy of the project):
+#   python CompareScenarios.py Project.gpkg [10] [10]
+
+######################################################################################################
+
+import time
+import numpy as np
+from gisbackend import GEOMETRY_WKB, openBackend, toolParameters
+from mhfdschema import Field, doubleField, textField
+from resultmapping import FEATURE_SOURCES, LINK, NODE, PERIODS
+from SWMMtoGDB import SPATIAL_REFERENCE
+from tracing import report
+
+EXISTING, FUTURE = "Q_Ex_", "Q_Fut_"
+
+SUMMARY_TABLE = "ScenarioComparison"
+DELTA_LAYERS = {LINK: ("LinkDeltas", "POLYLINE"), NODE: ("NodeDeltas", "POINT")}
+
+SUMMARY_FIELDS = [textField("FEATURE", 50), textField("PERIOD", 10), Field("COMPARED", "LONG", None, None, None, None), Field("FLAGGED", "LONG", None, None, None, None),
+                  doubleField("SUM_EX"), doubleField("SUM_FUT"), doubleField("MEAN_DELTA"), doubleField("MAX_DELTA"),
+                  doubleField("MIN_DELTA"), doubleField("MAX_PCT")]
+
+def deltaFields(periods):
+    return ([textField("NAME", 50), textField("FEATURE", 50)] + [doubleField("D_" + period) for period in periods]
+            + [doubleField("P_" + period) for period in periods] + [Field("FLAGGED", "SHORT", None, None, None, None)])
+
+def readDischarges(backend, feature, periods):
+    # (names, geometries, existing, future) of a feature class; discharges are (elements, periods)
+    # float arrays, NaN where blank
+    fields = ["NAME", GEOMETRY_WKB] + [EXISTING + period for period in periods] + [FUTURE + period for period in periods]
+    rows = list(backend.readRows(feature, fields))
+    names = [row[0] for row in rows]
+    geometries = [row[1] and bytes(row[1]) for row in rows]
+    values = np.array([row[2:] for row in rows], dtype=object).astype("f8").reshape(len(rows), 2 * len(periods))
+    return names, geometries, values[:, :len(periods)], values[:, len(periods):]
+
+def compare(existing, future, changeThreshold, percentThreshold):
+    # (change, percent change, flagged) arrays of existing and future discharges
+    change = future - existing
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = np.where(existing != 0, change / np.abs(existing) * 100.0, np.nan)
+    reaches = np.abs(change) >= changeThreshold
+    # Percent change is not defined from 0; the change threshold decides alone
+    reaches &= np.where(np.isnan(percent), True, np.abs(percent) >= percentThreshold)
+    flagged = reaches & ~np.isnan(change)
+    return change, percent, flagged
+
+def summarize(feature, periods, change, percent, flagged, existing, future):
+    # Summary rows of one feature class, one per return period
+    rows = []
+    for i, period in enumerate(periods):
+        valid = ~np.isnan(change[:, i])
+        column, percents = change[valid, i], np.abs(percent[valid, i])
+        percents = percents[~np.isnan(percents)]
+        statistics = [float(column.mean()), float(column.max()), float(column.min())] if len(column) else [None] * 3
+        rows.append([feature, period, int(valid.sum()), int(flagged[:, i].sum()), float(existing[valid, i].sum()),
+                     float(future[valid, i].sum())] + statistics + [float(percents.max()) if len(percents) else None])
+    return rows
+
+def blank(values):
+    # Rows of a float array as lists, with None for NaN
+    rows = values.astype(object)
+    rows[np.isnan(values)] = None
+    return rows.tolist()
+
+def compareScenarios(backend, changeThreshold=10.0, percentThreshold=10.0, periods=None):
+    start = time.perf_counter()
+    periods = periods or [suffix for suffix, column in PERIODS]
+    summary, deltas = [], {}
+    for feature, source in FEATURE_SOURCES.items():
+        if not backend.listFields(feature):
+            backend.message("{}: not in the project GDB, skipped".format(feature))
+            continue
+        names, geometries, existing, future = readDischarges(backend, feature, periods)
+        change, percent, flagged = compare(existing, future, changeThreshold, percentThreshold)
+        summary += summarize(feature, periods, change, percent, flagged, existing, future)
+        counts = flagged.sum(axis=1)
+        layer = deltas.setdefault(source, [])
+        layer += [[geometry, name, feature] + values + [count]
+                  for geometry, name, values, count in zip(geometries, names, blank(np.hstack([change, percent])), counts.tolist())]
+        backend.message("{}: {} elements, {} flagged in at least one return period".format(feature, len(names), int((counts > 0).sum())))
+
+    backend.createTable(SUMMARY_TABLE, SUMMARY_FIELDS)
+    backend.insertRows(SUMMARY_TABLE, [field.name for field in SUMMARY_FIELDS], summary)
+    fields = deltaFields(periods)
+    for source, rows in deltas.items():
+        name, geometryType = DELTA_LAYERS[source]
+        backend.createFeatureClass(name, geometryType, SPATIAL_REFERENCE, fields)
+        backend.insertRows(name, [GEOMETRY_WKB] + [field.name for field in fields], rows)
+    backend.message("\nCompared in {:.1f} s; summary written to {} and changes to {}".format(
+        time.perf_counter() - start, SUMMARY_TABLE, ", ".join(DELTA_LAYERS[source][0] for source in deltas)))
+    report(backend)
+
+if __name__ == "__main__":
+    GDB, changeThreshold, percentThreshold = toolParameters(3)
+    compareScenarios(openBackend(GDB), float(changeThreshold or 10), float(percentThreshold or 10))
@@ -0,0 +1,84 @@
+# PopulateMHFDBasin.py
+# Description: This script will populate the MHFDBASIN field that SWMMtoGDB adds to every feature
+#   class, with the ID of the MHFD basin each node and link falls in, instead of a spatial join by
+#   hand for each layer. Nodes are located by their point and links by the point half way along
+#   their length. The basin polygons are indexed once (see basinindex.py) and the points of every
+#   feature class are located in one batch; each feature class is then updated in a single pass.
+#   Features outside every basin get a blank (null) MHFDBASIN. Basin polygons delivered as a
+#   shapefile in another coordinate system are reprojected to Colorado Central first.
+
+# Inputs:
+    # Project GDB: project GDB created with SWIMM to GDB tool (or a .gpkg/.sqlite stand-in, see
+    #   gisbackend.py)
+    # MHFD basins: basin polygon shapefile, or a polygon feature class of the project GDB
+    # Basin ID field: numeric field of the basins holding the basin ID
+
+# Output: populated MHFDBASIN fields for all nodes and links within project GDB
+
+# Command line (without ArcGIS, against a .gpkg/.sqlite copy of the project):
+#   python PopulateMHFDBasin.py Project.gpkg Basins.shp BASIN_ID
+
+######################################################################################################
+
+from basinindex import BasinIndex, representativePoints
+from gisbackend import GEOMETRY_WKB, openBackend, toolParameters
+from tracing import report, step
+
+# Feature classes given a basin
+BASIN_FEATURES = ["Junctions", "Outfalls", "Storages", "Dividers", "Conduits", "Outlets"]
+
+def readBasins(backend, basins, idField):
+    # BasinIndex of the basin polygons, with numeric IDs
+    fields = [GEOMETRY_WKB, idField]
+    if basins.lower().endswith(".shp"):
+        from projection import transformer
+        prj = backend.sourceProjection(basins)
+        rows = backend.readSource(basins, fields, transformer(prj) if prj else None)
+    else:
+        rows = backend.readRows(basins, fields)
+    polygons, ids = [], []
+    for geometry, basin in rows:
+        try:
+            ids.append(None if basin is None else float(basin))
+        except ValueError:
+            raise ValueError("MHFDBASIN is numeric; {} value {!r} of {} is not a number".format(idField, basin, basins))
+        polygons.append(geometry and bytes(geometry))
+    return BasinIndex(polygons, ids)
+
+def populateBasins(backend, basins, idField, features=BASIN_FEATURES):
+    index = readBasins(backend, basins, idField)
+    backend.message("Indexed {} basins from {}\n".format(len(index.ids), basins))
+
+    # Names and geometry of every feature class, located in one batch
+    layers, blobs = [], []
+    for feature in features:
+        if not backend.listFields(feature):
+            backend.message("{}: not in the project GDB, skipped".format(feature))
+            continue
+        names = []
+        for name, geometry in backend.readRows(feature, ["NAME", GEOMETRY_WKB]):
+            names.append(name.strip() if isinstance(name, str) else name)
+            blobs.append(geometry and bytes(geometry))
+        layers.append((feature, names))
+    with step(backend, "locateBasins", basins) as info:
+        assigned = index.assign(representativePoints(blobs))
+        info["rows"] = len(assigned)
+
+    position = 0
+    for feature, names in layers:
+        basinOf = dict(zip(names, assigned[position:position + len(names)]))
+        position += len(names)
+
+        def update(row):
+            name = row[0].strip() if isinstance(row[0], str) else row[0]
+            basin = basinOf.get(name)
+            return None if row[1] == basin else (row[0], basin)
+
+        changed = backend.updateRows(feature, ["NAME", "MHFDBASIN"], update)
+        located = sum(basin is not None for basin in basinOf.values())
+        backend.message("{}: {} of {} features in a basin, {} updated".format(feature, located, len(names), changed))
+    report(backend)
+
+if __name__ == "__main__":
+    GDB, basins, idField = toolParameters(3)
+    populateBasins(openBackend(GDB), basins, idField)
@@ -2,445 +2,196 @@
 # Programmer: Cody Garcia - GIS Analyst; Icon Engineering, Inc.
 # Date: 4/27/2021
 # Description: This script will autopopulate discharge fields for existing and future conditions
-#   from link and node CSV files. Make sure to delete the last 5 fields in the CSV files that are
-#   completely blank (H through L). For some reason SWIMM has those as fields but they are blank.
+#   from link and node CSV files. The last 5 fields in the CSV files (H through L) are completely
+#   blank; for some reason SWIMM has those as fields, they are ignored when the CSVs are read.
+#   The CSVs are streamed once into columnar tables keyed by Link or Node (see swmmresults.py)
+#   instead of being imported to GDB tables, and each feature class is then updated in a single
+#   pass that writes all of its existing and future discharge fields.
 #   The links CSVs were used to populate discharge values for the conduits and outlets features.
 #   The nodes CSVs were used to populate discharges for the junctions, storages, dividers, and
 #   outfalls features.
-#   JOIN fields for links (in features "NAME", in CSVs "Link")
-#   JOIN fields for nodes (in features "NAME", in CSVs "Node")
+#   Match fields for links (in features "NAME", in CSVs "Link")
+#   Match fields for nodes (in features "NAME", in CSVs "Node")
+#   Features with no matching row in a CSV get blank (null) discharges for that scenario.
+#   Instead of exporting CSVs, a scenario can be given as a folder of SWMM binary output files, one
+#   per return period (e.g. Model_100yr.out); the link input is then the folder and the node input
+#   may be left blank. Peaks are read from the .out files directly (see swmmout.py).
+#   Which feature classes take links or nodes, the field prefix of each scenario and the CSV
+#   column of each return period are data in resultmapping.py; an optional mapping file adds
+#   scenarios (e.g. Fut_Detention) or return periods (e.g. WQ) without code changes. Every
+#   scenario and return period of a feature class is written in the same pass, and with a
+#   .gpkg/.sqlite project the feature classes are populated in parallel.
+#   Reruns are incremental (see resultstate.py): a scenario whose inputs did not change is not
+#   read again, and only the rows whose results changed are written.
 
 
 # Inputs:
-    # Existing link conditions: input existing link CSV
-    # Future link conditions: input future link CSV
+    # Existing link conditions: input existing link CSV (or folder of existing .out runs)
+    # Future link conditions: input future link CSV (or folder of future .out runs)
     # Existing node conditions: input existing node CSV
     # Future lnode conditions: input future node CSV
-    # Project GDB: project GDB created with SWIMM to GDB tool
+    # Project GDB: project GDB created with SWIMM to GDB tool (or a .gpkg/.sqlite stand-in, see
+    #   gisbackend.py)
+    # Mapping file (optional): JSON scenario and return period mapping, see resultmapping.py
+    # Full re-population (optional): rewrite every field and row, ignoring the last run (--full)
+    # Save result tables (optional): copy the results read to <scenario>_Links and _Nodes tables
+    #   (--tables); otherwise nothing but the discharge fields is written to the project GDB
 
-# Output: populated discharge fields for all feautres within project GDB, and tables added to the
-#   project GDB from the CSV files
+# Output: populated discharge fields for all feautres within project GDB
 
-######################################################################################################
-import arcpy, os
-arcpy.env.overwriteOutput = True
-
-inLinkExisting = arcpy.GetParameterAsText(0)
-tblName0 = os.path.basename(inLinkExisting[:-4])
-inLinkFuture = arcpy.GetParameterAsText(1)
-tblName1 = os.path.basename(inLinkFuture[:-4])
-inNodeExisting = arcpy.GetParameterAsText(2)
-tblName2 = os.path.basename(inNodeExisting[:-4])
-inNodeFuture = arcpy.GetParameterAsText(3)
-tblName3 = os.path.basename(inNodeFuture[:-4])
-GDB = arcpy.GetParameterAsText(4)   #Project GDB created in SWIMM to GDB script
-
-# Set environments workspace
-arcpy.env.workspace = GDB
-
-# Import all CSVs into project GDB, and make table views to call later
-arcpy.AddMessage("\nImporting CSVs into project geodatabase \n")
-arcpy.TableToTable_conversion (inLinkExisting, GDB, tblName0)
-tbl0 = os.path.join(GDB,tblName0)
-arcpy.MakeTableView_management(tbl0, "tbl0_view")
-
-arcpy.TableToTable_conversion (inLinkFuture, GDB, tblName1)
-tbl1 = os.path.join(GDB,tblName1)
-arcpy.MakeTableView_management(tbl1, "tbl1_view")
-
-arcpy.TableToTable_conversion (inNodeExisting, GDB, tblName2)
-tbl2 = os.path.join(GDB,tblName2)
-arcpy.MakeTableView_management(tbl2, "tbl2_view")
-
-arcpy.TableToTable_conversion (inNodeFuture, GDB, tblName3)
-tbl3 = os.path.join(GDB,tblName3)
-arcpy.MakeTableView_management(tbl3, "tbl3_view")
-
-# Start with Links existing and future CSVs;
-# JOIN Conduits to tbl0 (exisitng), field calculate fields, then delete non-required fields
-arcpy.AddMessage("Updating existing and future discharges for Conduits and Outlets\n")
-arcpy.JoinField_management("Conduits", 'NAME',"tbl0_view", 'LINK')
-
-exp001 = "!F1YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Ex_001", exp001, "PYTHON_9.3")
-exp002 = "!F2YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Ex_002", exp002, "PYTHON_9.3")
-exp005 = "!F5YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Ex_005", exp005, "PYTHON_9.3")
-exp010 = "!F10YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Ex_010", exp010, "PYTHON_9.3")
-exp025 = "!F25YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Ex_025", exp025, "PYTHON_9.3")
-exp050 = "!F50YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Ex_050", exp050, "PYTHON_9.3")
-exp100 = "!F100YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Ex_100", exp100, "PYTHON_9.3")
-exp500 = "!F500YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Ex_500", exp500, "PYTHON_9.3")
-
-# Delete fields after Join
-dropFields = ["Link","F1YR", "F2YR", "F5YR", "F10YR", "F25YR", "F50YR", "F100YR", "F500YR"]
-arcpy.DeleteField_management("Conduits", dropFields)
-
-# JOIN Conduits to tbl1 (future), field calculate fields, then delete non-required fields
-arcpy.JoinField_management("Conduits", 'NAME',"tbl1_view", 'LINK')
-
-exp001 = "!F1YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Fut_001", exp001, "PYTHON_9.3")
-exp002 = "!F2YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Fut_002", exp002, "PYTHON_9.3")
-exp005 = "!F5YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Fut_005", exp005, "PYTHON_9.3")
-exp010 = "!F10YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Fut_010", exp010, "PYTHON_9.3")
-exp025 = "!F25YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Fut_025", exp025, "PYTHON_9.3")
-exp050 = "!F50YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Fut_050", exp050, "PYTHON_9.3")
-exp100 = "!F100YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Fut_100", exp100, "PYTHON_9.3")
-exp500 = "!F500YR!"
-arcpy.CalculateField_management("Conduits",
-                                "Q_Fut_500", exp500, "PYTHON_9.3")
-
-# Delete fields after Join
-dropFields = ["Link","F1YR", "F2YR", "F5YR", "F10YR", "F25YR", "F50YR", "F100YR", "F500YR"]
-arcpy.DeleteField_management("Conduits", dropFields)
-
-
-# JOIN Outlets to tbl0 (existing), field calculate fields, then delete non-required fields
-arcpy.JoinField_management("Outlets", 'NAME',"tbl0_view", 'LINK')
-
-exp001 = "!F1YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Ex_001", exp001, "PYTHON_9.3")
-exp002 = "!F2YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Ex_002", exp002, "PYTHON_9.3")
-exp005 = "!F5YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Ex_005", exp005, "PYTHON_9.3")
-exp010 = "!F10YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Ex_010", exp010, "PYTHON_9.3")
-exp025 = "!F25YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Ex_025", exp025, "PYTHON_9.3")
-exp050 = "!F50YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Ex_050", exp050, "PYTHON_9.3")
-exp100 = "!F100YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Ex_100", exp100, "PYTHON_9.3")
-exp500 = "!F500YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Ex_500", exp500, "PYTHON_9.3")
-
-# Delete fields after Join
-dropFields = ["Link","F1YR", "F2YR", "F5YR", "F10YR", "F25YR", "F50YR", "F100YR","F500YR"]
-arcpy.DeleteField_management("Outlets", dropFields)
-
-# JOIN Outlets to tbl1 (future), field calculate fields, then delete non-required fields
-arcpy.JoinField_management("Outlets", 'NAME',"tbl1_view", 'LINK')
-
-exp001 = "!F1YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Fut_001", exp001, "PYTHON_9.3")
-exp002 = "!F2YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Fut_002", exp002, "PYTHON_9.3")
-exp005 = "!F5YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Fut_005", exp005, "PYTHON_9.3")
-exp010 = "!F10YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Fut_010", exp010, "PYTHON_9.3")
-exp025 = "!F25YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Fut_025", exp025, "PYTHON_9.3")
-exp050 = "!F50YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Fut_050", exp050, "PYTHON_9.3")
-exp100 = "!F100YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Fut_100", exp100, "PYTHON_9.3")
-exp500 = "!F500YR!"
-arcpy.CalculateField_management("Outlets",
-                                "Q_Fut_500", exp500, "PYTHON_9.3")
-
-# Delete fields after Join
-dropFields = ["Link","F1YR", "F2YR", "F5YR", "F10YR", "F25YR", "F50YR", "F100YR", "F500YR"]
-arcpy.DeleteField_management("Outlets", dropFields)
-
-# Junctions, storages, dividers, outfalls join to Nodes existing and future, then feild calculate
-# JOIN Junctions to tbl0 (existing), field calculate fields, then delete non-required fields
-arcpy.AddMessage("Updating existing and future discharges for Junctions, Storages, Dividers, Outfalls\n")
-arcpy.JoinField_management("Junctions", 'NAME',"tbl2_view", 'Node')
-
-exp001 = "!F1YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Ex_001", exp001, "PYTHON_9.3")
-exp002 = "!F2YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Ex_002", exp002, "PYTHON_9.3")
-exp005 = "!F5YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Ex_005", exp005, "PYTHON_9.3")
-exp010 = "!F10YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Ex_010", exp010, "PYTHON_9.3")
-exp025 = "!F25YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Ex_025", exp025, "PYTHON_9.3")
-exp050 = "!F50YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Ex_050", exp050, "PYTHON_9.3")
-exp100 = "!F100YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Ex_100", exp100, "PYTHON_9.3")
-exp500 = "!F500YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Ex_500", exp500, "PYTHON_9.3")
+# Command line (without ArcGIS, against a .gpkg/.sqlite copy of the project):
+#   python PopulateSWMMResults.py LinksEx.csv LinksFut.csv NodesEx.csv NodesFut.csv Project.gpkg [Mapping.json] [--full] [--tables]
 
-# Delete fields after Join
-dropFields = ["Node","Type","F1YR", "F2YR", "F5YR", "F10YR", "F25YR", "F50YR", "F100YR", "F500YR"]
-arcpy.DeleteField_management("Junctions", dropFields)
-
-# JOIN Junctions to tbl1 (future), field calculate fields, then delete non-required fields
-arcpy.JoinField_management("Junctions", 'NAME',"tbl3_view", 'Node')
-
-exp001 = "!F1YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Fut_001", exp001, "PYTHON_9.3")
-exp002 = "!F2YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Fut_002", exp002, "PYTHON_9.3")
-exp005 = "!F5YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Fut_005", exp005, "PYTHON_9.3")
-exp010 = "!F10YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Fut_010", exp010, "PYTHON_9.3")
-exp025 = "!F25YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Fut_025", exp025, "PYTHON_9.3")
-exp050 = "!F50YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Fut_050", exp050, "PYTHON_9.3")
-exp100 = "!F100YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Fut_100", exp100, "PYTHON_9.3")
-exp500 = "!F500YR!"
-arcpy.CalculateField_management("Junctions",
-                                "Q_Fut_500", exp500, "PYTHON_9.3")
-
-# Delete fields after Join
-dropFields = ["Node","Type","F1YR", "F2YR", "F5YR", "F10YR", "F25YR", "F50YR", "F100YR", "F500YR"]
-arcpy.DeleteField_management("Junctions", dropFields)
-
-# JOIN Storages to tbl0 (existing), field calculate fields, then delete non-required fields
-arcpy.JoinField_management("Storages", 'NAME',"tbl2_view", 'Node')
-
-exp001 = "!F1YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Ex_001", exp001, "PYTHON_9.3")
-exp002 = "!F2YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Ex_002", exp002, "PYTHON_9.3")
-exp005 = "!F5YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Ex_005", exp005, "PYTHON_9.3")
-exp010 = "!F10YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Ex_010", exp010, "PYTHON_9.3")
-exp025 = "!F25YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Ex_025", exp025, "PYTHON_9.3")
-exp050 = "!F50YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Ex_050", exp050, "PYTHON_9.3")
-exp100 = "!F100YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Ex_100", exp100, "PYTHON_9.3")
-exp500 = "!F500YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Ex_500", exp500, "PYTHON_9.3")
-
-# Delete fields after Join
-dropFields = ["Node","Type","F1YR","F2YR", "F5YR", "F10YR", "F25YR", "F50YR", "F100YR", "F500YR"]
-arcpy.DeleteField_management("Storages", dropFields)
-
-# JOIN Junctions to tbl1 (future), field calculate fields, then delete non-required fields
-arcpy.JoinField_management("Storages", 'NAME',"tbl3_view", 'Node')
-
-exp001 = "!F1YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Fut_001", exp001, "PYTHON_9.3")
-exp002 = "!F2YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Fut_002", exp002, "PYTHON_9.3")
-exp005 = "!F5YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Fut_005", exp005, "PYTHON_9.3")
-exp010 = "!F10YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Fut_010", exp010, "PYTHON_9.3")
-exp025 = "!F25YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Fut_025", exp025, "PYTHON_9.3")
-exp050 = "!F50YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Fut_050", exp050, "PYTHON_9.3")
-exp100 = "!F100YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Fut_100", exp100, "PYTHON_9.3")
-exp500 = "!F500YR!"
-arcpy.CalculateField_management("Storages",
-                                "Q_Fut_500", exp500, "PYTHON_9.3")
-
-# Delete fields after Join
-dropFields = ["Node","Type","F1YR", "F2YR", "F5YR", "F10YR", "F25YR", "F50YR", "F100YR", "F500YR"]
-arcpy.DeleteField_management("Storages", dropFields)
-
-# JOIN Dividers to tbl0 (existing), field calculate fields, then delete non-required fields
-arcpy.JoinField_management("Dividers", 'NAME',"tbl2_view", 'Node')
-
-exp001 = "!F1YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Ex_001", exp001, "PYTHON_9.3")
-exp002 = "!F2YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Ex_002", exp002, "PYTHON_9.3")
-exp005 = "!F5YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Ex_005", exp005, "PYTHON_9.3")
-exp010 = "!F10YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Ex_010", exp010, "PYTHON_9.3")
-exp025 = "!F25YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Ex_025", exp025, "PYTHON_9.3")
-exp050 = "!F50YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Ex_050", exp050, "PYTHON_9.3")
-exp100 = "!F100YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Ex_100", exp100, "PYTHON_9.3")
-exp500 = "!F500YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Ex_500", exp500, "PYTHON_9.3")
-
-# Delete fields after Join
-dropFields = ["Node","Type_1","F1YR","F2YR", "F5YR", "F10YR", "F25YR", "F50YR", "F100YR", "F500YR"]
-arcpy.DeleteField_management("Dividers", dropFields)
-
-# JOIN Dividers to tbl1 (future), field calculate fields, then delete non-required fields
-arcpy.JoinField_management("Dividers", 'NAME',"tbl3_view", 'Node')
-
-exp001 = "!F1YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Fut_001", exp001, "PYTHON_9.3")
-exp002 = "!F2YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Fut_002", exp002, "PYTHON_9.3")
-exp005 = "!F5YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Fut_005", exp005, "PYTHON_9.3")
-exp010 = "!F10YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Fut_010", exp010, "PYTHON_9.3")
-exp025 = "!F25YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Fut_025", exp025, "PYTHON_9.3")
-exp050 = "!F50YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Fut_050", exp050, "PYTHON_9.3")
-exp100 = "!F100YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Fut_100", exp100, "PYTHON_9.3")
-exp500 = "!F500YR!"
-arcpy.CalculateField_management("Dividers",
-                                "Q_Fut_500", exp500, "PYTHON_9.3")
-
-# Delete fields after Join
-dropFields = ["Node","Type_1","F1YR", "F2YR", "F5YR", "F10YR", "F25YR", "F50YR", "F100YR", "F500YR"]
-arcpy.DeleteField_management("Dividers", dropFields)
-
-# JOIN Outfalls to tbl0 (existing), field calculate fields, then delete non-required fields
-arcpy.JoinField_management("Outfalls", 'NAME',"tbl2_view", 'Node')
-
-exp001 = "!F1YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Ex_001", exp001, "PYTHON_9.3")
-exp002 = "!F2YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Ex_002", exp002, "PYTHON_9.3")
-exp005 = "!F5YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Ex_005", exp005, "PYTHON_9.3")
-exp010 = "!F10YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Ex_010", exp010, "PYTHON_9.3")
-exp025 = "!F25YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Ex_025", exp025, "PYTHON_9.3")
-exp050 = "!F50YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Ex_050", exp050, "PYTHON_9.3")
-exp100 = "!F100YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Ex_100", exp100, "PYTHON_9.3")
-exp500 = "!F500YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Ex_500", exp500, "PYTHON_9.3")
-
-# Delete fields after Join
-dropFields = ["Node","Type_1","F1YR", "F2YR", "F5YR", "F10YR", "F25YR", "F50YR", "F100YR", "F500YR"]
-arcpy.DeleteField_management("Outfalls", dropFields)
-
-# JOIN Outlets to tbl1 (future), field calculate fields, then delete non-required fields
-arcpy.JoinField_management("Outfalls", 'NAME',"tbl3_view", 'Node')
-
-exp001 = "!F1YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Fut_001", exp001, "PYTHON_9.3")
-exp002 = "!F2YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Fut_002", exp002, "PYTHON_9.3")
-exp005 = "!F5YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Fut_005", exp005, "PYTHON_9.3")
-exp010 = "!F10YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Fut_010", exp010, "PYTHON_9.3")
-exp025 = "!F25YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Fut_025", exp025, "PYTHON_9.3")
-exp050 = "!F50YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Fut_050", exp050, "PYTHON_9.3")
-exp100 = "!F100YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Fut_100", exp100, "PYTHON_9.3")
-exp500 = "!F500YR!"
-arcpy.CalculateField_management("Outfalls",
-                                "Q_Fut_500", exp500, "PYTHON_9.3")
-
-# Delete fields after Join
-dropFields = ["Node","Type_1","F1YR", "F2YR", "F5YR", "F10YR", "F25YR", "F50YR", "F100YR", "F500YR"]
-arcpy.DeleteField_management("Outfalls", dropFields)
+######################################################################################################
+import os, sys, time
+from gisbackend import openBackend, toolParameters
+from mhfdschema import doubleField
+from resultmapping import DEFAULT_MAPPING, LINK, NODE, dischargeFields, loadMapping, resultColumns, withInputs
+from resultstate import changedNames, elementHashes, loadState, saveState, sameEntry, scenarioEntry
+from swmmresults import RESULT_COLUMNS, readResults, saveResults
+from tracing import Progress, report, runId, step
+
+def populateFeature(backend, feature, fields, results, names=None):
+    # Writes the discharge fields of every scenario in one update pass; results holds the
+    # {name: values} of each scenario in the order of fields, and names (None: all) the elements
+    # whose results changed. Fields the feature class does not have yet are added first, and then
+    # every row is written. Returns the rows changed, or None without the feature class.
+    existing = [field.upper() for field in backend.listFields(feature)]
+    if not existing:
+        return None
+    missing = [field for field in fields if field.upper() not in existing]
+    if missing:
+        backend.addFields(feature, [doubleField(field) for field in missing])
+        names = None
+    if names is not None and not names:
+        return 0
+    blank = (None,) * (len(fields) // len(results)) if results else ()
+
+    def update(row):
+        name = row[0].strip() if isinstance(row[0], str) else row[0]
+        if names is not None and name not in names:
+            return None
+        newRow = (row[0],) + sum((scenario.get(name, blank) for scenario in results), ())
+        if newRow == tuple(row):
+            return None
+        return newRow
+
+    return backend.updateRows(feature, ["NAME"] + fields, update)
+
+def populateJob(job):
+    # Populates one feature class in a worker process with its own backend; returns (feature, changed, seconds)
+    workspace, feature, fields, results, names, run = job
+    start = time.perf_counter()
+    backend = openBackend(workspace, run)
+    try:
+        changed = populateFeature(backend, feature, fields, results, names)
+    finally:
+        if hasattr(backend, "close"):
+            backend.close()
+    return feature, changed, time.perf_counter() - start
+
+def readScenario(inLinks, inNodes, columns=RESULT_COLUMNS, warn=print):
+    # (links, nodes) ResultTables of one scenario from its link and node CSVs, or from a folder of
+    # .out files
+    if os.path.isdir(inLinks):
+        from swmmout import folderResults
+        return folderResults(inLinks, columns, warn)
+    return readResults(inLinks, "Link", columns, warn), readResults(inNodes, "Node", columns, warn)
+
+def readScenarios(mapping, backend):
+    # {scenario name: {LINK: results, NODE: results}} of every scenario of the mapping
+    results = {}
+    for scenario in mapping.scenarios:
+        with step(backend, "readResults", scenario.name) as info:
+            links, nodes = readScenario(scenario.links, scenario.nodes, resultColumns(mapping), backend.message)
+            info["rows"] = len(links) + len(nodes)
+        results[scenario.name] = {LINK: links, NODE: nodes}
+    return results
+
+def saveScenarios(backend, results):
+    # Copies the results read for each scenario to <scenario>_Links and <scenario>_Nodes tables
+    for name, tables in results.items():
+        for source, suffix, keyField in ((LINK, "_Links", "Link"), (NODE, "_Nodes", "Node")):
+            count = saveResults(backend, name + suffix, tables[source], keyField)
+            backend.message("{}: {} rows saved".format(name + suffix, count))
+
+def populateFeatures(backend, mapping, results, names=None, workers=None):
+    # Populates the feature classes of the mapping, on a process pool when the backend allows it;
+    # names maps LINK and NODE to the elements to write (None: all). Yields (feature, changed,
+    # seconds) as feature classes finish.
+    fields = dischargeFields(mapping)
+    names = names or {}
+    jobs = [(backend.workspace, feature, fields, [results[scenario.name][source] for scenario in mapping.scenarios], names.get(source), runId(backend))
+            for feature, source in mapping.features.items()]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if not backend.parallel or workers <= 1:
+        for workspace, feature, fields, scenarios, featureNames, run in jobs:
+            start = time.perf_counter()
+            changed = populateFeature(backend, feature, fields, scenarios, featureNames)
+            yield feature, changed, time.perf_counter() - start
+        return
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(populateJob, job) for job in jobs]):
+            yield future.result()
+
+def populateResults(backend, inputs, mapping=DEFAULT_MAPPING, workers=None, full=False, saveTables=False):
+    # inputs: {scenario name: (links, nodes)} for the scenarios whose inputs the mapping does not
+    # name. Only the scenarios and elements whose results changed since the last run are written
+    # (see resultstate.py) unless full is True. The results are only kept in memory; saveTables
+    # also copies those read to tables of the workspace.
+    mapping = withInputs(mapping, inputs)
+    state = {} if full else loadState(backend.workspace)
+    # Feature classes in the project; the state records only those populated
+    present = dict((feature, source) for feature, source in mapping.features.items() if backend.listFields(feature))
+    entries = dict((scenario.name, scenarioEntry(scenario, mapping, present)) for scenario in mapping.scenarios)
+    changed = [scenario for scenario in mapping.scenarios if not sameEntry(entries[scenario.name], state.get(scenario.name))]
+    for scenario in mapping.scenarios:
+        if scenario not in changed:
+            backend.message("{}: results unchanged since the last run, skipped".format(scenario.name))
+    if not changed:
+        report(backend)
+        return
+    mapping = mapping._replace(scenarios=changed)
+
+    backend.message("\nReading link and node results \n")
+    results = readScenarios(mapping, backend)
+    if saveTables:
+        saveScenarios(backend, results)
+    hashes, names = {}, {LINK: set(), NODE: set()}
+    for scenario in changed:
+        saved = state.get(scenario.name)
+        layout = dict((key, value) for key, value in entries[scenario.name].items() if key != "inputs")
+        hashes[scenario.name] = dict((source, elementHashes(results[scenario.name][source])) for source in (LINK, NODE))
+        for source in (LINK, NODE):
+            previous = saved["elements"][source] if sameEntry(layout, saved) else None
+            difference = changedNames(previous, hashes[scenario.name][source])
+            names[source] = None if difference is None or names[source] is None else names[source] | difference
+
+    backend.message("Updating {} discharges for {}\n".format(", ".join(scenario.name for scenario in changed),
+                                                             ", ".join(mapping.features)))
+    progress = Progress(backend, len(mapping.features))
+    populated = {}
+    for feature, count, seconds in populateFeatures(backend, mapping, results, names, workers):
+        if count is None:
+            progress.step("{}: not in the project GDB, skipped".format(feature))
+        else:
+            populated[feature] = mapping.features[feature]
+            progress.step("{}: {} features updated ({:.1f} s)".format(feature, count, seconds))
+
+    for scenario in changed:
+        state[scenario.name] = dict(entries[scenario.name], features=populated, elements=hashes[scenario.name])
+    saveState(backend.workspace, dict((name, entry) for name, entry in state.items() if name in entries))
+    report(backend)
+
+if __name__ == "__main__":
+    # Command line flags, or the Full re-population and Save result tables parameters (7 and 8)
+    flags = ("--full", "--tables")
+    parameters = toolParameters(8, [argument for argument in sys.argv[1:] if argument not in flags])
+    parameters = ["" if parameter in flags else parameter for parameter in parameters]
+    full = "--full" in sys.argv or parameters[6].lower() == "true"
+    saveTables = "--tables" in sys.argv or parameters[7].lower() == "true"
+    inLinkExisting, inLinkFuture, inNodeExisting, inNodeFuture, GDB, mappingFile = parameters[:6]
+    mapping = loadMapping(mappingFile) if mappingFile else DEFAULT_MAPPING
+    inputs = {"Existing": (inLinkExisting, inNodeExisting), "Future": (inLinkFuture, inNodeFuture)}
+    populateResults(openBackend(GDB), inputs, mapping, full=full, saveTables=saveTables)
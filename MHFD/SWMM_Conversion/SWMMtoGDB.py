@@ -6,113 +6,141 @@
 #   exported from a SWIMM model, add the required fields to JOIN to the existing and future
 #   discharge CSVs, allow the user to fill in project specific fields, and delete autopopulated
 #   fields created by the SWIMM export ssf
+#   The MHFD schema is defined as data in mhfdschema.py. Each feature class is created with all of
+#   its fields in one batched call, and the features are then copied in a single pass that also
+#   fills the project fields, instead of an AddField and CalculateField rewrite per field.
+#   The SWIMM input can also be the model's .inp file: the layers are then built straight from the
+#   model (see swmminp.py) and no shapefiles have to be exported from the SWIMM GUI.
+#   With the GeoPackage/SQLite stand-in the shapefiles are read by shpreader.py and imported on a
+#   process pool, one layer (projection, schema and one-transaction copy) per worker, so a model
+#   imports in about the time of its largest layer. A file geodatabase takes one layer at a time.
+#   Shapefiles without a projection are defined as Colorado Central. Shapefiles delivered in
+#   another coordinate system (.prj: UTM, geographic NAD 83, Colorado North/South, ...) are
+#   reprojected to Colorado Central with the NumPy transforms in projection.py, instead of being
+#   labelled Colorado Central with their coordinates unchanged.
 
 # Inputs:
     # Output location: location where geodatabase will be created
-    # SWIMM folder: folder containing geometries (shapefiles) exported from SWIMM model
+    # SWIMM folder: folder containing geometries (shapefiles) exported from SWIMM model, or the
+    #   SWIMM model .inp file (the geodatabase is named after the folder or the .inp file)
     # Source: project name (string)
     # Study year: project year (string)
     # SWIMM model: SWIMM model name (e.g. LCM.inp)
     # CUHP version: (string)
 
 # Output: file geodatabase containing shapefiles exported from SWIMM model with the required fields
+#   (Subcatchments is not delivered)
 
 ######################################################################################################
 
-import arcpy, os
-arcpy.env.overwriteOutput = True
+import os, time
+from gisbackend import GEOMETRY, GEOMETRY_WKB, createBackend, inArcGIS, openBackend, toolParameters
+from mhfdschema import CONSTANT_FIELDS, SKIPPED_LAYERS, rowBuilder, targetFields
+from tracing import Progress, report, runId, step
 
-outGDBLoc = arcpy.GetParameterAsText(0)
-inSWMMfolder = arcpy.GetParameterAsText(1)
-source = arcpy.GetParameterAsText(2)
-studyYear = arcpy.GetParameterAsText(3)
-SWMMinput = arcpy.GetParameterAsText(4)
-SWMMver = arcpy.GetParameterAsText(5)
-CUHPversion = arcpy.GetParameterAsText(6)
+# 102654 is the code for:
+# NAD 1983 StatePlane Colorado Central FIPS 0502 Feet
+SPATIAL_REFERENCE = 102654
 
+def importLayer(backend, feature, geometryType, sourceFields, rows, constants, geometry=GEOMETRY):
+    # Creates the delivered feature class of one layer and copies its rows (geometry first) in one
+    # pass; returns the number of features copied
+    fields = targetFields(feature, sourceFields)
+    backend.createFeatureClass(feature, geometryType, SPATIAL_REFERENCE, fields)
+    build = rowBuilder(fields, sourceFields, constants)
+    return backend.insertRows(feature, [geometry] + [field.name for field in fields], (build(row) for row in rows))
 
+def importFeature(backend, shape, constants):
+    # Imports one shapefile exported from the SWIMM GUI, reprojecting it if it has another projection
+    from projection import transformer
+    feature = os.path.splitext(os.path.basename(shape))[0]
+    prj = backend.sourceProjection(shape)
+    try:
+        transform = transformer(prj) if prj else None
+    except ValueError as e:
+        raise ValueError("{}: {}".format(shape, e))
+    if transform is None:
+        backend.defineProjection(shape, SPATIAL_REFERENCE)
+    geometryType, sourceFields = backend.describeSource(shape)
+    rows = backend.readSource(shape, [GEOMETRY] + [field.name for field in sourceFields], transform)
+    return importLayer(backend, feature, geometryType, sourceFields, rows, constants, GEOMETRY if transform is None else GEOMETRY_WKB)
 
-# Create a project file geodatabase
-GDBname = os.path.basename(inSWMMfolder)
-arcpy.CreateFileGDB_management(outGDBLoc, GDBname)
-GDB = os.path.join(outGDBLoc,GDBname + ".gdb")
-arcpy.AddMessage("\nCreated project file geodatabase\n")
+def ingestLayer(job):
+    # Imports one shapefile in a worker process with its own backend; returns (feature, count, seconds)
+    workspace, shape, constants, run = job
+    start = time.perf_counter()
+    backend = openBackend(workspace, run)
+    try:
+        count = importFeature(backend, shape, constants)
+    finally:
+        if hasattr(backend, "close"):
+            backend.close()
+    return os.path.splitext(os.path.basename(shape))[0], count, time.perf_counter() - start
 
-# Feed tool a folder from the model output that has the shapefiles
-# For each shapefile in the folder, define projection, and import into project GDB
-arcpy.env.workspace = inSWMMfolder
-shapes = arcpy.ListFeatureClasses()
-arcpy.AddMessage("Defining projection and importing to file geodatabase for all features in {0}\n".format(inSWMMfolder))
+def ingestLayers(backend, shapes, constants, workers=None):
+    # Imports shapefiles on a process pool when the backend allows it, largest first; yields
+    # (feature, count, seconds) as layers finish
+    jobs = [(backend.workspace, shape, constants, runId(backend)) for shape in sorted(shapes, key=os.path.getsize, reverse=True)]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if not backend.parallel or workers <= 1:
+        for workspace, shape, constants, run in jobs:
+            start = time.perf_counter()
+            count = importFeature(backend, shape, constants)
+            yield os.path.splitext(os.path.basename(shape))[0], count, time.perf_counter() - start
+        return
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(ingestLayer, job) for job in jobs]):
+            yield future.result()
 
-for shape in shapes:
-    # 102654 is the code for:
-    # NAD 1983 StatePlane Colorado Central FIPS 0502 Feet
-    sr = arcpy.SpatialReference(102654)
-    arcpy.DefineProjection_management(shape, sr)
-    # Import each shape into GDB
-    out_name = os.path.basename(shape[:-4])
-    # Import each shape into a the file geodatabase
-    arcpy.FeatureClassToFeatureClass_conversion (shape, GDB, out_name)
+def modelLayers(backend, inpPath):
+    # Layers built from a SWIMM .inp file that are imported
+    from swmminp import readLayers
+    with step(backend, "readLayers", os.path.basename(inpPath)) as info:
+        tables = readLayers(inpPath)
+        info["rows"] = sum(len(table) for table in tables)
+    return [table for table in tables if table.name not in SKIPPED_LAYERS]
 
-arcpy.env.workspace = GDB
-features = arcpy.ListFeatureClasses()
-dropFields = ["TREATMENT","BASEPATTRN","TIMESERIES","SCALEFACTR","AVGVALUE","PATTERN1","PATTERN2",
-              "PATTERN3","PATTERN4","HYDROGRAPH","SSAREA","TOTCONAREA","IMPCONAREA","UNITFLOW",
-              "AVGDEPTH","MAXDEPTH","MAXHGL","TIMEMAXHGL","REMAXDEPTH","MAXLATFLOW","MAXTOTFLOW",
-              "TOTLATFLOW","TOTINFLOW","CULVRTCODE","CTRLRULES","MAXSPREAD","TOTCONAREA",
-              "IMPCONAREA","UNITFLOW","MAXFLOW","TIMEMAXFLW","MAXVELOCIT","CAPFLOW","CAPDEPTH", "MAXVOLUME",
-              "FULLBOTH","HRSFULLUP", "FULLDOWN","FULLNORMAL","HRSLIMITED","LENGTHFACT","DRY","SUBCRIT",
-              "SUPERCRIT","NORMALLTD","INLETCNTRL","SEEPAGE","OPENRATE","ENDCONTRCT","ENDCOEFF",
-              "SURCHARGE","COEFFCURVE","ROADWIDTH","ROADSURF","BASEFLOW","FLOWERROR","HRSSURCHAR","MAXSURCHAR",
-              "MINDEPTHBR","HOURSFLOOD","MAXFLOODR","TOTFLDVOL","MAXPONDED","OUTLET","FLOWFREQ","AVGFLOW",
-              "TOTALFLOW","PONDEDAREA","SUCTHEAD","CONDUCT","INITDEFICT","AVGVOLUME","AVGPERCENT","EVAPLOSS",
-              "INFILLOSS","PCNTLOSS","MAXPERCENT","MAXOUTFLOW"]
+def importModel(backend, tables, constants):
+    # Imports the layers of modelLayers(); yields (feature, count)
+    for table in tables:
+        yield table.name, importLayer(backend, table.name, table.geometryType, table.fields, table.rows(), constants, GEOMETRY_WKB)
 
-arcpy.AddMessage("Adding required fields and feild calculating project fields for all features in {0}\n".format(GDB))
+def swmmToGDB(outGDBLoc, inSWMMfolder, source, studyYear, SWMMinput, SWMMver, CUHPversion, extension=".gdb", workers=None):
+    # Create a project file geodatabase
+    GDBname = os.path.basename(inSWMMfolder)
+    isModel = inSWMMfolder.lower().endswith(".inp")
+    if isModel:
+        GDBname = os.path.splitext(GDBname)[0]
+    backend = createBackend(outGDBLoc, GDBname, extension)
+    backend.message("\nCreated project file geodatabase\n")
+    constants = dict(zip(CONSTANT_FIELDS, [source, studyYear, SWMMinput, SWMMver, CUHPversion]))
 
-# Go through each record to add fields and calculate the user input entries
-for feature in features:
-    featureName = os.path.join(GDB, feature)
-    arcpy.AddMessage("Required fields added to " + featureName)
-    # Add required fields to each shape
-    arcpy.AddField_management(featureName,"SOURCE","TEXT","","","255")
-    arcpy.CalculateField_management(featureName, "SOURCE",'"'+ source + '"', "PYTHON_9.3")
-    arcpy.AddField_management(featureName,"STUDY_YR","TEXT","","","4")
-    arcpy.CalculateField_management(featureName, "STUDY_YR", '"'+ studyYear + '"', "PYTHON_9.3")
-    arcpy.AddField_management(featureName,"MODEL","TEXT","","","50")
-    arcpy.CalculateField_management(featureName, "MODEL", '"'+ SWMMinput + '"', "PYTHON_9.3")
-    arcpy.AddField_management(featureName,"SWMM_VER","TEXT","","","50")
-    arcpy.CalculateField_management(featureName, "SWMM_VER", '"'+ SWMMver + '"', "PYTHON_9.3")
-    arcpy.AddField_management(featureName,"CUHP_VER","TEXT","","","10")
-    arcpy.CalculateField_management(featureName, "CUHP_VER", '"'+ CUHPversion + '"', "PYTHON_9.3")
-    arcpy.AddField_management(featureName,"MHFDBASIN","DOUBLE",10,2)
-    # Add field DESIGNPT to selected features
-    if feature == "Dividers" or feature == "Junctions" or feature == "Outfalls" or feature == "Storages":
-        arcpy.AddField_management(featureName,"DESIGNPT","TEXT","","","10")
-    arcpy.AddField_management(featureName,"Q_Ex_WQ","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Ex_001","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Ex_002","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Ex_005","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Ex_010","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Ex_025","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Ex_050","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Ex_100","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Ex_500","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Fut_WQ","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Fut_001","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Fut_002","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Fut_005","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Fut_010","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Fut_025","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Fut_050","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Fut_100","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"Q_Fut_500","DOUBLE",10,2)
-    arcpy.AddField_management(featureName,"LASTEDITOR","TEXT","","","255")
-    arcpy.AddField_management(featureName,"LAST_DATE","TEXT","","","10")
-    if feature == "Outlets":
-        arcpy.DeleteField_management(featureName, "COEFF")
-    # Delete non-deliverable fields
-    arcpy.DeleteField_management(featureName, dropFields)
+    # Feed tool a folder from the model output that has the shapefiles
+    # For each shapefile in the folder, define projection, and import into project GDB with the
+    # required fields
+    if isModel:
+        backend.message("Building features from {0} and importing to file geodatabase\n".format(inSWMMfolder))
+        tables = modelLayers(backend, inSWMMfolder)
+        progress = Progress(backend, len(tables))
+        for feature, count in importModel(backend, tables, constants):
+            progress.step("Required fields added to {} ({} features)".format(os.path.join(backend.workspace, feature), count))
+        report(backend)
+        return backend.workspace
 
+    backend.message("Defining projection and importing to file geodatabase for all features in {0}\n".format(inSWMMfolder))
+    shapes = [shape for shape in backend.sourceLayers(inSWMMfolder) if os.path.splitext(os.path.basename(shape))[0] not in SKIPPED_LAYERS]
+    progress = Progress(backend, len(shapes))
+    for feature, count, seconds in ingestLayers(backend, shapes, constants, workers):
+        progress.step("Required fields added to {} ({} features, {:.1f} s)".format(os.path.join(backend.workspace, feature), count, seconds))
+    report(backend)
+    return backend.workspace
 
-arcpy.Delete_management("Subcatchments")
+if __name__ == "__main__":
+    if inArcGIS():
+        swmmToGDB(*toolParameters(7), extension=".gdb")
+    else:
+        # Command line without ArcGIS: write a .gpkg stand-in (see gisbackend.py); an eighth
+        # argument sets the number of worker processes
+        parameters = toolParameters(8)
+        swmmToGDB(*parameters[:7], extension=".gpkg", workers=int(parameters[7]) if parameters[7] else None)
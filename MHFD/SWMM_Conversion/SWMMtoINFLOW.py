@@ -0,0 +1,161 @@
+# SWMMtoINFLOW.py
+# Description: This script will write FLO-2D INFLOW_<suffix>_<n>yr.dat files straight from the
+#   SWMM binary output (.out) of each return period run, instead of exporting the outfall
+#   hydrographs to a spreadsheet, reshaping them into the HYDROGRAPHS layout and running text2dat.
+#   A lookup table maps SWMM node names to FLO-2D grid elements; SWMM nodes mapped to the same
+#   grid element are added together into one inflow. The inflow of each node is its total inflow
+#   (for an outfall, the flow leaving the model), or its lateral inflow.
+#   Each .out file is read in one pass, a bounded block of reporting periods at a time (see
+#   swmmout.py), and the flows of the mapped nodes are spooled grid element by grid element to a
+#   temporary file, so result files larger than RAM can be converted. The F/H records are then
+#   formatted a block of rows at a time, in the same layout text2dat writes (FLO2D/text2dat):
+#       F   0   <grid element>
+#       H   <hours>   <flow>        starting with 0.00 0.00 at the start of the run
+#   Flows are written in the flow units of the SWMM model.
+
+# Inputs:
+    # SWMM runs: folder of .out files, one per return period (e.g. Model_100yr.out), or one .out
+    # Grid lookup: CSV of SWMM node name and FLO-2D grid element, one node per row (a header row
+    #   is skipped)
+    # Output folder: folder the INFLOW .dat files are written to
+    # Suffix: DS/US part of the INFLOW file names (e.g. US -> INFLOW_US_100yr.dat)
+    # Inflow (optional): "total" (default) or "lateral" node inflow
+
+# Output: one INFLOW_<suffix>_<n>yr.dat file per return period run within the output folder
+
+# Command line:
+#   python SWMMtoINFLOW.py C:\Project\SWMM\Runs C:\Project\GridLookup.csv C:\Project\FLO2D US
+
+######################################################################################################
+
+import csv, glob, os, tempfile
+import numpy as np
+from gisbackend import toolParameters
+from swmmout import CHUNK_BYTES, NODE, NODE_LATERAL_INFLOW, NODE_TOTAL_INFLOW, RUN_PATTERN, SwmmOutput
+
+INFLOW_VARIABLES = {"total": NODE_TOTAL_INFLOW, "lateral": NODE_LATERAL_INFLOW}
+FLOW_UNITS = ["CFS", "GPM", "MGD", "CMS", "LPS", "MLD"]
+
+# FLO-2D inflow records, as text2dat writes them
+F_RECORD = "F	0	%d\n"
+H_RECORD = "H	%.2f	%.2f\n"
+
+# H records formatted at a time
+RECORD_ROWS = 8192
+
+def readGridLookup(path):
+    # {SWMM node name: grid element} of a two column CSV
+    lookup = {}
+    with open(path, newline="") as file:
+        for i, row in enumerate(csv.reader(file)):
+            if len(row) < 2 or not row[0].strip():
+                continue
+            node, grid = row[0].strip(), row[1].strip()
+            try:
+                element = int(float(grid))
+            except ValueError:
+                if i == 0:
+                    continue
+                raise ValueError("{} row {}: grid element {!r} of node {} is not a number".format(path, i + 1, grid, node))
+            if node in lookup and lookup[node] != element:
+                raise ValueError("{}: node {} is mapped to grid elements {} and {}".format(path, node, lookup[node], element))
+            lookup[node] = element
+    if not lookup:
+        raise ValueError("No nodes in grid lookup {}".format(path))
+    return lookup
+
+def runLabel(path):
+    # Return period of a run from its file name (Model_100yr.out -> '100yr'), or None
+    match = RUN_PATTERN.search(os.path.basename(path))
+    return "{}yr".format(int(match.group(1))) if match else None
+
+def runFiles(runs):
+    # [(label, path)] of a .out file or of the .out files of a folder, one per return period
+    paths = [runs] if os.path.isfile(runs) else sorted(glob.glob(os.path.join(runs, "*.out")))
+    files, labels = [], {}
+    for path in paths:
+        label = runLabel(path)
+        if label is None:
+            print("Skipped {}: no return period in the file name".format(path))
+            continue
+        if label in labels:
+            raise ValueError("{} and {} are both {} runs".format(labels[label], path, label))
+        labels[label] = path
+        files.append((label, path))
+    if not files:
+        raise ValueError("No SWMM output files with a return period found in {}".format(runs))
+    return files
+
+def gridColumns(output, lookup, warn=print):
+    # (grids, indexes, starts): the grid elements in order, the node indexes of the output sorted
+    # by grid element, and where the nodes of each grid element start in indexes
+    missing = [node for node in lookup if node not in output.index[NODE]]
+    if missing:
+        warn("{}: {} mapped nodes not in the run, skipped ({})".format(output.path, len(missing), ", ".join(missing[:5])))
+    pairs = sorted((grid, output.index[NODE][node]) for node, grid in lookup.items() if node in output.index[NODE])
+    if not pairs:
+        raise ValueError("{}: none of the mapped nodes are in the run".format(output.path))
+    grids = np.array([grid for grid, index in pairs])
+    starts = np.flatnonzero(np.concatenate([[True], grids[1:] != grids[:-1]]))
+    return grids[starts], np.array([index for grid, index in pairs]), starts
+
+def spoolInflows(output, indexes, starts, variable, spool):
+    # (grids, periods + 1) float64 memory map of the inflow of each grid element, 0 at the start
+    # of the run, filled from the output a block of reporting periods at a time
+    inflows = np.memmap(spool, np.float64, "w+", shape=(len(starts), output.periods + 1))
+    inflows[:, 0] = 0.0
+    step = max(1, CHUNK_BYTES // output.periodType.itemsize)
+    for start in range(0, output.periods, step):
+        flows = np.asarray(output.blockView(NODE, start, start + step)[:, indexes, variable], np.float64)
+        inflows[:, start + 1:start + 1 + len(flows)] = np.add.reduceat(flows, starts, axis=1).T
+    inflows.flush()
+    return inflows
+
+def writeRecords(file, grids, hours, inflows):
+    # F record and H records of every grid element, RECORD_ROWS records per write
+    hydrograph = np.empty((min(RECORD_ROWS, len(hours)), 2))
+    for grid, flow in zip(grids.tolist(), inflows):
+        file.write(F_RECORD % grid)
+        for start in range(0, len(hours), RECORD_ROWS):
+            rows = hydrograph[:len(hours[start:start + RECORD_ROWS])]
+            rows[:, 0] = hours[start:start + RECORD_ROWS]
+            rows[:, 1] = flow[start:start + RECORD_ROWS]
+            file.write((H_RECORD * len(rows)) % tuple(rows.ravel().tolist()))
+
+def writeInflow(path, lookup, savefile, variable=NODE_TOTAL_INFLOW, warn=print):
+    # Writes the INFLOW .dat of one .out file; returns the number of grid elements written
+    output = SwmmOutput(path)
+    temporary = savefile + ".tmp"
+    try:
+        if output.flowUnits != 0:
+            warn("{}: flows are in {}, written as they are".format(path, FLOW_UNITS[output.flowUnits]))
+        grids, indexes, starts = gridColumns(output, lookup, warn)
+        hours = np.concatenate([[0.0], output.hours()])
+        with tempfile.TemporaryFile() as spool:
+            inflows = spoolInflows(output, indexes, starts, variable, spool)
+            with open(temporary, "w") as file:
+                writeRecords(file, grids, hours, inflows)
+            del inflows
+        os.replace(temporary, savefile)
+        return len(grids)
+    finally:
+        output.close()
+        # Nothing is left behind by a failed write
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+def swmmToInflow(runs, lookupPath, outFolder, suffix, inflow="total"):
+    # Writes INFLOW_<suffix>_<n>yr.dat for every return period run; returns the paths written
+    lookup = readGridLookup(lookupPath)
+    variable = INFLOW_VARIABLES[inflow.lower() or "total"]
+    savefiles = []
+    for label, path in runFiles(runs):
+        savefile = os.path.join(outFolder, "INFLOW_{}_{}.dat".format(suffix, label))
+        count = writeInflow(path, lookup, savefile, variable)
+        print("{}: {} inflow grid elements written to {}".format(os.path.basename(path), count, savefile))
+        savefiles.append(savefile)
+    return savefiles
+
+if __name__ == "__main__":
+    runs, lookupPath, outFolder, suffix, inflow = toolParameters(5)
+    swmmToInflow(runs, lookupPath, outFolder, suffix, inflow or "total")
@@ -0,0 +1,238 @@
+# basinindex.py
+# Description: Grid spatial index over the MHFD basin polygons and batch point-in-polygon, used by
+#   PopulateMHFDBasin to fill MHFDBASIN on every node and link in one pass instead of a spatial
+#   join per layer.
+#       BasinIndex(polygons, ids)       index WKB polygons / multipolygons by their bounding boxes
+#                                       on a uniform grid (cell -> polygons in CSR arrays)
+#       BasinIndex.locate(points)       polygon of each of an (n, 2) array of points, -1 outside
+#       representativePoints(blobs)     (n, 2) points of WKB geometries: the point of a point, the
+#                                       midpoint along a line, the vertex mean of a polygon
+#   Candidates come from the grid cell of each point and are filtered on the bounding boxes; the
+#   crossing number test then runs one polygon at a time over all of its candidate points and
+#   edges as NumPy arrays. Holes and multipart basins follow the even-odd rule. A point in two
+#   overlapping basins takes the first one.
+#   python basinindex.py [points] [basins] times a synthetic run and checks it against a brute
+#   force search; tests/test_basinindex.py checks points on shared edges and vertices too.
+
+######################################################################################################
+
+import struct, sys, time
+import numpy as np
+import wkb
+
+# Largest number of point/edge pairs tested at once
+PAIRS = 4000000
+
+# Largest number of grid cells
+MAX_CELLS = 4000000
+
+def geometryCoordinates(blob):
+    # [(n, 2) array] of the coordinate runs of a WKB geometry
+    blob = bytes(blob)
+    runs, end = wkb.coordinateRuns(blob)
+    return [np.frombuffer(blob, "<f8", 2 * count, offset).reshape(-1, 2) for offset, count in runs]
+
+class BasinIndex:
+
+    def __init__(self, polygons, ids=None, cellSize=None):
+        # polygons: WKB polygons; ids: basin ID of each (default its position)
+        rings = [geometryCoordinates(polygon) if polygon is not None else [] for polygon in polygons]
+        self.ids = np.arange(len(rings)) if ids is None else np.asarray(ids)
+        # Edges of every polygon, polygon i owning edges edgeOffsets[i]:edgeOffsets[i + 1]
+        starts, ends, counts = [], [], []
+        for parts in rings:
+            count = 0
+            for ring in parts:
+                if len(ring) > 1:
+                    starts.append(ring[:-1])
+                    ends.append(ring[1:])
+                    count += len(ring) - 1
+            counts.append(count)
+        self.edgeOffsets = np.concatenate([[0], np.cumsum(counts)]).astype("i8")
+        start = np.vstack(starts) if starts else np.zeros((0, 2))
+        end = np.vstack(ends) if ends else np.zeros((0, 2))
+        self.x0, self.y0, self.x1, self.y1 = start[:, 0], start[:, 1], end[:, 0], end[:, 1]
+
+        # Bounding box of each polygon; a polygon without edges gets an empty (inverted) box
+        self.boxes = np.full((len(rings), 4), [np.inf, np.inf, -np.inf, -np.inf])
+        for i, parts in enumerate(rings):
+            if self.edgeOffsets[i + 1] > self.edgeOffsets[i]:
+                coords = np.vstack(parts)
+                self.boxes[i] = coords[:, 0].min(), coords[:, 1].min(), coords[:, 0].max(), coords[:, 1].max()
+        self.buildGrid(cellSize)
+
+    def buildGrid(self, cellSize=None):
+        # Cell size defaults to the median basin extent, so a basin covers a few cells
+        valid = np.flatnonzero(self.boxes[:, 2] >= self.boxes[:, 0])
+        if not len(valid):
+            self.origin, self.cellSize, self.shape = np.zeros(2), 1.0, (1, 1)
+            self.cellStarts, self.cellPolygons = np.zeros(2, "i8"), np.zeros(0, "i8")
+            return
+        boxes = self.boxes[valid]
+        self.origin = boxes[:, :2].min(axis=0)
+        extent = boxes[:, 2:].max(axis=0) - self.origin
+        if cellSize is None:
+            cellSize = float(np.median(np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])))
+        cellSize = max(cellSize, float(extent.max()) / 1e6, 1e-9)
+        while np.prod(np.floor(extent / cellSize) + 1) > MAX_CELLS:
+            cellSize *= 2
+        self.cellSize = cellSize
+        self.shape = tuple(int(n) for n in np.floor(extent / cellSize) + 1)
+        low = np.floor((boxes[:, :2] - self.origin) / cellSize).astype("i8")
+        high = np.floor((boxes[:, 2:] - self.origin) / cellSize).astype("i8")
+        # Every (cell, polygon) pair of the cells a bounding box covers, sorted by cell (CSR)
+        cells, owners = [], []
+        for polygon, (x0, y0), (x1, y1) in zip(valid, low, high):
+            columns, rows = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1))
+            cells.append((rows * self.shape[0] + columns).ravel())
+            owners.append(np.full(cells[-1].size, polygon))
+        cells, owners = np.concatenate(cells), np.concatenate(owners)
+        order = np.lexsort((owners, cells))
+        self.cellPolygons = owners[order]
+        self.cellStarts = np.searchsorted(cells[order], np.arange(self.shape[0] * self.shape[1] + 1))
+
+    def candidates(self, points):
+        # (point index, polygon index) pairs whose bounding boxes contain the point
+        # Points without geometry (NaN) are put outside the grid
+        cell = np.floor(np.nan_to_num((points - self.origin) / self.cellSize, nan=-1.0, posinf=-1.0, neginf=-1.0)).astype("i8")
+        inside = np.flatnonzero((cell >= 0).all(axis=1) & (cell[:, 0] < self.shape[0]) & (cell[:, 1] < self.shape[1]))
+        cell = cell[inside, 1] * self.shape[0] + cell[inside, 0]
+        counts = self.cellStarts[cell + 1] - self.cellStarts[cell]
+        pointIndex = np.repeat(inside, counts)
+        # Positions into cellPolygons of every candidate: each cell's range, one after another
+        first = np.repeat(self.cellStarts[cell] - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+        polygonIndex = self.cellPolygons[first + np.arange(counts.sum())]
+        box = self.boxes[polygonIndex]
+        x, y = points[pointIndex, 0], points[pointIndex, 1]
+        keep = (x >= box[:, 0]) & (x <= box[:, 2]) & (y >= box[:, 1]) & (y <= box[:, 3])
+        return pointIndex[keep], polygonIndex[keep]
+
+    def contains(self, polygon, points):
+        # Crossing number test of (n, 2) points against one polygon, PAIRS point/edge pairs at a time
+        start, stop = self.edgeOffsets[polygon], self.edgeOffsets[polygon + 1]
+        x0, y0, x1, y1 = self.x0[start:stop], self.y0[start:stop], self.x1[start:stop], self.y1[start:stop]
+        result = np.zeros(len(points), bool)
+        step = max(1, PAIRS // max(1, stop - start))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for first in range(0, len(points), step):
+                px, py = points[first:first + step, :1], points[first:first + step, 1:]
+                spans = (y0 > py) != (y1 > py)
+                crossing = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+                result[first:first + step] = (spans & (px < crossing)).sum(axis=1) % 2 == 1
+        return result
+
+    def locate(self, points):
+        # Index of the polygon containing each point, -1 for none
+        points = np.asarray(points, "f8").reshape(-1, 2)
+        found = np.full(len(points), -1, "i8")
+        pointIndex, polygonIndex = self.candidates(points)
+        order = np.argsort(polygonIndex, kind="stable")
+        pointIndex, polygonIndex = pointIndex[order], polygonIndex[order]
+        bounds = np.flatnonzero(np.diff(polygonIndex)) + 1
+        for group in np.split(np.arange(len(polygonIndex)), bounds):
+            if not len(group):
+                continue
+            polygon = polygonIndex[group[0]]
+            targets = pointIndex[group]
+            targets = targets[found[targets] < 0]
+            if len(targets):
+                found[targets[self.contains(polygon, points[targets])]] = polygon
+        return found
+
+    def assign(self, points):
+        # Basin ID of each point, None outside every basin
+        found = self.locate(points)
+        ids = self.ids[np.maximum(found, 0)].tolist() if len(self.ids) else [None] * len(found)
+        return [value if polygon >= 0 else None for value, polygon in zip(ids, found.tolist())]
+
+def representativePoints(blobs):
+    # (n, 2) point of each WKB geometry (NaN without geometry): points as they are, lines at half
+    # their length, polygons at the mean of their vertices
+    parts, counts, lines, runStarts, closing = [], [], [], [], []
+    total = 0
+    for blob in blobs:
+        runs = geometryCoordinates(blob) if blob is not None else []
+        geometryType = struct.unpack_from("<I", bytes(blob[1:5]))[0] if blob is not None else 0
+        coords = np.vstack(runs) if runs else np.zeros((0, 2))
+        for run in runs:
+            runStarts.append(total)
+            total += len(run)
+            # The closing vertex of a ring is not counted twice in the vertex mean
+            if len(run) > 1 and geometryType in (wkb.POLYGON, wkb.MULTIPOLYGON) and np.array_equal(run[0], run[-1]):
+                closing.append(total - 1)
+        parts.append(coords)
+        counts.append(len(coords))
+        lines.append(geometryType in (wkb.LINESTRING, wkb.MULTILINESTRING))
+    points = np.full((len(parts), 2), np.nan)
+    if not parts:
+        return points
+    coords = np.vstack(parts)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype("i8")
+    counts, lines = np.array(counts), np.array(lines)
+
+    # Polygons and points: vertex mean, from cumulative sums of the coordinates and vertex counts
+    filled = np.flatnonzero((counts > 0) & ~lines)
+    if len(filled):
+        weight = np.ones(len(coords))
+        weight[np.array(closing, "i8")] = 0.0
+        sums = np.vstack([np.zeros((1, 3)), np.cumsum(np.column_stack([coords * weight[:, None], weight]), axis=0)])
+        totals = sums[offsets[filled + 1]] - sums[offsets[filled]]
+        points[filled] = totals[:, :2] / np.maximum(totals[:, 2:], 1.0)
+
+    # Lines: the point half way along, with the distance along every vertex from one cumsum.
+    # Segments that join two features (or two parts of a multiline) are given no length.
+    segment = np.hypot(*(coords[1:] - coords[:-1]).T) if len(coords) > 1 else np.zeros(0)
+    runStarts = np.array(runStarts, "i8")
+    segment[runStarts[runStarts > 0] - 1] = 0.0
+    along = np.concatenate([[0.0], np.cumsum(segment)])
+    linear = np.flatnonzero((counts > 0) & lines)
+    if len(linear):
+        start, stop = offsets[linear], offsets[linear + 1]
+        half = (along[start] + along[stop - 1]) / 2
+        vertex = np.clip(np.searchsorted(along, half) - 1, start, np.maximum(stop - 2, start))
+        length = along[np.minimum(vertex + 1, stop - 1)] - along[vertex]
+        fraction = np.where(length > 0, (half - along[vertex]) / np.where(length > 0, length, 1), 0.0)
+        following = coords[np.minimum(vertex + 1, stop - 1)]
+        points[linear] = coords[vertex] + fraction[:, None] * (following - coords[vertex])
+    return points
+
+def syntheticBasins(columns, rows, size=1000.0, seed=0):
+    # WKB quadrilaterals tiling a columns x rows lattice whose inner vertices are jittered, and
+    # the ID of each (row * columns + column + 1)
+    random = np.random.default_rng(seed)
+    x, y = np.meshgrid(np.arange(columns + 1) * size, np.arange(rows + 1) * size)
+    jitter = random.uniform(-0.3, 0.3, (2,) + x.shape) * size
+    jitter[:, [0, -1], :] = 0
+    jitter[:, :, [0, -1]] = 0
+    x, y = x + jitter[0], y + jitter[1]
+    polygons = []
+    for row in range(rows):
+        for column in range(columns):
+            corners = [(row, column), (row, column + 1), (row + 1, column + 1), (row + 1, column)]
+            polygons.append(wkb.polygon([np.array([(x[i, j], y[i, j]) for i, j in corners])]))
+    return polygons, list(range(1, rows * columns + 1))
+
+def check(points=100000, basins=4000, seed=1):
+    # (seconds to index, seconds to locate, points assigned, mismatches against a search of every
+    # basin for 1000 of the points) for a synthetic run
+    side = int(np.sqrt(basins))
+    polygons, ids = syntheticBasins(side, side)
+    start = time.perf_counter()
+    index = BasinIndex(polygons, ids)
+    indexed = time.perf_counter()
+    coords = np.random.default_rng(seed).uniform(-500.0, side * 1000.0 + 500.0, (points, 2))
+    found = index.locate(coords)
+    located = time.perf_counter()
+    mismatches = 0
+    for i in range(min(1000, points)):
+        x, y = coords[i]
+        boxes = np.flatnonzero((index.boxes[:, 0] <= x) & (x <= index.boxes[:, 2]) & (index.boxes[:, 1] <= y) & (y <= index.boxes[:, 3]))
+        inside = [polygon for polygon in boxes if index.contains(polygon, coords[i:i + 1])[0]]
+        mismatches += found[i] != (inside[0] if inside else -1)
+    return indexed - start, located - indexed, int((found >= 0).sum()), mismatches
+
+if __name__ == "__main__":
+    points, basins = [int(value) for value in sys.argv[1:3]] + [100000, 4000][len(sys.argv[1:3]):]
+    indexSeconds, locateSeconds, assigned, mismatches = check(points, basins)
+    print("{} basins indexed in {:.2f} s; {} points located in {:.2f} s, {} in a basin; {} mismatches against a full search"
+          .format(basins, indexSeconds, points, locateSeconds, assigned, mismatches))
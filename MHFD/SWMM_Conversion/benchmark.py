@@ -0,0 +1,252 @@
+# benchmark.py
+# Description: Scale benchmark of the SWMM conversion tools without ArcGIS. For each model size a
+#   synthetic SWMM model is written (generateModel): a .inp file with junctions, outfalls,
+#   storages, dividers, conduits (with cross sections and vertices), orifices, weirs, outlets and
+#   subcatchments draining in trees to the outfalls, and the existing and future link and node
+#   peak flow CSVs in the SWIMM export layout, blank trailing columns included. SWMMtoGDB and
+#   PopulateSWMMResults are then run end to end on a GeoPackage project with tracing on (see
+#   tracing.py), and for each tool the wall time, the elements per second and the table passes
+#   (reads, inserts and updates of a table, one per backend call) are reported.
+#   The numbers are written to Benchmark.json in the benchmark folder. Given the Benchmark.json of
+#   an earlier run, more passes over any table, or throughput down by more than
+#   THROUGHPUT_TOLERANCE, are reported as regressions.
+
+# Inputs:
+    # Benchmark folder: folder the models, projects and results are written to
+    # Sizes (optional): comma separated numbers of nodes per model, default 1000,100000; there is
+    #   about one link per node
+    # Workers (optional): worker processes of PopulateSWMMResults
+    # Baseline (optional): Benchmark.json of an earlier run to compare with
+
+# Output: synthetic models, projects and Benchmark.json within the benchmark folder
+
+# Command line:
+#   python benchmark.py C:\Bench 1000,100000,1000000 4 C:\Bench\Baseline.json
+
+######################################################################################################
+
+import json, os, sys, time
+import numpy as np
+from gisbackend import openBackend
+from resultmapping import DEFAULT_MAPPING
+from swmmresults import RESULT_COLUMNS
+from tracing import RUN_VARIABLE, TRACE_VARIABLE, newRunId, readEvents
+
+DEFAULT_SIZES = [1000, 100000]
+
+# Nodes per drainage tree (each tree ends at an outfall), and how often the other kinds occur
+TREE_NODES = 1000
+STORAGE_EVERY, DIVIDER_EVERY, SUBCATCHMENT_EVERY = 97, 211, 4
+# Links whose index modulo LINK_KINDS_EVERY is 1, 2 or 3 are an orifice, a weir or an outlet
+LINK_KINDS_EVERY = 50
+SPACING = 100.0
+ORIGIN = (3140000.0, 1690000.0)
+
+# Backend calls that read or write a whole table
+PASS_OPERATIONS = ("readRows", "readSource", "insertRows", "updateRows")
+# Fraction of the baseline throughput below which a run is a regression
+THROUGHPUT_TOLERANCE = 0.25
+
+RESULTS_FILE = "Benchmark.json"
+
+def nodeKinds(count):
+    # (kinds, parents): kind of each node and the node its outgoing link drains to (-1 at outfalls)
+    index = np.arange(count)
+    local = index % TREE_NODES
+    parents = np.where(local > 0, index - local + (local - 1) // 2, -1)
+    kinds = np.full(count, "Junctions", dtype=object)
+    kinds[local % STORAGE_EVERY == 0] = "Storages"
+    kinds[local % DIVIDER_EVERY == 0] = "Dividers"
+    kinds[local == 0] = "Outfalls"
+    return kinds, parents
+
+def linkKinds(count):
+    kinds = np.full(count, "CONDUITS", dtype=object)
+    remainder = np.arange(count) % LINK_KINDS_EVERY
+    kinds[remainder == 1] = "ORIFICES"
+    kinds[remainder == 2] = "WEIRS"
+    kinds[remainder == 3] = "OUTLETS"
+    return kinds
+
+NODE_PREFIXES = {"Junctions": "J", "Outfalls": "O", "Storages": "S", "Dividers": "D"}
+LINK_PREFIXES = {"CONDUITS": "C", "ORIFICES": "OR", "WEIRS": "W", "OUTLETS": "OL"}
+
+def section(name, lines):
+    return "[{}]\n{}\n\n".format(name, "\n".join(lines))
+
+def generateModel(folder, nodes, seed=0):
+    # Writes Model.inp and the LinksEx/LinksFut/NodesEx/NodesFut CSVs of a synthetic model with
+    # the given number of nodes to folder; returns (inp path, {scenario: (links CSV, nodes CSV)},
+    # number of links)
+    random = np.random.default_rng(seed)
+    kinds, parents = nodeKinds(nodes)
+    names = ["{}{}".format(NODE_PREFIXES[kind], i) for i, kind in enumerate(kinds)]
+    x = ORIGIN[0] + (np.arange(nodes) % TREE_NODES) * SPACING
+    y = ORIGIN[1] + (np.arange(nodes) // TREE_NODES) * SPACING
+    inverts = 5300.0 - random.uniform(0, 50, nodes)
+
+    # One link from every node but the outfalls to its parent
+    sources = np.flatnonzero(parents >= 0)
+    types = linkKinds(len(sources))
+    links = ["{}{}".format(LINK_PREFIXES[kind], i) for i, kind in zip(sources, types)]
+    outgoing = dict(zip(sources.tolist(), links))
+
+    sections = {"JUNCTIONS": [], "OUTFALLS": [], "STORAGE": [], "DIVIDERS": []}
+    for i, kind in enumerate(kinds):
+        if kind == "Junctions":
+            sections["JUNCTIONS"].append("{} {:.2f} 10 0 0 0".format(names[i], inverts[i]))
+        elif kind == "Outfalls":
+            sections["OUTFALLS"].append("{} {:.2f} FREE NO".format(names[i], inverts[i]))
+        elif kind == "Storages":
+            sections["STORAGE"].append("{} {:.2f} 12 0 FUNCTIONAL 1000 0 0 0 0".format(names[i], inverts[i]))
+        else:
+            sections["DIVIDERS"].append("{} {:.2f} {} CUTOFF 10 0 0 0 0".format(names[i], inverts[i], outgoing[i]))
+    for kind in LINK_PREFIXES:
+        sections[kind] = []
+    lengths = random.uniform(50, 800, len(sources))
+    for link, kind, source, length in zip(links, types, sources.tolist(), lengths.tolist()):
+        ends = "{} {}".format(names[source], names[parents[source]])
+        if kind == "CONDUITS":
+            sections[kind].append("{} {} {:.1f} 0.013 0 0 0 0".format(link, ends, length))
+        elif kind == "ORIFICES":
+            sections[kind].append("{} {} SIDE 0.5 0.65 NO 0".format(link, ends))
+        elif kind == "WEIRS":
+            sections[kind].append("{} {} TRANSVERSE 2 3.33 NO 0 0".format(link, ends))
+        else:
+            sections[kind].append("{} {} 1.5 TABULAR/DEPTH Rating1 NO".format(link, ends))
+    conduits = [(link, source) for link, kind, source in zip(links, types, sources.tolist()) if kind == "CONDUITS"]
+    sections["XSECTIONS"] = ["{} CIRCULAR {} 0 0 0 1".format(link, 1 + source % 5) for link, source in conduits]
+    sections["COORDINATES"] = ["{} {:.1f} {:.1f}".format(name, i, j) for name, i, j in zip(names, x.tolist(), y.tolist())]
+    # A vertex half way along every other conduit, offset to one side
+    sections["VERTICES"] = ["{} {:.1f} {:.1f}".format(link, (x[source] + x[parents[source]]) / 2, y[source] + SPACING / 4)
+                            for link, source in conduits[::2]]
+    drained = [i for i in range(nodes) if kinds[i] == "Junctions" and i % SUBCATCHMENT_EVERY == 0]
+    sections["SUBCATCHMENTS"] = ["SC{} RG1 {} {:.2f} 45 800 1.2 0".format(i, names[i], random.uniform(1, 50)) for i in drained]
+    corners = [(-1, -1), (1, -1), (1, 1), (-1, 1)]
+    sections["Polygons"] = ["SC{} {:.1f} {:.1f}".format(i, x[i] + dx * SPACING / 3, y[i] + dy * SPACING / 3)
+                            for i in drained for dx, dy in corners]
+
+    inpPath = os.path.join(folder, "Model.inp")
+    with open(inpPath, "w") as file:
+        file.write(section("TITLE", ["Synthetic benchmark model, {} nodes".format(nodes)]))
+        for name in ["JUNCTIONS", "OUTFALLS", "STORAGE", "DIVIDERS", "CONDUITS", "ORIFICES", "WEIRS", "OUTLETS",
+                     "XSECTIONS", "SUBCATCHMENTS", "COORDINATES", "VERTICES", "Polygons"]:
+            file.write(section(name, sections[name]))
+
+    # Peak flows growing with the return period; future flows 0-30 % above existing
+    growth = np.linspace(1.0, 4.0, len(RESULT_COLUMNS))
+    paths = {}
+    for kind, keyField, elements in (("Links", "Link", links), ("Nodes", "Node", names)):
+        existing = random.gamma(2.0, 20.0, (len(elements), 1)) * growth
+        future = existing * (1.0 + random.uniform(0, 0.3, (len(elements), 1)))
+        for suffix, peaks in (("Ex", existing), ("Fut", future)):
+            paths[kind + suffix] = writeResults(os.path.join(folder, "{}{}.csv".format(kind, suffix)), keyField, elements, peaks)
+    inputs = {"Existing": (paths["LinksEx"], paths["NodesEx"]), "Future": (paths["LinksFut"], paths["NodesFut"])}
+    return inpPath, inputs, len(links)
+
+def writeResults(path, keyField, names, peaks):
+    # Peak flow CSV as exported from SWIMM: ID, F1YR ... F500YR and five blank columns
+    template = "%s" + ",%.3f" * len(RESULT_COLUMNS) + ",,,,,\r\n"
+    with open(path, "w", newline="") as file:
+        file.write(",".join([keyField] + RESULT_COLUMNS) + ",,,,,\r\n")
+        for name, row in zip(names, peaks.tolist()):
+            file.write(template % ((name,) + tuple(row)))
+    return path
+
+def tracedRun(tracePath, tool, *arguments):
+    # (result, seconds, events) of tool run with tracing to tracePath, as a run of its own
+    run = newRunId()
+    os.environ[TRACE_VARIABLE] = tracePath
+    os.environ[RUN_VARIABLE] = run
+    try:
+        start = time.perf_counter()
+        result = tool(*arguments)
+        seconds = time.perf_counter() - start
+    finally:
+        os.environ.pop(RUN_VARIABLE, None)
+    return result, seconds, readEvents(tracePath, run)
+
+def tablePasses(events):
+    # {table: passes} of the table reads and writes of a run
+    passes = {}
+    for event in events:
+        if event["op"] in PASS_OPERATIONS:
+            passes[event["table"]] = passes.get(event["table"], 0) + 1
+    return passes
+
+def measure(tool, elements, seconds, events):
+    passes = tablePasses(events)
+    return {"tool": tool, "elements": elements, "seconds": round(seconds, 3),
+            "elementsPerSecond": round(elements / seconds, 1) if seconds > 0 else None,
+            "passes": sum(passes.values()), "tablePasses": passes,
+            "rows": sum(event["rows"] or 0 for event in events if event["op"] in PASS_OPERATIONS)}
+
+def benchmarkSize(folder, nodes, workers=None):
+    # Measurements of SWMMtoGDB and PopulateSWMMResults on a synthetic model of nodes nodes
+    from PopulateSWMMResults import populateResults
+    from SWMMtoGDB import swmmToGDB
+    modelFolder = os.path.join(folder, "Model{}".format(nodes))
+    if not os.path.isdir(modelFolder):
+        os.makedirs(modelFolder)
+    start = time.perf_counter()
+    inpPath, inputs, links = generateModel(modelFolder, nodes)
+    print("Generated {} nodes and {} links in {:.1f} s".format(nodes, links, time.perf_counter() - start))
+
+    tracePath = os.path.join(modelFolder, "trace.json")
+    if os.path.exists(tracePath):
+        os.remove(tracePath)
+    workspace, seconds, events = tracedRun(tracePath, swmmToGDB, modelFolder, inpPath, "Benchmark", "2021",
+                                           os.path.basename(inpPath), "5.1.015", "2.0.1", ".gpkg")
+    imported = measure("SWMMtoGDB", nodes + links, seconds, events)
+    result, seconds, events = tracedRun(tracePath, lambda: populateResults(openBackend(workspace), inputs, DEFAULT_MAPPING, workers, True))
+    populated = measure("PopulateSWMMResults", nodes + links, seconds, events)
+    os.environ.pop(TRACE_VARIABLE, None)
+    return [dict(measurement, size=nodes) for measurement in (imported, populated)]
+
+def regressions(measurements, baseline):
+    # Messages for each measurement with more table passes or a lower throughput than the baseline
+    earlier = dict(((entry["size"], entry["tool"]), entry) for entry in baseline)
+    messages = []
+    for entry in measurements:
+        before = earlier.get((entry["size"], entry["tool"]))
+        if before is None:
+            continue
+        for table, passes in sorted(entry["tablePasses"].items()):
+            if passes > before["tablePasses"].get(table, 0):
+                messages.append("{} at {}: {} passes over {} (was {})".format(
+                    entry["tool"], entry["size"], passes, table, before["tablePasses"].get(table, 0)))
+        if before["elementsPerSecond"] and entry["elementsPerSecond"] < before["elementsPerSecond"] * (1 - THROUGHPUT_TOLERANCE):
+            messages.append("{} at {}: {:,.0f} elements/s (was {:,.0f})".format(
+                entry["tool"], entry["size"], entry["elementsPerSecond"], before["elementsPerSecond"]))
+    return messages
+
+def summaryLines(measurements):
+    lines = ["{:20} {:>9} {:>9} {:>12} {:>7} {:>11}".format("Tool", "Nodes", "Seconds", "Elements/s", "Passes", "Max/table")]
+    for entry in measurements:
+        lines.append("{:20} {:>9} {:>9.2f} {:>12,.0f} {:>7} {:>11}".format(
+            entry["tool"], entry["size"], entry["seconds"], entry["elementsPerSecond"] or 0, entry["passes"],
+            max(entry["tablePasses"].values()) if entry["tablePasses"] else 0))
+    return lines
+
+def runBenchmark(folder, sizes=DEFAULT_SIZES, workers=None, baselinePath=None):
+    measurements = []
+    for nodes in sizes:
+        measurements += benchmarkSize(folder, nodes, workers)
+    with open(os.path.join(folder, RESULTS_FILE), "w") as file:
+        json.dump(measurements, file, indent=1)
+    print("\n" + "\n".join(summaryLines(measurements)))
+    if baselinePath:
+        with open(baselinePath) as file:
+            messages = regressions(measurements, json.load(file))
+        print("\n{} regressions against {}".format(len(messages), baselinePath))
+        for message in messages:
+            print("  " + message)
+        return not messages
+    return True
+
+if __name__ == "__main__":
+    parameters = sys.argv[1:5] + [""] * (5 - len(sys.argv))
+    folder, sizes, workers, baselinePath = parameters
+    sizes = [int(size) for size in sizes.split(",")] if sizes else DEFAULT_SIZES
+    if not runBenchmark(folder, sizes, int(workers) if workers else None, baselinePath or None):
+        sys.exit(1)
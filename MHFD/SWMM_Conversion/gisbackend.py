@@ -0,0 +1,362 @@
+# gisbackend.py
+# Description: Geodatabase access for the SWMM conversion tools. The tools only call the methods
+#   below, so they run against a file geodatabase through arcpy or, without ArcGIS, against a
+#   SQLite/GeoPackage stand-in where each feature class is a table with the same field names.
+#       listFields(table)                 field names of a table (none if it does not exist)
+#       readRows(table, fields)           iterate the rows of a table as tuples
+#       updateRows(table, fields, update) one pass over a table; update(row) returns the new row,
+#                                         or None to leave the row unchanged
+#       createFeatureClass(name, geometryType, wkid, fields)
+#                                         create a feature class with all of its fields at once
+#       addFields(table, fields)          add [mhfdschema.Field] to an existing table at once
+#       createTable(name, fields)         create a table without geometry
+#       insertRows(table, fields, rows)   write rows to a table in one pass
+#       message(text)                     tool message (arcpy.AddMessage or print)
+#   and for the shapefiles exported by the SWIMM GUI
+#       sourceLayers(folder)              paths of the shapefiles in a folder
+#       describeSource(path)              (geometry type, [mhfdschema.Field]) of a shapefile
+#       readSource(path, fields, transform)
+#                                         iterate the features of a shapefile; with a transform
+#                                         (see projection.transformer) the geometry is WKB passed
+#                                         through it
+#       sourceProjection(path)            .prj (WKT) text of a shapefile, or None if undefined
+#       defineProjection(path, wkid)      stamp a spatial reference on a shapefile
+#   The geometry is the field GEOMETRY ("SHAPE@"), always first in source and inserted rows;
+#   GEOMETRY_WKB ("SHAPE@WKB") inserts well-known binary geometry instead (see wkb.py).
+#   openBackend(workspace) picks the backend from the workspace path: .gpkg, .sqlite and .db
+#   files open the SQLite stand-in, anything else (a .gdb folder) opens arcpy. createBackend()
+#   creates a new workspace first. A backend whose parallel attribute is True can be opened by
+#   several processes at once, each importing its own layers. Both return the backend wrapped for
+#   timing when the MHFD_TRACE environment variable is set (see tracing.py).
+#   toolParameters(count) returns the parameters of a tool as text, from arcpy when it can be
+#   imported (ArcGIS script tools, see inArcGIS()) and otherwise from the command line.
+
+######################################################################################################
+
+import itertools, os, struct, sys
+
+SQLITE_EXTENSIONS = (".gpkg", ".sqlite", ".db")
+
+GEOMETRY = "SHAPE@"
+GEOMETRY_WKB = "SHAPE@WKB"
+
+# AddField type of each arcpy field type copied from a shapefile
+ARCPY_TYPES = {"String": "TEXT", "Double": "DOUBLE", "Single": "FLOAT", "Integer": "LONG", "SmallInteger": "SHORT", "Date": "DATE"}
+
+# Column type of each AddField type in the SQLite stand-in (a REAL column has no precision or scale)
+SQLITE_TYPES = {"TEXT": "TEXT", "DOUBLE": "REAL", "FLOAT": "REAL", "LONG": "INTEGER", "SHORT": "INTEGER", "DATE": "TEXT"}
+
+# Spatial references written to .prj files and GeoPackages: wkid -> (organization, name, ESRI WKT)
+SPATIAL_REFERENCES = {
+    102654: ("ESRI", "NAD_1983_StatePlane_Colorado_Central_FIPS_0502_Feet",
+             'PROJCS["NAD_1983_StatePlane_Colorado_Central_FIPS_0502_Feet",GEOGCS["GCS_North_American_1983",'
+             'DATUM["D_North_American_1983",SPHEROID["GRS_1980",6378137.0,298.257222101]],PRIMEM["Greenwich",0.0],'
+             'UNIT["Degree",0.0174532925199433]],PROJECTION["Lambert_Conformal_Conic"],PARAMETER["False_Easting",3000000.000316083],'
+             'PARAMETER["False_Northing",1000000.000124672],PARAMETER["Central_Meridian",-105.5],PARAMETER["Standard_Parallel_1",38.45],'
+             'PARAMETER["Standard_Parallel_2",39.75],PARAMETER["Latitude_Of_Origin",37.83333333333334],UNIT["Foot_US",0.3048006096012192]]'),
+}
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def column(field):
+    # SQLite column of a field name; the geometry is stored in Shape
+    return quote("Shape" if field in (GEOMETRY, GEOMETRY_WKB) else field)
+
+class ArcpyBackend:
+    # Geodatabase access through arcpy; arcpy is only imported when this backend is opened
+
+    # A file geodatabase takes schema changes from one process at a time
+    parallel = False
+
+    def __init__(self, workspace):
+        import arcpy
+        self.arcpy = arcpy
+        self.workspace = workspace
+        arcpy.env.overwriteOutput = True
+        arcpy.env.workspace = workspace
+
+    def listFields(self, table):
+        if not self.arcpy.Exists(table):
+            return []
+        return [field.name for field in self.arcpy.ListFields(table)]
+
+    def readRows(self, table, fields):
+        with self.arcpy.da.SearchCursor(table, fields) as cursor:
+            for row in cursor:
+                yield row
+
+    def updateRows(self, table, fields, update):
+        # Returns the number of rows changed
+        changed = 0
+        with self.arcpy.da.UpdateCursor(table, fields) as cursor:
+            for row in cursor:
+                newRow = update(row)
+                if newRow is not None:
+                    cursor.updateRow(newRow)
+                    changed += 1
+        return changed
+
+    def createFeatureClass(self, name, geometryType, wkid, fields):
+        # Creates the feature class and adds its fields (see addFields)
+        arcpy = self.arcpy
+        arcpy.CreateFeatureclass_management(self.workspace, name, geometryType, spatial_reference=arcpy.SpatialReference(wkid))
+        self.addFields(os.path.join(self.workspace, name), fields)
+
+    def addFields(self, table, fields):
+        # AddFields has no precision or scale: runs of fields without them are added in one AddFields
+        # call, fields with them (the DOUBLE 10,2 discharge fields) by AddField, in schema order
+        for exact, run in itertools.groupby(fields, lambda field: bool(field.precision or field.scale)):
+            if not exact:
+                self.arcpy.AddFields_management(table, [[field.name, field.type, "", field.length or ""] for field in run])
+                continue
+            for field in run:
+                self.arcpy.AddField_management(table, field.name, field.type, field.precision or "", field.scale or "", field.length or "")
+
+    def createTable(self, name, fields):
+        self.arcpy.CreateTable_management(self.workspace, name)
+        self.addFields(os.path.join(self.workspace, name), fields)
+
+    def insertRows(self, table, fields, rows):
+        # Returns the number of rows written
+        count = 0
+        with self.arcpy.da.InsertCursor(table, fields) as cursor:
+            for row in rows:
+                cursor.insertRow(row)
+                count += 1
+        return count
+
+    def sourceLayers(self, folder):
+        self.arcpy.env.workspace = folder
+        try:
+            return [os.path.join(folder, shape) for shape in self.arcpy.ListFeatureClasses()]
+        finally:
+            self.arcpy.env.workspace = self.workspace
+
+    def describeSource(self, path):
+        from mhfdschema import Field
+        fields = [Field(field.name, ARCPY_TYPES[field.type], field.length, field.precision, field.scale, None)
+                  for field in self.arcpy.ListFields(path) if field.type in ARCPY_TYPES]
+        return self.arcpy.Describe(path).shapeType.upper(), fields
+
+    def readSource(self, path, fields, transform=None):
+        if transform is None:
+            return self.readRows(path, fields)
+        import wkb
+        return ([wkb.transform(row[0] and bytes(row[0]), transform)] + list(row[1:]) for row in self.readRows(path, [GEOMETRY_WKB] + fields[1:]))
+
+    def sourceProjection(self, path):
+        reference = self.arcpy.Describe(path).spatialReference
+        if reference is None or reference.name == "Unknown":
+            return None
+        return reference.exportToString().split(";")[0]
+
+    def defineProjection(self, path, wkid):
+        self.arcpy.DefineProjection_management(path, self.arcpy.SpatialReference(wkid))
+
+    def message(self, text):
+        self.arcpy.AddMessage(text)
+
+class SqliteBackend:
+    # SQLite/GeoPackage stand-in: feature classes are tables of the database at path. A .gpkg file
+    # is written as a GeoPackage (gpkg_contents, gpkg_geometry_columns, GeoPackage geometry blobs);
+    # geometry is read and written as WKB either way. Shapefiles are read with shpreader.py.
+
+    # Layers may be imported by several processes at once; SQLite serialises their transactions
+    parallel = True
+
+    def __init__(self, path):
+        import sqlite3
+        self.workspace = path
+        self.connection = sqlite3.connect(path, timeout=600)
+        self.geopackage = path.lower().endswith(".gpkg")
+        if self.geopackage and not self.connection.execute("SELECT name FROM sqlite_master WHERE name = 'gpkg_contents'").fetchone():
+            with self.connection:
+                self.connection.executescript(GEOPACKAGE_TABLES)
+
+    def listFields(self, table):
+        return [row[1] for row in self.connection.execute("PRAGMA table_info({})".format(quote(table)))]
+
+    def geometryIndexes(self, fields):
+        return [i for i, field in enumerate(fields) if field in (GEOMETRY, GEOMETRY_WKB)] if self.geopackage else []
+
+    def readRows(self, table, fields):
+        rows = self.connection.execute("SELECT {} FROM {}".format(", ".join(column(field) for field in fields), quote(table)))
+        indexes = self.geometryIndexes(fields)
+        if not indexes:
+            return rows
+        return (decodeRow(row, indexes) for row in rows)
+
+    def updateRows(self, table, fields, update):
+        # Reads the table once and writes the changed rows back in one transaction
+        rows = self.connection.execute("SELECT rowid, {} FROM {}".format(", ".join(column(field) for field in fields), quote(table))).fetchall()
+        indexes = self.geometryIndexes(fields)
+        srsId = self.srsId(table) if indexes else None
+        changes = []
+        for row in rows:
+            newRow = update(decodeRow(row[1:], indexes) if indexes else row[1:])
+            if newRow is not None:
+                changes.append(tuple(encodeRow(newRow, indexes, srsId) if indexes else newRow) + (row[0],))
+        assignments = ", ".join(column(field) + " = ?" for field in fields)
+        with self.connection:
+            self.connection.executemany("UPDATE {} SET {} WHERE rowid = ?".format(quote(table), assignments), changes)
+        return len(changes)
+
+    def srsId(self, table):
+        row = self.connection.execute("SELECT srs_id FROM gpkg_geometry_columns WHERE table_name = ?", (table,)).fetchone()
+        return row[0] if row else 0
+
+    def createFeatureClass(self, name, geometryType, wkid, fields):
+        columns = ["fid INTEGER PRIMARY KEY", "Shape " + GEOPACKAGE_TYPES.get(geometryType, "GEOMETRY")]
+        columns += [quote(field.name) + " " + SQLITE_TYPES[field.type] for field in fields]
+        with self.connection:
+            self.connection.execute("DROP TABLE IF EXISTS {}".format(quote(name)))
+            self.connection.execute("CREATE TABLE {} ({})".format(quote(name), ", ".join(columns)))
+            if self.geopackage:
+                if wkid in SPATIAL_REFERENCES:
+                    organization, srsName, definition = SPATIAL_REFERENCES[wkid]
+                    self.connection.execute("INSERT OR IGNORE INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, NULL)",
+                                            (srsName, wkid, organization, wkid, definition))
+                self.connection.execute("DELETE FROM gpkg_contents WHERE table_name = ?", (name,))
+                self.connection.execute("DELETE FROM gpkg_geometry_columns WHERE table_name = ?", (name,))
+                self.connection.execute("INSERT INTO gpkg_contents (table_name, data_type, identifier, srs_id) VALUES (?, 'features', ?, ?)", (name, name, wkid))
+                self.connection.execute("INSERT INTO gpkg_geometry_columns VALUES (?, 'Shape', ?, ?, 0, 0)",
+                                        (name, GEOPACKAGE_TYPES.get(geometryType, "GEOMETRY"), wkid))
+
+    def createTable(self, name, fields):
+        columns = ["fid INTEGER PRIMARY KEY"] + [quote(field.name) + " " + SQLITE_TYPES[field.type] for field in fields]
+        with self.connection:
+            self.connection.execute("DROP TABLE IF EXISTS {}".format(quote(name)))
+            self.connection.execute("CREATE TABLE {} ({})".format(quote(name), ", ".join(columns)))
+            if self.geopackage:
+                self.connection.execute("DELETE FROM gpkg_contents WHERE table_name = ?", (name,))
+                self.connection.execute("INSERT INTO gpkg_contents (table_name, data_type, identifier) VALUES (?, 'attributes', ?)", (name, name))
+
+    def addFields(self, table, fields):
+        with self.connection:
+            for field in fields:
+                self.connection.execute("ALTER TABLE {} ADD COLUMN {} {}".format(quote(table), quote(field.name), SQLITE_TYPES[field.type]))
+
+    def insertRows(self, table, fields, rows):
+        # Writes every row with one executemany in one transaction; returns the number of rows written
+        statement = "INSERT INTO {} ({}) VALUES ({})".format(quote(table), ", ".join(column(field) for field in fields), ", ".join("?" * len(fields)))
+        indexes = self.geometryIndexes(fields)
+        if indexes:
+            srsId = self.srsId(table)
+            rows = (encodeRow(row, indexes, srsId) for row in rows)
+        with self.connection:
+            return self.connection.executemany(statement, rows).rowcount
+
+    def sourceLayers(self, folder):
+        return sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.lower().endswith(".shp"))
+
+    def describeSource(self, path):
+        from shpreader import Shapefile
+        shape = Shapefile(path)
+        return shape.geometryType, shape.fields
+
+    def readSource(self, path, fields, transform=None):
+        # Rows of a shapefile; the geometry (first field) is WKB
+        from shpreader import Shapefile
+        shape = Shapefile(path)
+        if transform is not None:
+            shape.project(transform)
+        return shape.rows(fields[1:])
+
+    def sourceProjection(self, path):
+        prj = os.path.splitext(path)[0] + ".prj"
+        if not os.path.exists(prj):
+            return None
+        with open(prj) as file:
+            return file.read().strip() or None
+
+    def defineProjection(self, path, wkid):
+        # Writes the .prj of a shapefile
+        with open(os.path.splitext(path)[0] + ".prj", "w") as file:
+            file.write(SPATIAL_REFERENCES[wkid][2])
+
+    def message(self, text):
+        print(text)
+
+    def close(self):
+        self.connection.close()
+
+# GeoPackage tables (GeoPackage 1.2) and geometry type of each feature class geometry type
+GEOPACKAGE_TABLES = """
+PRAGMA application_id = 1196444487;
+PRAGMA user_version = 10200;
+CREATE TABLE gpkg_spatial_ref_sys (srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, organization TEXT NOT NULL,
+    organization_coordsys_id INTEGER NOT NULL, definition TEXT NOT NULL, description TEXT);
+INSERT INTO gpkg_spatial_ref_sys VALUES ('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined', NULL);
+INSERT INTO gpkg_spatial_ref_sys VALUES ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined', NULL);
+CREATE TABLE gpkg_contents (table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, identifier TEXT UNIQUE,
+    description TEXT DEFAULT '', last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER);
+CREATE TABLE gpkg_geometry_columns (table_name TEXT NOT NULL, column_name TEXT NOT NULL, geometry_type_name TEXT NOT NULL,
+    srs_id INTEGER NOT NULL, z TINYINT NOT NULL, m TINYINT NOT NULL, PRIMARY KEY (table_name, column_name));
+"""
+GEOPACKAGE_TYPES = {"POINT": "POINT", "MULTIPOINT": "MULTIPOINT", "POLYLINE": "GEOMETRY", "POLYGON": "GEOMETRY"}
+
+# Envelope bytes of each GeoPackage geometry header envelope code
+ENVELOPE_BYTES = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+
+def encodeRow(row, indexes, srsId):
+    # WKB geometry -> GeoPackage geometry blob (little endian header, no envelope)
+    row = list(row)
+    for i in indexes:
+        if row[i] is not None:
+            row[i] = b"GP\x00\x01" + struct.pack("<i", srsId) + bytes(row[i])
+    return row
+
+def decodeRow(row, indexes):
+    row = list(row)
+    for i in indexes:
+        blob = row[i]
+        if blob is not None and blob[:2] == b"GP":
+            row[i] = bytes(blob[8 + ENVELOPE_BYTES[(blob[3] >> 1) & 7]:])
+    return tuple(row)
+
+def createBackend(folder, name, extension=".gdb"):
+    # Creates the workspace folder/name<extension>, replacing an existing one, and returns its backend
+    path = os.path.join(folder, name + extension)
+    from resultstate import clearState
+    clearState(path)
+    from tracing import traced
+    if extension.lower() in SQLITE_EXTENSIONS:
+        if os.path.exists(path):
+            os.remove(path)
+        return traced(SqliteBackend(path))
+    import arcpy
+    arcpy.env.overwriteOutput = True
+    arcpy.CreateFileGDB_management(folder, name)
+    return traced(ArcpyBackend(path))
+
+def openBackend(workspace, run=None):
+    # Backend of an existing workspace; run is the trace run ID a worker process records under
+    from tracing import traced
+    if os.path.splitext(workspace)[1].lower() in SQLITE_EXTENSIONS:
+        return traced(SqliteBackend(workspace), run)
+    return traced(ArcpyBackend(workspace), run)
+
+# Value ArcGIS passes for an optional parameter left empty
+EMPTY_PARAMETER = "#"
+
+def inArcGIS():
+    # Whether arcpy can be imported, i.e. the tool runs inside ArcGIS (or its Python)
+    try:
+        import arcpy
+    except ImportError:
+        return False
+    return True
+
+def toolParameters(count, arguments=None):
+    # count parameters as text, "" where empty. Inside ArcGIS every parameter is also in sys.argv
+    # ("#" when empty), so the mode is picked by whether arcpy imports; without arcpy they are
+    # arguments (default the command line arguments)
+    if inArcGIS():
+        import arcpy
+        values = [arcpy.GetParameterAsText(i) for i in range(count)]
+    else:
+        values = list(sys.argv[1:] if arguments is None else arguments)[:count]
+    values += [""] * (count - len(values))
+    return ["" if value.strip() == EMPTY_PARAMETER else value for value in values]
@@ -0,0 +1,80 @@
+# mhfdschema.py
+# Description: The MHFD deliverable schema of the SWMM feature classes, kept as data so SWMMtoGDB
+#   can create each feature class with all of its fields in one batched call and fill the project
+#   fields while the features are copied, instead of one AddField/CalculateField rewrite per field.
+#       MHFD_FIELDS     fields added to every feature class (DESIGNPT only to the node layers)
+#       CONSTANT_FIELDS fields filled from the tool parameters
+#       DROP_FIELDS     fields autopopulated by the SWIMM export that are not delivered
+
+######################################################################################################
+
+from collections import namedtuple
+from swmmresults import RETURN_PERIODS
+
+# type is the AddField type (TEXT, DOUBLE, FLOAT, LONG, SHORT, DATE); length is used by TEXT fields
+# and precision/scale by DOUBLE fields. features limits a field to those feature classes (None: all).
+Field = namedtuple("Field", ["name", "type", "length", "precision", "scale", "features"])
+
+def textField(name, length, features=None):
+    return Field(name, "TEXT", length, None, None, features)
+
+def doubleField(name, features=None):
+    return Field(name, "DOUBLE", None, 10, 2, features)
+
+DESIGNPT_FEATURES = ("Dividers", "Junctions", "Outfalls", "Storages")
+
+MHFD_FIELDS = ([textField("SOURCE", 255),
+                textField("STUDY_YR", 4),
+                textField("MODEL", 50),
+                textField("SWMM_VER", 50),
+                textField("CUHP_VER", 10),
+                doubleField("MHFDBASIN"),
+                textField("DESIGNPT", 10, DESIGNPT_FEATURES)]
+               + [doubleField("Q_Ex_" + period) for period in ["WQ"] + RETURN_PERIODS]
+               + [doubleField("Q_Fut_" + period) for period in ["WQ"] + RETURN_PERIODS]
+               + [textField("LASTEDITOR", 255),
+                  textField("LAST_DATE", 10)])
+
+# Field filled from each tool parameter
+CONSTANT_FIELDS = ["SOURCE", "STUDY_YR", "MODEL", "SWMM_VER", "CUHP_VER"]
+
+DROP_FIELDS = ["TREATMENT","BASEPATTRN","TIMESERIES","SCALEFACTR","AVGVALUE","PATTERN1","PATTERN2",
+               "PATTERN3","PATTERN4","HYDROGRAPH","SSAREA","TOTCONAREA","IMPCONAREA","UNITFLOW",
+               "AVGDEPTH","MAXDEPTH","MAXHGL","TIMEMAXHGL","REMAXDEPTH","MAXLATFLOW","MAXTOTFLOW",
+               "TOTLATFLOW","TOTINFLOW","CULVRTCODE","CTRLRULES","MAXSPREAD","TOTCONAREA",
+               "IMPCONAREA","UNITFLOW","MAXFLOW","TIMEMAXFLW","MAXVELOCIT","CAPFLOW","CAPDEPTH", "MAXVOLUME",
+               "FULLBOTH","HRSFULLUP", "FULLDOWN","FULLNORMAL","HRSLIMITED","LENGTHFACT","DRY","SUBCRIT",
+               "SUPERCRIT","NORMALLTD","INLETCNTRL","SEEPAGE","OPENRATE","ENDCONTRCT","ENDCOEFF",
+               "SURCHARGE","COEFFCURVE","ROADWIDTH","ROADSURF","BASEFLOW","FLOWERROR","HRSSURCHAR","MAXSURCHAR",
+               "MINDEPTHBR","HOURSFLOOD","MAXFLOODR","TOTFLDVOL","MAXPONDED","OUTLET","FLOWFREQ","AVGFLOW",
+               "TOTALFLOW","PONDEDAREA","SUCTHEAD","CONDUCT","INITDEFICT","AVGVOLUME","AVGPERCENT","EVAPLOSS",
+               "INFILLOSS","PCNTLOSS","MAXPERCENT","MAXOUTFLOW"]
+
+# Further fields dropped from single feature classes
+FEATURE_DROP_FIELDS = {"Outlets": ["COEFF"]}
+
+# Layers of the SWIMM export that are not delivered
+SKIPPED_LAYERS = ["Subcatchments"]
+
+def mhfdFields(feature):
+    return [field for field in MHFD_FIELDS if field.features is None or feature in field.features]
+
+def targetFields(feature, sourceFields):
+    # Fields of the delivered feature class: the source fields that are kept, then the MHFD fields.
+    # A source field with the name of an MHFD field takes the MHFD definition.
+    mhfd = mhfdFields(feature)
+    dropped = set(name.upper() for name in DROP_FIELDS + FEATURE_DROP_FIELDS.get(feature, []))
+    dropped.update(field.name.upper() for field in mhfd)
+    return [field for field in sourceFields if field.name.upper() not in dropped] + mhfd
+
+def rowBuilder(fields, sourceFields, constants):
+    # Returns a function turning a source row (geometry first) into a row of fields (geometry first);
+    # constants maps CONSTANT_FIELDS names to the tool parameters
+    sourceIndex = dict((field.name.upper(), i + 1) for i, field in enumerate(sourceFields))
+    plan = [(None, constants[field.name]) if field.name in constants else (sourceIndex.get(field.name.upper()), None)
+            for field in fields]
+
+    def build(row):
+        return [row[0]] + [row[index] if index is not None else value for index, value in plan]
+
+    return build
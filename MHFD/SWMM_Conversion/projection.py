@@ -0,0 +1,250 @@
+# projection.py
+# Description: NumPy-vectorized map projections for bringing SWIMM models delivered in another
+#   coordinate system into NAD 1983 StatePlane Colorado Central FIPS 0502 Feet (102654), instead of
+#   stamping 102654 on coordinates that are not in it.
+#       fromPrj(text)                   projection described by .prj (ESRI or OGC WKT) text:
+#                                       Lambert Conformal Conic (1SP/2SP), Transverse Mercator
+#                                       (UTM) or geographic
+#       Projection.forward(lon, lat)    degrees -> projected coordinates in the projection's unit
+#       Projection.inverse(x, y)        projected coordinates -> degrees
+#       transform(coords, source, target)
+#                                       (n, 2) coordinate array from one projection to another,
+#                                       CHUNK points at a time
+#       COLORADO_CENTRAL                the 102654 projection
+#       validate()                      checks the formulas against published control points
+#   Ellipsoid formulas follow Snyder, Map Projections - A Working Manual (USGS PP 1395). NAD 83 and
+#   WGS 84 are treated as the same datum (under a metre apart); coordinates on another datum
+#   (e.g. NAD 27) need a datum shift and are refused.
+
+######################################################################################################
+
+import re
+import numpy as np
+from gisbackend import SPATIAL_REFERENCES
+
+# Points transformed at a time
+CHUNK = 1000000
+
+# Semi-major axis (metres) and inverse flattening
+ELLIPSOIDS = {"GRS80": (6378137.0, 298.257222101), "WGS84": (6378137.0, 298.257223563), "CLARKE1866": (6378206.4, 294.9786982)}
+
+# US survey foot in metres
+FOOT_US = 1200.0 / 3937.0
+
+# Datums that can be used without a datum shift
+NAD83_DATUMS = ("NORTH_AMERICAN_1983", "WGS_1984", "WGS84", "NAD83")
+
+class Geographic:
+    # Longitude/latitude in degrees
+
+    def __init__(self, ellipsoid=ELLIPSOIDS["GRS80"]):
+        self.ellipsoid = ellipsoid
+
+    def forward(self, lon, lat):
+        return np.asarray(lon, "f8"), np.asarray(lat, "f8")
+
+    def inverse(self, x, y):
+        return np.asarray(x, "f8"), np.asarray(y, "f8")
+
+    def parameters(self):
+        return ("geographic",)
+
+class LambertConformalConic:
+    # Snyder (15-1) to (15-11), ellipsoidal; one standard parallel with a scale factor, or two
+
+    def __init__(self, lat0, lon0, parallel1, parallel2=None, falseEasting=0.0, falseNorthing=0.0, unit=1.0, scaleFactor=1.0, ellipsoid=ELLIPSOIDS["GRS80"]):
+        self.ellipsoid = ellipsoid
+        self.a, inverseFlattening = ellipsoid
+        flattening = 1.0 / inverseFlattening
+        self.e = np.sqrt(flattening * (2 - flattening))
+        self.lon0 = np.radians(lon0)
+        self.falseEasting, self.falseNorthing, self.unit, self.k0 = falseEasting, falseNorthing, unit, scaleFactor
+        self.definition = ("lcc", lat0, lon0, parallel1, parallel2, falseEasting, falseNorthing, unit, scaleFactor) + tuple(ellipsoid)
+        phi1 = np.radians(parallel1)
+        if parallel2 is None or parallel1 == parallel2:
+            self.n = np.sin(phi1)
+        else:
+            phi2 = np.radians(parallel2)
+            self.n = (np.log(self.m(phi1)) - np.log(self.m(phi2))) / (np.log(self.t(phi1)) - np.log(self.t(phi2)))
+        self.F = self.m(phi1) / (self.n * self.t(phi1) ** self.n)
+        self.rho0 = self.a * self.F * self.k0 * self.t(np.radians(lat0)) ** self.n
+
+    def m(self, phi):
+        return np.cos(phi) / np.sqrt(1 - (self.e * np.sin(phi)) ** 2)
+
+    def t(self, phi):
+        eSin = self.e * np.sin(phi)
+        return np.tan(np.pi / 4 - phi / 2) / ((1 - eSin) / (1 + eSin)) ** (self.e / 2)
+
+    def forward(self, lon, lat):
+        rho = self.a * self.F * self.k0 * self.t(np.radians(lat)) ** self.n
+        theta = self.n * (np.radians(lon) - self.lon0)
+        return (rho * np.sin(theta) / self.unit + self.falseEasting,
+                (self.rho0 - rho * np.cos(theta)) / self.unit + self.falseNorthing)
+
+    def inverse(self, x, y):
+        dx = (np.asarray(x, "f8") - self.falseEasting) * self.unit
+        dy = self.rho0 - (np.asarray(y, "f8") - self.falseNorthing) * self.unit
+        sign = np.sign(self.n)
+        rho = sign * np.hypot(dx, dy)
+        theta = np.arctan2(sign * dx, sign * dy)
+        t = (rho / (self.a * self.F * self.k0)) ** (1 / self.n)
+        phi = np.pi / 2 - 2 * np.arctan(t)
+        for i in range(8):
+            eSin = self.e * np.sin(phi)
+            phi = np.pi / 2 - 2 * np.arctan(t * ((1 - eSin) / (1 + eSin)) ** (self.e / 2))
+        return np.degrees(theta / self.n + self.lon0), np.degrees(phi)
+
+    def parameters(self):
+        return self.definition
+
+class TransverseMercator:
+    # Snyder (8-9) to (8-25), ellipsoidal series; accurate to millimetres within a UTM zone
+
+    def __init__(self, lat0, lon0, scaleFactor, falseEasting=0.0, falseNorthing=0.0, unit=1.0, ellipsoid=ELLIPSOIDS["GRS80"]):
+        self.ellipsoid = ellipsoid
+        self.a, inverseFlattening = ellipsoid
+        flattening = 1.0 / inverseFlattening
+        self.e2 = flattening * (2 - flattening)
+        self.ep2 = self.e2 / (1 - self.e2)
+        self.lon0 = np.radians(lon0)
+        self.k0, self.falseEasting, self.falseNorthing, self.unit = scaleFactor, falseEasting, falseNorthing, unit
+        self.definition = ("tm", lat0, lon0, scaleFactor, falseEasting, falseNorthing, unit) + tuple(ellipsoid)
+        self.M0 = self.meridian(np.radians(lat0))
+
+    def meridian(self, phi):
+        e2 = self.e2
+        return self.a * ((1 - e2 / 4 - 3 * e2 ** 2 / 64 - 5 * e2 ** 3 / 256) * phi
+                         - (3 * e2 / 8 + 3 * e2 ** 2 / 32 + 45 * e2 ** 3 / 1024) * np.sin(2 * phi)
+                         + (15 * e2 ** 2 / 256 + 45 * e2 ** 3 / 1024) * np.sin(4 * phi)
+                         - (35 * e2 ** 3 / 3072) * np.sin(6 * phi))
+
+    def forward(self, lon, lat):
+        phi = np.radians(lat)
+        sin, cos, tan = np.sin(phi), np.cos(phi), np.tan(phi)
+        N = self.a / np.sqrt(1 - self.e2 * sin ** 2)
+        T = tan ** 2
+        C = self.ep2 * cos ** 2
+        A = (np.radians(lon) - self.lon0) * cos
+        x = self.k0 * N * (A + (1 - T + C) * A ** 3 / 6 + (5 - 18 * T + T ** 2 + 72 * C - 58 * self.ep2) * A ** 5 / 120)
+        y = self.k0 * (self.meridian(phi) - self.M0 + N * tan * (A ** 2 / 2 + (5 - T + 9 * C + 4 * C ** 2) * A ** 4 / 24
+                                                               + (61 - 58 * T + T ** 2 + 600 * C - 330 * self.ep2) * A ** 6 / 720))
+        return x / self.unit + self.falseEasting, y / self.unit + self.falseNorthing
+
+    def inverse(self, x, y):
+        e2, ep2 = self.e2, self.ep2
+        dx = (np.asarray(x, "f8") - self.falseEasting) * self.unit
+        M = self.M0 + (np.asarray(y, "f8") - self.falseNorthing) * self.unit / self.k0
+        mu = M / (self.a * (1 - e2 / 4 - 3 * e2 ** 2 / 64 - 5 * e2 ** 3 / 256))
+        e1 = (1 - np.sqrt(1 - e2)) / (1 + np.sqrt(1 - e2))
+        phi1 = (mu + (3 * e1 / 2 - 27 * e1 ** 3 / 32) * np.sin(2 * mu) + (21 * e1 ** 2 / 16 - 55 * e1 ** 4 / 32) * np.sin(4 * mu)
+                + (151 * e1 ** 3 / 96) * np.sin(6 * mu) + (1097 * e1 ** 4 / 512) * np.sin(8 * mu))
+        sin, cos, tan = np.sin(phi1), np.cos(phi1), np.tan(phi1)
+        C1 = ep2 * cos ** 2
+        T1 = tan ** 2
+        N1 = self.a / np.sqrt(1 - e2 * sin ** 2)
+        R1 = self.a * (1 - e2) / (1 - e2 * sin ** 2) ** 1.5
+        D = dx / (N1 * self.k0)
+        phi = phi1 - (N1 * tan / R1) * (D ** 2 / 2 - (5 + 3 * T1 + 10 * C1 - 4 * C1 ** 2 - 9 * ep2) * D ** 4 / 24
+                                        + (61 + 90 * T1 + 298 * C1 + 45 * T1 ** 2 - 252 * ep2 - 3 * C1 ** 2) * D ** 6 / 720)
+        lon = self.lon0 + (D - (1 + 2 * T1 + C1) * D ** 3 / 6
+                           + (5 - 2 * C1 + 28 * T1 - 3 * C1 ** 2 + 8 * ep2 + 24 * T1 ** 2) * D ** 5 / 120) / cos
+        return np.degrees(lon), np.degrees(phi)
+
+    def parameters(self):
+        return self.definition
+
+def wktParameters(text):
+    # {parameter name (lower case): value} of a WKT string
+    return dict((name.lower(), float(value)) for name, value in re.findall(r'PARAMETER\[\s*"([^"]+)"\s*,\s*([-+\d.eE]+)\s*\]', text, re.IGNORECASE))
+
+def fromPrj(text):
+    # Projection of .prj (WKT) text; raises ValueError for anything that cannot be transformed here
+    upper = text.upper()
+    datum = re.search(r'DATUM\[\s*"([^"]+)"', upper)
+    if datum and not any(name in datum.group(1) for name in NAD83_DATUMS):
+        raise ValueError("Datum {} needs a datum shift to NAD 83".format(datum.group(1)))
+    spheroid = re.search(r'SPHEROID\[\s*"[^"]*"\s*,\s*([\d.eE+]+)\s*,\s*([\d.eE+]+)', upper)
+    ellipsoid = (float(spheroid.group(1)), float(spheroid.group(2))) if spheroid else ELLIPSOIDS["GRS80"]
+    if not upper.lstrip().startswith("PROJCS"):
+        return Geographic(ellipsoid)
+
+    projection = re.search(r'PROJECTION\[\s*"([^"]+)"', upper)
+    name = projection.group(1) if projection else ""
+    parameters = wktParameters(text)
+    # The linear unit is the last UNIT of a PROJCS (the GEOGCS one comes first)
+    unit = float(re.findall(r'UNIT\[\s*"[^"]*"\s*,\s*([\d.eE+-]+)', upper)[-1])
+    lat0 = parameters.get("latitude_of_origin", parameters.get("latitude_of_center", 0.0))
+    lon0 = parameters.get("central_meridian", parameters.get("longitude_of_center", 0.0))
+    falseEasting, falseNorthing = parameters.get("false_easting", 0.0), parameters.get("false_northing", 0.0)
+    scaleFactor = parameters.get("scale_factor", 1.0)
+    if "LAMBERT_CONFORMAL_CONIC" in name:
+        if "standard_parallel_1" in parameters:
+            return LambertConformalConic(lat0, lon0, parameters["standard_parallel_1"], parameters.get("standard_parallel_2"),
+                                         falseEasting, falseNorthing, unit, scaleFactor, ellipsoid)
+        return LambertConformalConic(lat0, lon0, lat0, None, falseEasting, falseNorthing, unit, scaleFactor, ellipsoid)
+    if "TRANSVERSE_MERCATOR" in name:
+        return TransverseMercator(lat0, lon0, scaleFactor, falseEasting, falseNorthing, unit, ellipsoid)
+    raise ValueError("Projection {} is not supported".format(name or "(none)"))
+
+COLORADO_CENTRAL = fromPrj(SPATIAL_REFERENCES[102654][2])
+
+def sameProjection(source, target):
+    a, b = source.parameters(), target.parameters()
+    return len(a) == len(b) and all(x == y if isinstance(x, str) or x is None or y is None else abs(x - y) <= 1e-9 * max(1.0, abs(x))
+                                    for x, y in zip(a, b))
+
+def transform(coords, source, target=COLORADO_CENTRAL):
+    # (n, 2) coordinates from source to target, CHUNK points at a time
+    coords = np.asarray(coords, "f8").reshape(-1, 2)
+    if sameProjection(source, target):
+        return coords.copy()
+    result = np.empty_like(coords)
+    for start in range(0, len(coords), CHUNK):
+        block = coords[start:start + CHUNK]
+        lon, lat = source.inverse(block[:, 0], block[:, 1])
+        result[start:start + CHUNK, 0], result[start:start + CHUNK, 1] = target.forward(lon, lat)
+    return result
+
+def transformer(prjText, target=COLORADO_CENTRAL):
+    # Function transforming (n, 2) arrays from the .prj coordinate system to target, or None if they
+    # are already in it
+    source = fromPrj(prjText)
+    if sameProjection(source, target):
+        return None
+    return lambda coords: transform(coords, source, target)
+
+# Control points: (name, projection, lon, lat, x, y, unit).
+#   Snyder's worked examples, metres on the Clarke 1866 ellipsoid.
+#   The Lambert Conformal Conic 2SP worked example of EPSG Guidance Note 7-2, in US survey feet
+#   (NAD 27 / Texas South Central).
+#   Colorado Central (102654) at towns across the zone, NAD 83 to EPSG:2232 as computed by PROJ 9.5
+#   (an implementation independent of this one); Glenwood Springs is 1.8 degrees off the central
+#   meridian, where the scale error of a wrong cone constant shows.
+CONTROL_POINTS = [
+    ("Lambert Conformal Conic (Snyder p. 296)", LambertConformalConic(23.0, -96.0, 33.0, 45.0, ellipsoid=ELLIPSOIDS["CLARKE1866"]),
+     -75.0, 35.0, 1894410.9, 1564649.5, "m"),
+    ("Transverse Mercator (Snyder p. 269)", TransverseMercator(0.0, -75.0, 0.9996, ellipsoid=ELLIPSOIDS["CLARKE1866"]),
+     -73.5, 40.5, 127106.5, 4484124.4, "m"),
+    ("LCC 2SP ftUS (EPSG GN 7-2, Texas S Central)", LambertConformalConic(27.0 + 50.0 / 60.0, -99.0, 28.0 + 23.0 / 60.0, 30.0 + 17.0 / 60.0,
+     2000000.0, 0.0, FOOT_US, ellipsoid=ELLIPSOIDS["CLARKE1866"]), -96.0, 28.5, 2963503.91, 254759.80, "ftUS"),
+    ("Colorado Central, Denver (PROJ)", COLORADO_CENTRAL, -105.0, 39.753, 3140584.296, 1699547.148, "ftUS"),
+    ("Colorado Central, Castle Rock (PROJ)", COLORADO_CENTRAL, -104.8561, 39.3722, 3182026.963, 1561099.831, "ftUS"),
+    ("Colorado Central, Glenwood Springs (PROJ)", COLORADO_CENTRAL, -107.3248, 39.5505, 2485473.927, 1630565.796, "ftUS"),
+]
+
+def validate(tolerance=0.1):
+    # Returns [(name, forward error, unit, round trip error in degrees, ok)] for every control point;
+    # the error and the tolerance are in the unit of the point's projection
+    results = []
+    for name, projection, lon, lat, x, y, unit in CONTROL_POINTS:
+        px, py = projection.forward(np.array([lon]), np.array([lat]))
+        error = float(np.hypot(px[0] - x, py[0] - y))
+        rlon, rlat = projection.inverse(px, py)
+        roundTrip = float(max(abs(rlon[0] - lon), abs(rlat[0] - lat)))
+        results.append((name, error, unit, roundTrip, error <= tolerance and roundTrip <= 1e-9))
+    return results
+
+if __name__ == "__main__":
+    for name, error, unit, roundTrip, ok in validate():
+        print("{:45} {:8.3f} {:4} round trip {:.1e} deg  {}".format(name, error, unit, roundTrip, "OK" if ok else "FAILED"))
@@ -0,0 +1,90 @@
+# resultmapping.py
+# Description: Declarative mapping of SWMM peak flow results onto the discharge fields of the
+#   project feature classes, executed by PopulateSWMMResults.py.
+#       FEATURE_SOURCES   feature class -> result source, LINK (links CSV) or NODE (nodes CSV)
+#       SCENARIOS         scenario -> discharge field prefix (Existing -> Q_Ex_, Future -> Q_Fut_)
+#       PERIODS           field suffix -> result column (001 -> F1YR ... 500 -> F500YR)
+#   The discharge field of a scenario and return period is prefix + suffix, e.g. Q_Fut_100.
+#   Another scenario (e.g. Fut_Detention) or return period (e.g. the WQ event) is one more entry
+#   here, or in a JSON mapping file read by loadMapping():
+#       {"features": {"Conduits": "link", "Junctions": "node"},
+#        "scenarios": [{"name": "Fut_Detention", "prefix": "Q_FutDet_",
+#                       "links": "LinksFutDet.csv", "nodes": "NodesFutDet.csv"}],
+#        "periods": [["WQ", "FWQ"], ["001", "F1YR"]]}
+#   Each key is optional and replaces the default when given. A scenario may name its own link
+#   and node inputs (CSVs, or a folder of .out runs as links); relative paths are taken from the
+#   folder of the mapping file.
+
+######################################################################################################
+
+import json, os
+from collections import namedtuple
+from swmmresults import RESULT_COLUMNS, RETURN_PERIODS
+
+LINK, NODE = "link", "node"
+
+# Key field of the results CSV of each source
+SOURCE_KEYS = {LINK: "Link", NODE: "Node"}
+
+# links and nodes are the scenario's inputs when the mapping names them, otherwise None
+Scenario = namedtuple("Scenario", ["name", "prefix", "links", "nodes"])
+
+# features: {feature class: LINK or NODE}, scenarios: [Scenario], periods: [(field suffix, result column)]
+Mapping = namedtuple("Mapping", ["features", "scenarios", "periods"])
+
+FEATURE_SOURCES = {"Conduits": LINK, "Outlets": LINK,
+                   "Junctions": NODE, "Storages": NODE, "Dividers": NODE, "Outfalls": NODE}
+
+SCENARIOS = [Scenario("Existing", "Q_Ex_", None, None),
+             Scenario("Future", "Q_Fut_", None, None)]
+
+PERIODS = list(zip(RETURN_PERIODS, RESULT_COLUMNS))
+
+DEFAULT_MAPPING = Mapping(FEATURE_SOURCES, SCENARIOS, PERIODS)
+
+def dischargeFields(mapping):
+    # Discharge fields written to every feature class, scenario by scenario in period order
+    return [scenario.prefix + suffix for scenario in mapping.scenarios for suffix, column in mapping.periods]
+
+def resultColumns(mapping):
+    return [column for suffix, column in mapping.periods]
+
+def loadMapping(path, default=DEFAULT_MAPPING):
+    # Mapping read from a JSON file; keys that are left out keep the default
+    with open(path) as file:
+        data = json.load(file)
+    folder = os.path.dirname(os.path.abspath(path))
+
+    def inputPath(value):
+        return os.path.join(folder, value) if value else None
+
+    features = default.features
+    if "features" in data:
+        features = dict((feature, source.lower()) for feature, source in data["features"].items())
+        for feature, source in features.items():
+            if source not in SOURCE_KEYS:
+                raise ValueError("{}: source of {} must be link or node, not {}".format(path, feature, source))
+    scenarios = default.scenarios
+    if "scenarios" in data:
+        scenarios = [Scenario(item["name"], item["prefix"], inputPath(item.get("links")), inputPath(item.get("nodes")))
+                     for item in data["scenarios"]]
+    periods = default.periods
+    if "periods" in data:
+        periods = [tuple(period) for period in data["periods"]]
+    mapping = Mapping(features, scenarios, periods)
+    fields = dischargeFields(mapping)
+    if len(set(fields)) != len(fields):
+        raise ValueError("{}: scenarios and periods map more than one result to a field".format(path))
+    return mapping
+
+def withInputs(mapping, inputs):
+    # Mapping with the (links, nodes) inputs of {scenario name: (links, nodes)} filled in; scenarios
+    # that already name their inputs keep them
+    scenarios = []
+    for scenario in mapping.scenarios:
+        if scenario.links is None and scenario.name in inputs:
+            scenario = scenario._replace(links=inputs[scenario.name][0], nodes=inputs[scenario.name][1])
+        if scenario.links is None:
+            raise ValueError("No results given for scenario {}".format(scenario.name))
+        scenarios.append(scenario)
+    return mapping._replace(scenarios=scenarios)
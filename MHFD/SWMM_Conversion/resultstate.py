@@ -0,0 +1,79 @@
+# resultstate.py
+# Description: Change detection for PopulateSWMMResults. After each run the content hash of every
+#   scenario's inputs and a hash of each element's results are saved beside the project workspace
+#   (Project.gdb -> Project.gdb.results.json). The next run
+#       - skips reading a scenario whose inputs have the same content hash (e.g. only the future
+#         run was redone), as long as its field prefix, return periods and feature classes are
+#         the same as before; only the feature classes populated are recorded, so a feature class
+#         missing from the project is populated once it is added
+#       - writes only the fields of the scenarios that changed, and only the rows whose element
+#         results changed, skipping the feature classes with no changed element
+#   createBackend() removes the state with the workspace it replaces. Edits made to the discharge
+#   fields by hand are not seen; run PopulateSWMMResults with --full to rewrite everything.
+
+######################################################################################################
+
+import glob, hashlib, json, os
+import numpy as np
+
+STATE_SUFFIX = ".results.json"
+
+# Bytes read at a time when hashing an input
+HASH_CHUNK = 2 ** 20
+
+def statePath(workspace):
+    return workspace.rstrip("\\/") + STATE_SUFFIX
+
+def loadState(workspace):
+    # {scenario name: entry} of the last run on a workspace, empty if there is none
+    path = statePath(workspace)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+def saveState(workspace, state):
+    # Written to a temporary file first, so an interrupted run leaves the previous state
+    path = statePath(workspace)
+    with open(path + ".tmp", "w") as file:
+        json.dump(state, file, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+def clearState(workspace):
+    path = statePath(workspace)
+    if os.path.exists(path):
+        os.remove(path)
+
+def inputHash(paths):
+    # Content hash of the given result inputs; a folder hashes its *.out runs by name and content
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "*.out"))) if path and os.path.isdir(path) else [path] if path else []
+        for name in files:
+            digest.update(os.path.basename(name).encode() + b"\0")
+            with open(name, "rb") as file:
+                for chunk in iter(lambda: file.read(HASH_CHUNK), b""):
+                    digest.update(chunk)
+        digest.update(b"\1")
+    return digest.hexdigest()
+
+def elementHashes(results):
+    # {name: hash of the element's result values} of a swmmresults.ResultTable
+    values = np.ascontiguousarray(results.values, "<f8")
+    return dict((name, hashlib.blake2b(values[row].tobytes(), digest_size=8).hexdigest()) for name, row in results.index.items())
+
+def changedNames(previous, current):
+    # Names whose hash differs between two elementHashes(), including names only in one of them;
+    # None (every row) without a previous state
+    if previous is None:
+        return None
+    return set(name for name in set(previous) | set(current) if previous.get(name) != current.get(name))
+
+def scenarioEntry(scenario, mapping, features=None):
+    # What a scenario's saved results depend on besides its element results; features are the
+    # feature classes populated ({feature: source}, default all those of the mapping)
+    return {"prefix": scenario.prefix, "periods": [list(period) for period in mapping.periods],
+            "features": mapping.features if features is None else features, "inputs": inputHash([scenario.links, scenario.nodes])}
+
+def sameEntry(entry, saved):
+    return saved is not None and all(saved.get(key) == value for key, value in entry.items())
@@ -0,0 +1,178 @@
+# shpreader.py
+# Description: Pure-Python shapefile reader for the SWIMM exports, so shapefiles can be imported
+#   without ArcGIS. The .dbf is read with one NumPy structured view over its fixed-width records,
+#   and each .shp record is turned into WKB (see wkb.py) as it is read.
+#       Shapefile(path)       geometryType, fields ([mhfdschema.Field]), len() and prj text
+#       rows(fields)          iterate [WKB, value, ...] rows; fields name the .dbf columns wanted
+#       project(function)     pass every coordinate of the layer through function((n, 2) array)
+#                             in one call, e.g. to reproject it (see projection.py)
+#   Point, PolyLine and Polygon shapes (and their Z and M variants, read as 2D) are supported.
+#   Polygon rings are grouped the shapefile way: each clockwise ring starts a polygon and the
+#   counter-clockwise rings after it are its holes.
+
+######################################################################################################
+
+import os, struct
+import numpy as np
+import wkb
+from mhfdschema import Field
+
+# Shape type -> geometry type
+SHAPE_TYPES = {0: None, 1: "POINT", 3: "POLYLINE", 5: "POLYGON", 8: "MULTIPOINT",
+               11: "POINT", 13: "POLYLINE", 15: "POLYGON", 18: "MULTIPOINT",
+               21: "POINT", 23: "POLYLINE", 25: "POLYGON", 28: "MULTIPOINT"}
+
+def sidecar(path, extension):
+    # path with extension, trying the upper case spelling as well
+    base = os.path.splitext(path)[0]
+    for candidate in (base + extension, base + extension.upper()):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+def dbfField(name, kind, length, decimals):
+    if kind == "C":
+        return Field(name, "TEXT", length, None, None, None)
+    if kind == "N" and decimals == 0 and length < 10:
+        return Field(name, "SHORT" if length < 5 else "LONG", None, length, 0, None)
+    if kind in "NF":
+        return Field(name, "DOUBLE", None, length, decimals, None)
+    if kind == "D":
+        return Field(name, "DATE", None, None, None, None)
+    return Field(name, "TEXT", length, None, None, None)
+
+def signedArea(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))
+
+class Shapefile:
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "rb") as file:
+            self.shp = file.read()
+        shapeType = struct.unpack("<i", self.shp[32:36])[0]
+        if shapeType not in SHAPE_TYPES:
+            raise ValueError("{}: unsupported shape type {}".format(path, shapeType))
+        self.geometryType = SHAPE_TYPES[shapeType]
+
+        encoding = "latin-1"
+        cpg = sidecar(path, ".cpg")
+        if cpg:
+            with open(cpg) as file:
+                encoding = file.read().strip() or encoding
+        self.encoding = encoding
+
+        prj = sidecar(path, ".prj")
+        self.prj = None
+        if prj:
+            with open(prj) as file:
+                self.prj = file.read()
+
+        with open(sidecar(path, ".dbf"), "rb") as file:
+            dbf = file.read()
+        count, headerLength, recordLength = struct.unpack("<IHH", dbf[4:12])
+        self.fields = []
+        self.fieldKinds = {}
+        layout = [("deleted", "S1")]
+        for position in range(32, headerLength - 1, 32):
+            if dbf[position] == 0x0D:
+                break
+            name = dbf[position:position + 11].split(b"\0", 1)[0].decode(encoding)
+            kind = chr(dbf[position + 11])
+            length, decimals = dbf[position + 16], dbf[position + 17]
+            self.fields.append(dbfField(name, kind, length, decimals))
+            self.fieldKinds[name] = kind
+            layout.append((name, "S{}".format(length)))
+        recordType = np.dtype(layout)
+        if recordType.itemsize < recordLength:
+            recordType = np.dtype({"names": recordType.names, "formats": [recordType.fields[name][0] for name in recordType.names],
+                                   "offsets": [recordType.fields[name][1] for name in recordType.names], "itemsize": recordLength})
+        self.records = np.frombuffer(dbf, recordType, count, headerLength)
+
+    def __len__(self):
+        return len(self.records)
+
+    def column(self, name):
+        # Values of one .dbf column: floats/ints (None where blank) or stripped strings
+        raw = np.char.strip(self.records[name])
+        field = [field for field in self.fields if field.name == name][0]
+        if field.type in ("DOUBLE", "LONG", "SHORT"):
+            blank = (raw == b"") | np.char.startswith(raw, b"*")
+            values = np.where(blank, b"nan", raw).astype("f8")
+            values = values.tolist()
+            cast = float if field.type == "DOUBLE" else int
+            return [None if blank[i] else cast(value) for i, value in enumerate(values)]
+        if field.type == "DATE":
+            return ["{}-{}-{}".format(value[:4], value[4:6], value[6:]) if len(value) == 8 else None
+                    for value in (value.decode("ascii", "replace") for value in raw)]
+        return [value.decode(self.encoding, "replace") for value in raw]
+
+    def project(self, function):
+        # Rewrites the coordinates of every record in the .shp buffer at once
+        data = self.shp
+        runs = []
+        position = 100
+        end = min(len(data), struct.unpack(">i", data[24:28])[0] * 2)
+        while position + 8 <= end:
+            length = struct.unpack(">i", data[position + 4:position + 8])[0] * 2
+            content = position + 8
+            position = content + length
+            shapeType = struct.unpack("<i", data[content:content + 4])[0]
+            if SHAPE_TYPES.get(shapeType) == "POINT":
+                runs.append((content + 4, 1))
+            elif SHAPE_TYPES.get(shapeType) == "MULTIPOINT":
+                runs.append((content + 40, struct.unpack("<i", data[content + 36:content + 40])[0]))
+            elif shapeType != 0:
+                parts, points = struct.unpack("<ii", data[content + 36:content + 44])
+                runs.append((content + 44 + 4 * parts, points))
+        self.shp = wkb.transformRuns(data, runs, function)
+
+    def geometries(self):
+        # WKB of every record in order (None for null shapes)
+        data = self.shp
+        position = 100
+        end = min(len(data), struct.unpack(">i", data[24:28])[0] * 2)
+        while position + 8 <= end:
+            length = struct.unpack(">i", data[position + 4:position + 8])[0] * 2
+            content = position + 8
+            position = content + length
+            shapeType = struct.unpack("<i", data[content:content + 4])[0]
+            if shapeType == 0:
+                yield None
+            elif SHAPE_TYPES.get(shapeType) == "POINT":
+                yield wkb.point(*struct.unpack("<dd", data[content + 4:content + 20]))
+            elif SHAPE_TYPES.get(shapeType) == "MULTIPOINT":
+                count = struct.unpack("<i", data[content + 36:content + 40])[0]
+                points = np.frombuffer(data, "<f8", count * 2, content + 40).reshape(-1, 2)
+                yield struct.pack("<BII", 1, wkb.MULTIPOINT, count) + b"".join(wkb.point(x, y) for x, y in points.tolist())
+            else:
+                parts, points = struct.unpack("<ii", data[content + 36:content + 44])
+                starts = np.frombuffer(data, "<i4", parts, content + 44).tolist() + [points]
+                coords = np.frombuffer(data, "<f8", points * 2, content + 44 + 4 * parts).reshape(-1, 2)
+                rings = [coords[starts[i]:starts[i + 1]] for i in range(parts)]
+                if SHAPE_TYPES[shapeType] == "POLYLINE":
+                    yield wkb.lineString(rings[0]) if parts == 1 else wkb.multiLineString(rings)
+                else:
+                    yield polygonWkb(rings)
+
+    def rows(self, fields):
+        # [WKB] + values of fields for every record, skipping records marked deleted
+        columns = [self.column(name) for name in fields]
+        deleted = (self.records["deleted"] == b"*").tolist()
+        for i, geometry in enumerate(self.geometries()):
+            if i < len(deleted) and not deleted[i]:
+                yield [geometry] + [column[i] for column in columns]
+
+def polygonWkb(rings):
+    # Clockwise rings are exteriors, counter-clockwise rings holes of the exterior before them
+    polygons = []
+    for ring in rings:
+        if signedArea(ring) <= 0 or not polygons:
+            polygons.append([ring])
+        else:
+            polygons[-1].append(ring)
+    if len(polygons) == 1:
+        return wkb.polygon(polygons[0])
+    return struct.pack("<BII", 1, wkb.MULTIPOLYGON, len(polygons)) + b"".join(wkb.polygon(polygon) for polygon in polygons)
@@ -0,0 +1,251 @@
+# swmminp.py
+# Description: Streaming parser for SWMM .inp files that builds the SWIMM feature layers straight
+#   from the model, without shapefiles exported by hand from the SWIMM GUI.
+#       InpFile(path)           memory maps the file and indexes the byte range of every [SECTION]
+#                               in one scan; lines(section) then reads only that range
+#       readLayers(path)        array-backed LayerTables for Junctions, Outfalls, Storages,
+#                               Dividers, Conduits, Outlets (orifices, weirs and outlets, told apart
+#                               by LINKTYPE) and Subcatchments
+#   Only the deliverable fields are built (none of the fields SWMMtoGDB drops). Numbers are
+#   float64 arrays (NaN where blank), node geometry is x/y arrays and link and subcatchment
+#   geometry is one coordinate array with per-feature offsets. LayerTable.rows() yields WKB
+#   geometry followed by the field values, ready for an insert cursor.
+
+######################################################################################################
+
+import mmap, os, re
+from collections import namedtuple
+import numpy as np
+import wkb
+from mhfdschema import Field
+
+SECTION_PATTERN = re.compile(rb"^[ \t]*\[([^\]\r\n]+)\][^\n]*\n?", re.MULTILINE)
+
+def text(name, length=50):
+    return Field(name, "TEXT", length, None, None, None)
+
+def number(name):
+    return Field(name, "DOUBLE", None, None, None, None)
+
+def token(index):
+    return lambda tokens: tokens[index] if index < len(tokens) else ""
+
+def constant(value):
+    return lambda tokens: value
+
+def stageData(tokens):
+    # FIXED, TIDAL and TIMESERIES outfalls carry stage data before the tide gate flag
+    return tokens[3] if len(tokens) > 3 and tokens[2].upper() in ("FIXED", "TIDAL", "TIMESERIES") else ""
+
+def tideGate(tokens):
+    return token(4 if stageData(tokens) else 3)(tokens)
+
+def storageCurve(tokens):
+    return token(5)(tokens) if token(4)(tokens).upper() == "TABULAR" else ""
+
+# Layer definitions: name, geometry type, deliverable fields after NAME, and the sections read with
+# a token getter for each field
+Layer = namedtuple("Layer", ["name", "geometryType", "fields", "sections"])
+
+LAYERS = [
+    Layer("Junctions", "POINT", [number("INVERTEL"), number("INITDEPTH"), number("SURDEPTH")],
+          [("JUNCTIONS", [token(1), token(3), token(4)])]),
+    Layer("Outfalls", "POINT", [number("INVERTEL"), text("OUTTYPE", 20), text("STAGEDATA"), text("TIDEGATE", 5)],
+          [("OUTFALLS", [token(1), token(2), stageData, tideGate])]),
+    Layer("Storages", "POINT", [number("INVERTEL"), number("INITDEPTH"), text("STORTYPE", 20), text("STORCURVE")],
+          [("STORAGE", [token(1), token(3), token(4), storageCurve])]),
+    Layer("Dividers", "POINT", [number("INVERTEL"), text("DIVLINK"), text("DIVTYPE", 20)],
+          [("DIVIDERS", [token(1), token(2), token(3)])]),
+    Layer("Conduits", "POLYLINE", [text("INLETNODE"), text("OUTLETNODE"), number("LENGTH"), number("ROUGHNESS"),
+                                   number("INOFFSET"), number("OUTOFFSET")],
+          [("CONDUITS", [token(1), token(2), token(3), token(4), token(5), token(6)])]),
+    Layer("Outlets", "POLYLINE", [text("INLETNODE"), text("OUTLETNODE"), text("LINKTYPE", 10), number("OFFSET")],
+          [("ORIFICES", [token(1), token(2), constant("ORIFICE"), token(4)]),
+           ("WEIRS", [token(1), token(2), constant("WEIR"), token(4)]),
+           ("OUTLETS", [token(1), token(2), constant("OUTLET"), token(3)])]),
+    Layer("Subcatchments", "POLYGON", [text("RAINGAGE"), number("AREA"), number("IMPERV"), number("WIDTH"), number("SLOPE")],
+          [("SUBCATCHMENTS", [token(1), token(3), token(4), token(5), token(6)])]),
+]
+
+# Conduit cross sections joined from [XSECTIONS]
+XSECTION_FIELDS = [text("XSHAPE", 20), number("GEOM1"), number("GEOM2")]
+
+class InpFile:
+    # A SWMM .inp file with the byte range of each section; use as a context manager or close()
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        # An empty file cannot be memory mapped
+        self.map = b""
+        if os.path.getsize(path):
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.sections = {}
+        previous = None
+        for match in SECTION_PATTERN.finditer(self.map):
+            if previous is not None:
+                self.sections[previous] = (self.sections[previous][0], match.start())
+            previous = match.group(1).strip().decode("latin-1").upper()
+            self.sections[previous] = (match.end(), len(self.map))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+    def lines(self, section):
+        # Yields the tokens of each data line of a section (comments and blank lines skipped)
+        start, end = self.sections.get(section.upper(), (0, 0))
+        position = start
+        while position < end:
+            stop = self.map.find(b"\n", position, end)
+            stop = end if stop < 0 else stop + 1
+            line = self.map[position:stop]
+            position = stop
+            line = line.split(b";", 1)[0].split()
+            if line:
+                yield [value.decode("latin-1") for value in line]
+
+    def pointsBySection(self, section):
+        # Names and (n, 2) coordinates of [COORDINATES], [VERTICES] or [Polygons], in file order
+        names, coords = [], []
+        for tokens in self.lines(section):
+            if len(tokens) >= 3:
+                names.append(tokens[0])
+                coords.append((float(tokens[1]), float(tokens[2])))
+        return names, np.array(coords, "f8").reshape(-1, 2)
+
+def groupRanges(names):
+    # {name: (start, stop)} of the consecutive runs of each name
+    ranges = {}
+    start = 0
+    for i in range(1, len(names) + 1):
+        if i == len(names) or names[i] != names[start]:
+            ranges.setdefault(names[start], (start, i))
+            start = i
+    return ranges
+
+def toNumber(value):
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+class LayerTable:
+    # Array-backed feature layer: names, columns {field: array or list}, and geometry as x/y
+    # (points) or offsets into coords (lines and polygons; offsets[i]:offsets[i + 1], empty for a
+    # feature without coordinates)
+
+    def __init__(self, name, geometryType, fields, names, columns, x=None, y=None, offsets=None, coords=None):
+        self.name = name
+        self.geometryType = geometryType
+        self.fields = [text("NAME")] + fields
+        self.names = names
+        self.columns = columns
+        self.x, self.y, self.offsets, self.coords = x, y, offsets, coords
+
+    def __len__(self):
+        return len(self.names)
+
+    def geometry(self, i):
+        # WKB of feature i, or None without coordinates
+        if self.geometryType == "POINT":
+            return None if np.isnan(self.x[i]) else wkb.point(self.x[i], self.y[i])
+        coords = self.coords[self.offsets[i]:self.offsets[i + 1]]
+        if self.geometryType == "POLYGON":
+            return wkb.polygon([coords]) if len(coords) >= 3 else None
+        return wkb.lineString(coords) if len(coords) >= 2 else None
+
+    def rows(self):
+        columns = [self.columns[field.name] for field in self.fields[1:]]
+        numeric = [field.type != "TEXT" for field in self.fields[1:]]
+        for i, name in enumerate(self.names):
+            values = [float(column[i]) if isNumber else column[i] for column, isNumber in zip(columns, numeric)]
+            yield [self.geometry(i), name] + [None if isNumber and value != value else value for value, isNumber in zip(values, numeric)]
+
+def readAttributes(inp, layer):
+    names = []
+    values = [[] for field in layer.fields]
+    for section, getters in layer.sections:
+        for tokens in inp.lines(section):
+            names.append(tokens[0])
+            for column, getter in zip(values, getters):
+                column.append(getter(tokens))
+    columns = {}
+    for field, column in zip(layer.fields, values):
+        columns[field.name] = np.array([toNumber(value) for value in column], "f8") if field.type == "DOUBLE" else column
+    return names, columns
+
+def readLayers(path, layers=None):
+    # LayerTables of the named layers (default all) of a .inp file, skipping layers with no features
+    tables = []
+    with InpFile(path) as inp:
+        nodeNames, nodeCoords = inp.pointsBySection("COORDINATES")
+        nodeIndex = dict((name, i) for i, name in enumerate(nodeNames))
+        vertexNames, vertexCoords = inp.pointsBySection("VERTICES")
+        vertexRanges = groupRanges(vertexNames)
+        for layer in LAYERS:
+            if layers is not None and layer.name not in layers:
+                continue
+            names, columns = readAttributes(inp, layer)
+            if not names:
+                continue
+            fields = list(layer.fields)
+            if layer.geometryType == "POINT":
+                rows = np.array([nodeIndex.get(name, -1) for name in names], "i8")
+                coords = np.vstack([nodeCoords, [[np.nan, np.nan]]])[rows]
+                tables.append(LayerTable(layer.name, "POINT", fields, names, columns, x=coords[:, 0].copy(), y=coords[:, 1].copy()))
+                continue
+            if layer.geometryType == "POLYGON":
+                polygonNames, polygonCoords = inp.pointsBySection("POLYGONS")
+                pieces, source = polygonPieces(names, groupRanges(polygonNames), polygonCoords)
+            else:
+                pieces, source = linkPieces(names, columns, nodeIndex, nodeCoords, vertexRanges, vertexCoords)
+            offsets = np.zeros(len(names) + 1, "i8")
+            offsets[1:] = np.cumsum([len(piece) for piece in pieces])
+            coords = source[np.concatenate(pieces)] if len(pieces) and offsets[-1] else np.zeros((0, 2))
+            if layer.name == "Conduits":
+                fields += XSECTION_FIELDS
+                columns.update(readXsections(inp, names))
+            tables.append(LayerTable(layer.name, layer.geometryType, fields, names, columns, offsets=offsets, coords=coords))
+    return tables
+
+def linkPieces(names, columns, nodeIndex, nodeCoords, vertexRanges, vertexCoords):
+    # Row indexes of each link's coordinates (inlet node, vertices, outlet node) into one stacked
+    # array of node and vertex coordinates
+    nodeCount = len(nodeCoords)
+    pieces = []
+    for name, inlet, outlet in zip(names, columns["INLETNODE"], columns["OUTLETNODE"]):
+        if inlet not in nodeIndex or outlet not in nodeIndex:
+            pieces.append(np.zeros(0, "i8"))
+            continue
+        start, stop = vertexRanges.get(name, (0, 0))
+        pieces.append(np.concatenate([[nodeIndex[inlet]], nodeCount + np.arange(start, stop), [nodeIndex[outlet]]]).astype("i8"))
+    return pieces, np.vstack([nodeCoords, vertexCoords])
+
+def polygonPieces(names, ranges, coords):
+    pieces = []
+    for name in names:
+        start, stop = ranges.get(name, (0, 0))
+        pieces.append(np.arange(start, stop, dtype="i8"))
+    return pieces, coords
+
+def readXsections(inp, names):
+    shapes = {}
+    for tokens in inp.lines("XSECTIONS"):
+        shapes[tokens[0]] = tokens
+    columns = {"XSHAPE": [], "GEOM1": np.full(len(names), np.nan), "GEOM2": np.full(len(names), np.nan)}
+    for i, name in enumerate(names):
+        tokens = shapes.get(name, [])
+        columns["XSHAPE"].append(tokens[1] if len(tokens) > 1 else "")
+        if len(tokens) > 2:
+            columns["GEOM1"][i] = toNumber(tokens[2])
+        if len(tokens) > 3:
+            columns["GEOM2"][i] = toNumber(tokens[3])
+    return columns
@@ -0,0 +1,221 @@
+# swmmnetwork.py
+# Description: Drainage network of a SWMM model as compressed sparse row (CSR) arrays, built from
+#   the link and node feature classes (fromLayers) or straight from the .inp file (fromInp).
+#       Network.order()                 topological order of the nodes (Kahn's algorithm, one
+#                                       NumPy step per level), and the nodes left in loops
+#       Network.upstream(name)          names of every node draining to a node, and downstream()
+#                                       of every node a node drains to (frontier at a time)
+#       Network.accumulate(values)      per node total of values over the node and every distinct
+#                                       node upstream, e.g. tributary area from the subcatchment
+#                                       areas
+#       Network.designPoints(area)      suggested design points: confluences of two or more
+#                                       upstream nodes each draining at least minArea, and outfalls
+#       Network.decreasingFlows(q)      links whose downstream node has a lower discharge than the
+#                                       upstream node (storages and dividers excepted)
+#   Links run from INLETNODE to OUTLETNODE. Links to a node that is not in the model are left out
+#   (see Network.dangling). Parallel links between the same two nodes (a pipe and its street
+#   overflow) are one path, and where the branches of a divider or of any node with several
+#   downstream nodes join again, what is upstream of the split is counted once: accumulate() adds
+#   the area above each split node to the nodes below it, which are found by one pass over the
+#   network with a bit per split node.
+
+######################################################################################################
+
+import numpy as np
+
+# Rows of the split node bits summed at a time
+BIT_ROWS = 65536
+
+# Node and link feature classes, and the node kinds where discharge may drop downstream
+NODE_FEATURES = ["Junctions", "Storages", "Dividers", "Outfalls"]
+LINK_FEATURES = ["Conduits", "Outlets"]
+ATTENUATING_FEATURES = ("Storages", "Dividers")
+
+def csr(keys, count):
+    # (starts, order): the positions of the entries with key k are order[starts[k]:starts[k + 1]]
+    order = np.argsort(keys, kind="stable")
+    return np.searchsorted(keys[order], np.arange(count + 1)), order
+
+def gather(starts, order, rows):
+    # Entries of every row in rows, one row after another
+    counts = starts[rows + 1] - starts[rows]
+    first = np.repeat(starts[rows] - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+    return order[first + np.arange(counts.sum())]
+
+class Network:
+
+    def __init__(self, nodes, links, inlets, outlets, kinds=None):
+        # nodes: node names; links, inlets, outlets: link names and their end node names;
+        # kinds: feature class of each node
+        self.nodes = list(nodes)
+        self.index = dict((name, i) for i, name in enumerate(self.nodes))
+        self.kinds = list(kinds) if kinds is not None else [None] * len(self.nodes)
+        source = np.array([self.index.get(name, -1) for name in inlets], "i8")
+        target = np.array([self.index.get(name, -1) for name in outlets], "i8")
+        known = (source >= 0) & (target >= 0)
+        self.dangling = [name for name, keep in zip(links, known) if not keep]
+        self.links = [name for name, keep in zip(links, known) if keep]
+        self.source, self.target = source[known], target[known]
+        self.downStarts, self.downLinks = csr(self.source, len(self.nodes))
+        self.upStarts, self.upLinks = csr(self.target, len(self.nodes))
+        self.levels = None
+        self.pairs = None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def order(self):
+        # (levels, cyclic): node indexes level by level, each node after every node upstream of
+        # it, and the indexes of the nodes in or below a loop
+        if self.levels is None:
+            inflows = np.bincount(self.target, minlength=len(self.nodes))
+            frontier = np.flatnonzero(inflows == 0)
+            self.levels = []
+            while len(frontier):
+                self.levels.append(frontier)
+                links = gather(self.downStarts, self.downLinks, frontier)
+                targets = self.target[links]
+                np.subtract.at(inflows, targets, 1)
+                targets = np.unique(targets)
+                frontier = targets[inflows[targets] == 0]
+            placed = np.zeros(len(self.nodes), bool)
+            for level in self.levels:
+                placed[level] = True
+            self.cyclic = np.flatnonzero(~placed)
+        return self.levels, self.cyclic
+
+    def traverse(self, start, upstream=True):
+        # Indexes of every node reached from start (an index) against or along the flow
+        starts, order = (self.upStarts, self.upLinks) if upstream else (self.downStarts, self.downLinks)
+        ends = self.source if upstream else self.target
+        seen = np.zeros(len(self.nodes), bool)
+        seen[start] = True
+        frontier = np.array([start])
+        while len(frontier):
+            reached = np.unique(ends[gather(starts, order, frontier)])
+            frontier = reached[~seen[reached]]
+            seen[frontier] = True
+        seen[start] = False
+        return np.flatnonzero(seen)
+
+    def nodePairs(self):
+        # (source, target) node indexes of the distinct node pairs joined by links: parallel links
+        # between two nodes are one pair
+        if self.pairs is None:
+            count = max(len(self.nodes), 1)
+            keys = np.unique(self.source * count + self.target)
+            self.pairs = keys // count, keys % count
+        return self.pairs
+
+    def levelPairs(self, source, target):
+        # (source, target) of the given pairs leaving each level of the nodes, in topological order
+        levels, cyclic = self.order()
+        starts, order = csr(source, len(self.nodes))
+        for level in levels:
+            pairs = gather(starts, order, level)
+            yield source[pairs], target[pairs]
+
+    def upstream(self, name):
+        return [self.nodes[i] for i in self.traverse(self.index[name], True)]
+
+    def downstream(self, name):
+        return [self.nodes[i] for i in self.traverse(self.index[name], False)]
+
+    def accumulate(self, values):
+        # Total of values (one per node) over each node and every distinct node upstream of it.
+        # The pairs leaving split nodes (nodes with two or more downstream nodes) are cut, which
+        # leaves a forest where summing level by level counts every node once; each split node then
+        # adds its forest total to every node below it, marked by a bit per split node carried
+        # down the network.
+        source, target = self.nodePairs()
+        total = np.array(values, "f8")
+        outflows = np.bincount(source, minlength=len(self.nodes))
+        tree = outflows[source] < 2
+        for up, down in self.levelPairs(source[tree], target[tree]):
+            np.add.at(total, down, total[up])
+        splits = np.flatnonzero(outflows >= 2)
+        if not len(splits):
+            return total
+        words = (len(splits) + 63) // 64
+        own = np.zeros((len(self.nodes), words), np.uint64)
+        bits = np.arange(len(splits))
+        own[splits, bits // 64] = np.left_shift(np.uint64(1), (bits % 64).astype(np.uint64))
+        below = np.zeros_like(own)
+        for up, down in self.levelPairs(source, target):
+            np.bitwise_or.at(below, down, below[up] | own[up])
+        weights = np.zeros(words * 64)
+        weights[:len(splits)] = total[splits]
+        for start in range(0, len(self.nodes), BIT_ROWS):
+            block = np.unpackbits(below[start:start + BIT_ROWS].view(np.uint8), axis=1, bitorder="little")
+            total[start:start + BIT_ROWS] += block @ weights
+        return total
+
+    def designPoints(self, area, minArea=0.0):
+        # Node indexes, in topological order, of outfalls draining any area and of confluences
+        # where two or more upstream nodes (not links: parallel links are one branch) each drain
+        # more than minArea of tributary area
+        levels, cyclic = self.order()
+        tributary = self.accumulate(area)
+        source, target = self.nodePairs()
+        branches = np.bincount(target, weights=tributary[source] > minArea, minlength=len(self.nodes))
+        outfalls = np.diff(self.downStarts) == 0
+        suggested = (branches >= 2) | (outfalls & (tributary > minArea))
+        ordered = np.concatenate(levels) if levels else np.zeros(0, "i8")
+        return ordered[suggested[ordered]]
+
+    def decreasingFlows(self, q, tolerance=0.01):
+        # Link indexes where the discharge at the downstream node is more than tolerance (a
+        # fraction) below the upstream node's; blank discharges and links leaving a storage or
+        # divider are not flagged
+        q = np.asarray(q, "f8")
+        upstream, downstream = q[self.source], q[self.target]
+        exempt = np.array([kind in ATTENUATING_FEATURES for kind in self.kinds], bool)
+        with np.errstate(invalid="ignore"):
+            flagged = (downstream < upstream * (1 - tolerance)) & ~exempt[self.source]
+        return np.flatnonzero(flagged)
+
+def fromLayers(backend, nodeFields=()):
+    # (Network, {field: node values}) of a project workspace; nodeFields are read from the node
+    # feature classes in the same pass (NaN where blank)
+    nodes, kinds, values = [], [], [[] for field in nodeFields]
+    for feature in NODE_FEATURES:
+        if not backend.listFields(feature):
+            continue
+        for row in backend.readRows(feature, ["NAME"] + list(nodeFields)):
+            nodes.append(row[0].strip())
+            kinds.append(feature)
+            for column, value in zip(values, row[1:]):
+                column.append(np.nan if value is None else value)
+    links, inlets, outlets = [], [], []
+    for feature in LINK_FEATURES:
+        if not backend.listFields(feature):
+            continue
+        for name, inlet, outlet in backend.readRows(feature, ["NAME", "INLETNODE", "OUTLETNODE"]):
+            links.append(name.strip())
+            inlets.append((inlet or "").strip())
+            outlets.append((outlet or "").strip())
+    network = Network(nodes, links, inlets, outlets, kinds)
+    return network, dict((field, np.array(column, "f8")) for field, column in zip(nodeFields, values))
+
+def fromInp(path):
+    # (Network, subcatchment area draining to each node) of a SWMM .inp file
+    from swmminp import InpFile, readLayers
+    nodes, kinds, links, inlets, outlets = [], [], [], [], []
+    for table in readLayers(path, NODE_FEATURES + LINK_FEATURES):
+        if table.name in NODE_FEATURES:
+            nodes += table.names
+            kinds += [table.name] * len(table)
+        else:
+            links += table.names
+            inlets += table.columns["INLETNODE"]
+            outlets += table.columns["OUTLETNODE"]
+    network = Network(nodes, links, inlets, outlets, kinds)
+    area = np.zeros(len(network))
+    with InpFile(path) as inp:
+        for tokens in inp.lines("SUBCATCHMENTS"):
+            if len(tokens) > 3 and tokens[2] in network.index:
+                try:
+                    area[network.index[tokens[2]]] += float(tokens[3])
+                except ValueError:
+                    pass
+    return network, area
@@ -0,0 +1,201 @@
+# swmmout.py
+# Description: Reads SWMM5 binary output (.out) files directly, so peak flows no longer have to be
+#   exported to CSV by hand. The results section is memory mapped: time series are zero-copy NumPy
+#   views into the file, and peaks are computed a bounded block of reporting periods at a time, so
+#   output files larger than RAM can be read.
+#       SwmmOutput(path)                  open a .out file; names, properties and variable codes
+#       series(kind, name, variable)      zero-copy time series of one element
+#       peaks(kind, variable, absolute)   peak of every element of a kind
+#       outputResults(paths)              ResultTables of the F1YR ... F500YR peaks of links and
+#                                         nodes from one .out per return period, as readResults()
+#                                         returns
+#       folderResults(folder)             the same for a folder of *_<n>yr.out runs
+#   Peaks are taken at the reporting steps saved in the .out file, so they can be slightly lower
+#   than the routing-step peaks in the SWMM summary report.
+#   writeOutput() writes small synthetic .out files for checking the reader.
+
+######################################################################################################
+
+import glob, os, re, struct
+import numpy as np
+from swmmresults import RESULT_COLUMNS, ResultTable
+
+MAGIC = 516114522
+VERSION = 51000
+
+# Element kinds in the order SWMM writes them
+SUBCATCH, NODE, LINK, SYSTEM = "subcatch", "node", "link", "system"
+
+# Reporting variables
+NODE_DEPTH, NODE_HEAD, NODE_VOLUME, NODE_LATERAL_INFLOW, NODE_TOTAL_INFLOW, NODE_FLOODING = range(6)
+LINK_FLOW, LINK_DEPTH, LINK_VELOCITY, LINK_VOLUME, LINK_CAPACITY = range(5)
+
+# Bytes of results read at a time when computing peaks
+CHUNK_BYTES = 64 * 2 ** 20
+
+# Return period of a run from its file name, e.g. Model_100yr.out or Model_100-YR.out
+RUN_PATTERN = re.compile(r"(\d+)\s*-?\s*yr", re.IGNORECASE)
+
+class SwmmOutput:
+    # A SWMM5 binary output file; results[i]["date"] and results[i]["values"] map reporting period i
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            magic, self.version, self.flowUnits, nSubcatch, nNodes, nLinks, nPollutants = struct.unpack("<7i", file.read(28))
+            file.seek(-24, os.SEEK_END)
+            idStart, propertyStart, resultsStart, self.periods, errorCode, closingMagic = struct.unpack("<6i", file.read(24))
+            if magic != MAGIC or closingMagic != MAGIC:
+                raise ValueError("{} is not a SWMM5 output file".format(path))
+            if errorCode != 0:
+                raise ValueError("{}: SWMM run ended with error {}".format(path, errorCode))
+            if self.periods == 0:
+                raise ValueError("{} has no reporting periods".format(path))
+
+            file.seek(idStart)
+            self.names = {}
+            for kind, count in ((SUBCATCH, nSubcatch), (NODE, nNodes), (LINK, nLinks), ("pollutant", nPollutants)):
+                self.names[kind] = [readName(file) for i in range(count)]
+            self.pollutantUnits = readInts(file, nPollutants)
+
+            file.seek(propertyStart)
+            self.properties = {}
+            for kind, count in ((SUBCATCH, nSubcatch), (NODE, nNodes), (LINK, nLinks)):
+                codes = readInts(file, readInts(file, 1)[0])
+                values = np.frombuffer(file.read(4 * count * len(codes)), "<f4").reshape(count, len(codes))
+                self.properties[kind] = (codes, values)
+
+            self.variables = {}
+            for kind in (SUBCATCH, NODE, LINK, SYSTEM):
+                self.variables[kind] = readInts(file, readInts(file, 1)[0])
+            self.startDate, self.reportStep = struct.unpack("<di", file.read(12))
+
+        # Column of the first value of each kind in a reporting period, and (count, variables)
+        self.blocks = {}
+        column = 0
+        for kind, count in ((SUBCATCH, nSubcatch), (NODE, nNodes), (LINK, nLinks), (SYSTEM, 1)):
+            self.blocks[kind] = (column, count, len(self.variables[kind]))
+            column += count * len(self.variables[kind])
+        self.periodType = np.dtype([("date", "<f8"), ("values", "<f4", (column,))])
+        self.results = np.memmap(path, self.periodType, "r", resultsStart, (self.periods,))
+        self.index = dict((kind, dict((name, i) for i, name in enumerate(names))) for kind, names in self.names.items())
+
+    def dates(self):
+        # Reporting dates (days since 12/30/1899), a zero-copy view
+        return self.results["date"]
+
+    def hours(self):
+        return (self.results["date"] - self.startDate) * 24.0
+
+    def blockView(self, kind, start=0, stop=None):
+        # Zero-copy (periods, count, variables) view of every value of a kind
+        column, count, variables = self.blocks[kind]
+        return self.results["values"][start:stop, column:column + count * variables].reshape(-1, count, variables)
+
+    def series(self, kind, name, variable):
+        # Zero-copy time series of one variable of one element (name or index)
+        index = self.index[kind][name] if isinstance(name, str) else name
+        return self.blockView(kind)[:, index, variable]
+
+    def peaks(self, kind, variable, absolute=False):
+        # Peak of variable for every element of kind, reading CHUNK_BYTES of results at a time
+        step = max(1, CHUNK_BYTES // self.periodType.itemsize)
+        peak = np.full(self.blocks[kind][1], -np.inf)
+        for start in range(0, self.periods, step):
+            values = self.blockView(kind, start, start + step)[:, :, variable]
+            np.maximum(peak, (np.abs(values) if absolute else values).max(axis=0), out=peak)
+        return peak
+
+    def close(self):
+        # Drops the memory map; it is unmapped once no view taken from it is left
+        self.results = None
+
+def readInts(file, count):
+    return list(struct.unpack("<{}i".format(count), file.read(4 * count)))
+
+def readName(file):
+    length = readInts(file, 1)[0]
+    return file.read(length).decode("utf-8", "replace")
+
+def runColumn(path):
+    # Result column (F1YR ... F500YR) of a run from its file name, or None
+    match = RUN_PATTERN.search(os.path.basename(path))
+    return "F{}YR".format(int(match.group(1))) if match else None
+
+def outputResults(paths, columns=RESULT_COLUMNS):
+    # paths maps result columns (F1YR ...) to .out files; returns (links, nodes) ResultTables of
+    # the given columns with peak |flow| for links and peak total inflow for nodes. Return periods
+    # without a run, and elements missing from a run, are NaN.
+    peaks = {LINK: [], NODE: []}
+    for position, column in enumerate(columns):
+        if column not in paths:
+            continue
+        output = SwmmOutput(paths[column])
+        try:
+            peaks[LINK].append((position, output.names[LINK], output.peaks(LINK, LINK_FLOW, absolute=True)))
+            peaks[NODE].append((position, output.names[NODE], output.peaks(NODE, NODE_TOTAL_INFLOW)))
+        finally:
+            output.close()
+    return resultTable(peaks[LINK], columns), resultTable(peaks[NODE], columns)
+
+def resultTable(runs, columns):
+    # ResultTable from [(column position, names, peaks)] of each run; the runs usually share names
+    names = []
+    index = {}
+    for position, runNames, peak in runs:
+        for name in runNames:
+            if name not in index:
+                index[name] = len(names)
+                names.append(name)
+    values = np.full((len(names), len(columns)), np.nan)
+    for position, runNames, peak in runs:
+        rows = np.arange(len(runNames)) if runNames == names else np.array([index[name] for name in runNames], "i8")
+        values[rows, position] = peak
+    return ResultTable(names, values, columns)
+
+def folderResults(folder, columns=RESULT_COLUMNS, warn=print):
+    # (links, nodes) from the *.out files of a folder, one per return period; skipped files are
+    # reported through warn
+    paths = {}
+    for path in sorted(glob.glob(os.path.join(folder, "*.out"))):
+        column = runColumn(path)
+        if column not in columns:
+            warn("Skipped {}: no return period in the file name".format(path))
+            continue
+        if column in paths:
+            raise ValueError("{} and {} are both {} runs".format(paths[column], path, column))
+        paths[column] = path
+    if not paths:
+        raise ValueError("No SWMM output files found in {}".format(folder))
+    return outputResults(paths, columns)
+
+def writeOutput(path, names, values, variables=None, startDate=44000.0, reportStep=300):
+    # Writes a SWMM5 binary output file. names maps SUBCATCH, NODE and LINK to element names and
+    # values maps SUBCATCH, NODE, LINK and SYSTEM to (periods, count, variables) float arrays;
+    # variables maps kinds to variable codes (default 0...n-1).
+    kinds = (SUBCATCH, NODE, LINK)
+    counts = [len(names.get(kind, [])) for kind in kinds]
+    periods = len(values[NODE])
+    blocks = [np.asarray(values.get(kind, np.zeros((periods, count, 0))), "<f4").reshape(periods, -1)
+              for kind, count in zip(kinds + (SYSTEM,), counts + [1])]
+    with open(path, "wb") as file:
+        file.write(struct.pack("<7i", MAGIC, VERSION, 0, counts[0], counts[1], counts[2], 0))
+        idStart = file.tell()
+        for kind in kinds:
+            for name in names.get(kind, []):
+                encoded = name.encode()
+                file.write(struct.pack("<i", len(encoded)) + encoded)
+        propertyStart = file.tell()
+        for count in counts:
+            file.write(struct.pack("<i", 0))
+        for kind, block, count in zip(kinds + (SYSTEM,), blocks, counts + [1]):
+            codes = (variables or {}).get(kind, list(range(block.shape[1] // count if count else 0)))
+            file.write(struct.pack("<{}i".format(len(codes) + 1), len(codes), *codes))
+        file.write(struct.pack("<di", startDate, reportStep))
+        resultsStart = file.tell()
+        for period in range(periods):
+            file.write(struct.pack("<d", startDate + (period + 1) * reportStep / 86400.0))
+            for block in blocks:
+                file.write(block[period].tobytes())
+        file.write(struct.pack("<6i", idStart, propertyStart, resultsStart, periods, 0, MAGIC))
+    return path
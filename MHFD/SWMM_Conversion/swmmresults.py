@@ -0,0 +1,154 @@
+# swmmresults.py
+# Description: Reads the link and node peak flow CSVs exported from SWMM into columnar ResultTables
+#   keyed by the Link or Node name. Columns are found by header name, and the blank trailing
+#   columns (H through L) SWMM adds to the export are dropped from the header, so they no longer
+#   need to be deleted by hand. The file is streamed CHUNK_ROWS rows at a time straight into one
+#   float64 array per chunk, so only the names and the result values are held in memory, not a
+#   Python row per line. Rows without an ID and IDs given more than once are reported.
+#   Nothing is written to the geodatabase; saveResults() copies a table to it when asked.
+
+######################################################################################################
+
+import csv, itertools
+import numpy as np
+
+# Return periods of the discharge fields (Q_Ex_001 ... Q_Fut_500) and the CSV column of each
+RETURN_PERIODS = ["001", "002", "005", "010", "025", "050", "100", "500"]
+RESULT_COLUMNS = ["F1YR", "F2YR", "F5YR", "F10YR", "F25YR", "F50YR", "F100YR", "F500YR"]
+
+# Rows parsed at a time
+CHUNK_ROWS = 65536
+
+class ResultTable:
+    # Columnar results: names in file order, values (rows, columns) float64 with NaN where blank,
+    # and index {name: row} (the last row of a repeated name, as a dictionary would keep). Reads
+    # like a {name: (F1YR, ..., F500YR)} dictionary, with None for blank values.
+
+    def __init__(self, names, values, columns):
+        self.names = names
+        self.values = values
+        self.columns = list(columns)
+        self.index = dict(zip(names, range(len(names))))
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __getitem__(self, name):
+        return self.row(self.index[name])
+
+    def row(self, i):
+        return tuple(None if value != value else value for value in self.values[i].tolist())
+
+    def get(self, name, default=None):
+        i = self.index.get(name)
+        return default if i is None else self.row(i)
+
+    def keys(self):
+        return self.index.keys()
+
+    def items(self):
+        return ((name, self.row(i)) for name, i in self.index.items())
+
+    def duplicates(self):
+        # Names given on more than one row
+        if len(self.index) == len(self.names):
+            return []
+        seen, repeated = set(), {}
+        for name in self.names:
+            if name in seen:
+                repeated[name] = True
+            seen.add(name)
+        return list(repeated)
+
+def columnIndex(header, name, path):
+    # Field names are matched without case, as JoinField did
+    names = [column.strip().upper() for column in header]
+    if name.upper() not in names:
+        raise ValueError("{} has no {} column".format(path, name))
+    return names.index(name.upper())
+
+def toFloat(value):
+    value = value.strip()
+    return float(value) if value else None
+
+def parseColumn(column, path, lines):
+    # float64 array of one column of a chunk, NaN where blank
+    try:
+        return np.array([value or "nan" for value in column], "f8")
+    except ValueError:
+        values = np.empty(len(column))
+        for i, value in enumerate(column):
+            try:
+                values[i] = np.nan if toFloat(value) is None else toFloat(value)
+            except ValueError:
+                raise ValueError("{} line {}: {!r} is not a number".format(path, lines[i], value))
+        return values
+
+def chunkColumns(lines, width):
+    # Text columns of a chunk of lines. Lines that all have width fields and no quotes are split
+    # with one str.split of the whole chunk; otherwise the csv module parses them and short rows
+    # are padded with blanks.
+    text = "".join(lines)
+    if '"' not in text:
+        flat = ",".join(text.splitlines()).split(",")
+        if len(flat) == len(lines) * width:
+            return [flat[i::width] for i in range(width)]
+    columns = list(itertools.zip_longest(*csv.reader(lines), fillvalue=""))
+    return columns + [("",) * len(lines)] * (width - len(columns))
+
+def readResults(path, keyField, columns=RESULT_COLUMNS, warn=print):
+    # ResultTable of the given columns of a results CSV, keyed by keyField; problems with the IDs
+    # are passed to warn. Each chunk of lines is split into text columns first (chunkColumns), so
+    # the work per value is done by str.split, list comprehensions and NumPy, not a loop over rows.
+    names, blocks, missing = [], [], []
+    with open(path, newline="") as file:
+        header = next(csv.reader([file.readline()]), None)
+        if header is None:
+            raise ValueError("{} is empty".format(path))
+        width = len(header)
+        # Empty trailing columns of the export
+        while header and not header[-1].strip():
+            header.pop()
+        key = columnIndex(header, keyField, path)
+        indexes = [columnIndex(header, column, path) for column in columns]
+        line = 2
+        while True:
+            chunk = list(itertools.islice(file, CHUNK_ROWS))
+            if not chunk:
+                break
+            lines = np.arange(line, line + len(chunk))
+            line += len(chunk)
+            textColumns = chunkColumns(chunk, width)
+            keys = [value.strip() for value in textColumns[key]]
+            keep = np.array([bool(name) for name in keys])
+            values = np.column_stack([parseColumn(textColumns[i], path, lines) for i in indexes]) if indexes else np.zeros((len(chunk), 0))
+            if not keep.all():
+                missing += [int(row) for row, text in zip(lines[~keep], itertools.compress(chunk, ~keep)) if text.strip(", \t\r\n")]
+                keys = list(itertools.compress(keys, keep))
+                values = values[keep]
+            names += keys
+            blocks.append(values)
+    values = np.concatenate(blocks) if blocks else np.zeros((0, len(columns)))
+    table = ResultTable(names, values, columns)
+    if missing:
+        warn("{}: {} rows have no {} (lines {}), skipped".format(path, len(missing), keyField, sample(missing)))
+    repeated = table.duplicates()
+    if repeated:
+        warn("{}: {} {} IDs appear more than once ({}); the last row of each is used".format(path, len(repeated), keyField, sample(repeated)))
+    return table
+
+def sample(values, count=5):
+    text = ", ".join(str(value) for value in values[:count])
+    return text + ", ..." if len(values) > count else text
+
+def saveResults(backend, name, table, keyField):
+    # Copies a ResultTable to a table of the workspace, e.g. to check the join by hand
+    from mhfdschema import doubleField, textField
+    backend.createTable(name, [textField(keyField, 255)] + [doubleField(column) for column in table.columns])
+    return backend.insertRows(name, [keyField] + table.columns, ([element] + list(table.row(i)) for i, element in enumerate(table.names)))
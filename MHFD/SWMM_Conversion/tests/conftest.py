@@ -0,0 +1,6 @@
+# conftest.py
+# The tests import the tool modules by bare name, as the tools import each other
+
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
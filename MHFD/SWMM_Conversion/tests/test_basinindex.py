@@ -0,0 +1,82 @@
+# test_basinindex.py
+# BasinIndex against a search of every basin with a plain crossing number test, on synthetic
+# tilings with points on shared edges and vertices, and links located by their midpoint.
+
+import numpy as np
+import wkb
+from basinindex import BasinIndex, check, representativePoints, syntheticBasins
+
+def square(x, y, size=1.0):
+    return wkb.polygon([np.array([(x, y), (x + size, y), (x + size, y + size), (x, y + size), (x, y)])])
+
+def squares(columns, rows):
+    # Unit squares tiling a columns x rows lattice, with IDs from 1
+    polygons = [square(column, row) for row in range(rows) for column in range(columns)]
+    return polygons, list(range(1, len(polygons) + 1))
+
+def inside(rings, x, y):
+    # Crossing number (even-odd) test, one edge at a time: a point on an edge belongs to the
+    # polygon on its right or above it
+    crossings = 0
+    for ring in rings:
+        for (x0, y0), (x1, y1) in zip(ring[:-1], ring[1:]):
+            if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+                crossings += 1
+    return crossings % 2 == 1
+
+def search(polygons, ids, points):
+    # Basin ID of each point from every basin in turn, None outside all of them
+    from basinindex import geometryCoordinates
+    rings = [[ring.tolist() for ring in geometryCoordinates(polygon)] for polygon in polygons]
+    found = []
+    for x, y in points:
+        found.append(next((basin for basin, parts in zip(ids, rings) if inside(parts, x, y)), None))
+    return found
+
+def test_shared_edges_and_vertices():
+    polygons, ids = squares(4, 3)
+    index = BasinIndex(polygons, ids)
+    # Every lattice vertex and the middle of every edge, inner and outer
+    points = [(x / 2.0, y / 2.0) for x in range(9) for y in range(7)]
+    assigned = index.assign(np.array(points))
+    assert assigned == search(polygons, ids, points)
+    # Points on inner edges and vertices fall in exactly one basin; none is lost between two
+    for (x, y), basin in zip(points, assigned):
+        if 0 < x < 4 and 0 < y < 3:
+            assert basin == int(y) * 4 + int(x) + 1
+
+def test_jittered_tiling():
+    polygons, ids = syntheticBasins(6, 5)
+    index = BasinIndex(polygons, ids)
+    random = np.random.default_rng(2)
+    points = random.uniform(-500.0, 6500.0, (3000, 2))
+    # Lattice vertices of the tiling: shared by up to four basins
+    from basinindex import geometryCoordinates
+    vertices = np.unique(np.vstack([geometryCoordinates(polygon)[0] for polygon in polygons]), axis=0)
+    points = np.vstack([points, vertices])
+    assert index.assign(points) == search(polygons, ids, points.tolist())
+
+def test_check_agrees_with_full_search():
+    indexSeconds, locateSeconds, assigned, mismatches = check(5000, 100)
+    assert assigned > 0 and mismatches == 0
+
+def test_links_by_midpoint():
+    # A U-shaped basin: its notch x 1-2, y 1-3 is outside every basin
+    u = wkb.polygon([np.array([(0, 0), (3, 0), (3, 3), (2, 3), (2, 1), (1, 1), (1, 3), (0, 3), (0, 0)], "f8")])
+    index = BasinIndex([u, square(10, 10)], [7, 8])
+    links = [wkb.lineString(np.array([(0.5, 2.0), (2.5, 2.0)], "f8")),     # ends in the basin, midpoint in the notch
+             wkb.lineString(np.array([(0.5, 0.5), (2.5, 0.5)], "f8")),     # across the bottom of the U
+             wkb.lineString(np.array([(5.0, 5.0), (6.0, 5.0)], "f8")),     # outside every basin
+             wkb.lineString(np.array([(10.2, 10.5), (10.2, 12.0), (10.4, 12.0)], "f8"))]
+    points = representativePoints(links)
+    assert np.allclose(points[:3], [(1.5, 2.0), (1.5, 0.5), (5.5, 5.0)])
+    # Half of the 1.7 long last link is 0.85 along its first segment, beyond the square
+    assert np.allclose(points[3], (10.2, 11.35))
+    assert index.assign(points) == [None, 7, None, None]
+
+def test_hole_and_blank_geometry():
+    ring = np.array([(0, 0), (4, 0), (4, 4), (0, 4), (0, 0)], "f8")
+    hole = np.array([(1, 1), (3, 1), (3, 3), (1, 3), (1, 1)], "f8")
+    index = BasinIndex([wkb.polygon([ring, hole])], [5])
+    points = representativePoints([wkb.point(2, 2), wkb.point(0.5, 2), None])
+    assert index.assign(points) == [None, 5, None]
@@ -0,0 +1,77 @@
+# test_comparescenarios.py
+# compare() and summarize() on hand-made discharges, and CompareScenarios end to end on a project
+# populated through the SQLite/GeoPackage stand-in.
+
+import numpy as np
+import pytest
+from CompareScenarios import SUMMARY_FIELDS, SUMMARY_TABLE, compare, compareScenarios, deltaFields, summarize
+from PopulateSWMMResults import populateResults
+from resultmapping import DEFAULT_MAPPING
+from swmmresults import RETURN_PERIODS
+from test_populate import flows, inputs, project
+
+NAN = np.nan
+
+def test_thresholds_both_directions():
+    existing = np.array([[100.0], [100.0], [100.0], [100.0], [100.0], [200.0]])
+    future = np.array([[115.0], [85.0], [105.0], [95.0], [110.0], [215.0]])
+    change, percent, flagged = compare(existing, future, 10.0, 10.0)
+    assert change[:, 0].tolist() == [15.0, -15.0, 5.0, -5.0, 10.0, 15.0]
+    assert percent[:, 0].tolist() == pytest.approx([15.0, -15.0, 5.0, -5.0, 10.0, 7.5])
+    # Rises and drops alike; both thresholds must be reached (10 cfs and 10 % on the threshold count)
+    assert flagged[:, 0].tolist() == [True, True, False, False, True, False]
+
+def test_existing_zero():
+    # Percent change is blank from 0 and the change threshold decides alone
+    existing = np.array([[0.0], [0.0], [0.0]])
+    future = np.array([[12.0], [-12.0], [3.0]])
+    change, percent, flagged = compare(existing, future, 10.0, 10.0)
+    assert np.isnan(percent).all()
+    assert flagged[:, 0].tolist() == [True, True, False]
+
+def test_blank_excluded():
+    existing = np.array([[100.0, NAN], [NAN, 50.0], [10.0, 10.0]])
+    future = np.array([[NAN, 200.0], [300.0, 80.0], [40.0, 10.0]])
+    change, percent, flagged = compare(existing, future, 10.0, 10.0)
+    assert flagged.tolist() == [[False, False], [False, True], [True, False]]
+    rows = summarize("Junctions", ["010", "100"], change, percent, flagged, existing, future)
+    fields = [field.name for field in SUMMARY_FIELDS]
+    first, second = [dict(zip(fields, row)) for row in rows]
+    # Only the element with both discharges is compared (and summed) for each period
+    assert (first["PERIOD"], first["COMPARED"], first["FLAGGED"], first["SUM_EX"], first["SUM_FUT"]) == ("010", 1, 1, 10.0, 40.0)
+    assert (first["MEAN_DELTA"], first["MAX_DELTA"], first["MIN_DELTA"], first["MAX_PCT"]) == (30.0, 30.0, 30.0, 300.0)
+    assert (second["COMPARED"], second["FLAGGED"], second["SUM_EX"], second["SUM_FUT"]) == (2, 1, 60.0, 90.0)
+    assert (second["MEAN_DELTA"], second["MAX_DELTA"], second["MIN_DELTA"], second["MAX_PCT"]) == (15.0, 30.0, 0.0, 60.0)
+
+def test_nothing_compared():
+    existing = future = np.full((2, 1), NAN)
+    change, percent, flagged = compare(existing, future, 10.0, 10.0)
+    row = summarize("Outfalls", ["100"], change, percent, flagged, existing, future)[0]
+    assert row[2:] == [0, 0, 0.0, 0.0, None, None, None, None]
+
+def test_compare_scenarios(tmp_path):
+    backend = project(tmp_path)
+    populateResults(backend, inputs(tmp_path), DEFAULT_MAPPING, workers=1, full=True)
+    messages = []
+    backend.message = messages.append
+    compareScenarios(backend, 10.0, 10.0)
+    # A second run replaces the tables it wrote
+    compareScenarios(backend, 10.0, 10.0)
+
+    summary = dict(((row[0], row[1]), list(row[2:])) for row in backend.readRows(SUMMARY_TABLE, [field.name for field in SUMMARY_FIELDS]))
+    assert sorted(set(feature for feature, period in summary)) == ["Conduits", "Junctions"]
+    assert len(summary) == 2 * len(RETURN_PERIODS)
+    # C2 has no future discharge: one conduit compared; every element rises by 100 cfs
+    assert summary[("Conduits", "100")][:2] == [1, 1]
+    assert summary[("Junctions", "100")][:2] == [2, 2]
+    assert "Outlets: not in the project GDB, skipped" in messages
+
+    fields = [field.name for field in deltaFields(RETURN_PERIODS)]
+    nodes = dict((row[0], dict(zip(fields, row))) for row in backend.readRows("NodeDeltas", fields))
+    links = dict((row[0], dict(zip(fields, row))) for row in backend.readRows("LinkDeltas", fields))
+    assert sorted(nodes) == ["J1", "J2"] and sorted(links) == ["C1", "C2"]
+    j2 = nodes["J2"]
+    assert j2["FEATURE"] == "Junctions" and j2["FLAGGED"] == len(RETURN_PERIODS)
+    assert j2["D_001"] == 100.0 and j2["P_001"] == pytest.approx(100.0 / flows(40)[0] * 100.0)
+    c2 = links["C2"]
+    assert c2["D_100"] is None and c2["P_100"] is None and c2["FLAGGED"] == 0
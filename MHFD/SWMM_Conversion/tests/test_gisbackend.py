@@ -0,0 +1,50 @@
+# test_gisbackend.py
+# The fields ArcpyBackend asks arcpy for, recorded by a stand-in module: the MHFD schema in order,
+# with the precision and scale of the DOUBLE fields.
+
+from gisbackend import ArcpyBackend
+from mhfdschema import MHFD_FIELDS
+
+class RecordingArcpy:
+    # Records the geoprocessing calls and their arguments
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *arguments, **keywords: self.calls.append((name,) + arguments)
+
+def backend():
+    backend = ArcpyBackend.__new__(ArcpyBackend)
+    backend.arcpy, backend.workspace = RecordingArcpy(), "Project.gdb"
+    return backend
+
+def addedFields(calls):
+    # [(name, type, precision, scale, length)] in the order the fields are added
+    fields = []
+    for call in calls:
+        if call[0] == "AddFields_management":
+            fields += [(name, type, "", "", length) for name, type, alias, length in call[2]]
+        elif call[0] == "AddField_management":
+            fields.append(call[2:])
+    return fields
+
+def test_add_fields_precision():
+    arcpy = backend()
+    arcpy.addFields("Junctions", MHFD_FIELDS)
+    fields = addedFields(arcpy.arcpy.calls)
+    assert [field[0] for field in fields] == [field.name for field in MHFD_FIELDS]
+    for (name, type, precision, scale, length), field in zip(fields, MHFD_FIELDS):
+        assert type == field.type
+        if field.type == "DOUBLE":
+            assert (precision, scale) == (10, 2)
+        else:
+            assert (precision, scale, length) == ("", "", field.length)
+    # The text fields between the discharge fields are still added in batches
+    assert [call[0] for call in arcpy.arcpy.calls].count("AddFields_management") == 3
+
+def test_create_feature_class_fields():
+    arcpy = backend()
+    arcpy.createFeatureClass("Conduits", "POLYLINE", 102654, MHFD_FIELDS)
+    assert ("CreateFeatureclass_management", "Project.gdb", "Conduits", "POLYLINE") in arcpy.arcpy.calls
+    assert [field[0] for field in addedFields(arcpy.arcpy.calls)] == [field.name for field in MHFD_FIELDS]
@@ -0,0 +1,126 @@
+# test_populate.py
+# PopulateSWMMResults against the SQLite/GeoPackage stand-in: a small project is built with
+# SWMMtoGDB.importLayer and populated from CSVs in the SWIMM export layout, in full and incrementally.
+
+import wkb
+from gisbackend import GEOMETRY_WKB, createBackend
+from mhfdschema import textField
+from PopulateSWMMResults import populateFeature, populateResults
+from resultmapping import DEFAULT_MAPPING
+from SWMMtoGDB import importLayer
+from swmmresults import RESULT_COLUMNS, readResults
+from tracing import RUN_VARIABLE, Tracer, TracedBackend
+
+CONSTANTS = {"SOURCE": "Test", "STUDY_YR": "2021", "MODEL": "Test.inp", "SWMM_VER": "5.1", "CUHP_VER": "2.0"}
+
+def writeCsv(path, keyField, rows):
+    # Peak flow CSV with the five blank trailing columns of the SWIMM export
+    with open(path, "w", newline="") as file:
+        file.write(",".join([keyField] + RESULT_COLUMNS) + ",,,,,\r\n")
+        for name, values in rows:
+            file.write(",".join([name] + [str(value) for value in values]) + ",,,,,\r\n")
+    return str(path)
+
+def flows(base):
+    return [base + i for i in range(len(RESULT_COLUMNS))]
+
+def project(folder):
+    backend = createBackend(str(folder), "Project", ".gpkg")
+    names = [textField("NAME", 50)]
+    importLayer(backend, "Junctions", "POINT", names, [(wkb.point(0, 0), "J1"), (wkb.point(1, 0), "J2")], CONSTANTS, GEOMETRY_WKB)
+    importLayer(backend, "Conduits", "POLYLINE", names, [(wkb.lineString([(0, 0), (1, 0)]), "C1"),
+                                                         (wkb.lineString([(1, 0), (2, 0)]), "C2")], CONSTANTS, GEOMETRY_WKB)
+    return backend
+
+def inputs(folder):
+    return {"Existing": (writeCsv(folder / "LinksEx.csv", "Link", [("C1", flows(10)), ("C2", flows(20))]),
+                         writeCsv(folder / "NodesEx.csv", "Node", [("J1", flows(30)), ("J2", flows(40))])),
+            "Future": (writeCsv(folder / "LinksFut.csv", "Link", [("C1", flows(110))]),
+                       writeCsv(folder / "NodesFut.csv", "Node", [("J1", flows(130)), ("J2", flows(140))]))}
+
+def discharges(backend, feature, prefix):
+    fields = ["NAME"] + [prefix + period for period in ("001", "002", "005", "010", "025", "050", "100", "500")]
+    return dict((row[0], list(row[1:])) for row in backend.readRows(feature, fields))
+
+def test_blank_trailing_columns(tmp_path):
+    path = writeCsv(tmp_path / "Links.csv", "Link", [("C1", flows(10)), ("C2", flows(20))])
+    table = readResults(path, "Link", warn=lambda text: None)
+    assert table.columns == RESULT_COLUMNS
+    assert list(table.keys()) == ["C1", "C2"]
+    assert list(table["C2"]) == flows(20)
+
+def test_populate_results(tmp_path, monkeypatch):
+    monkeypatch.setenv(RUN_VARIABLE, "test")
+    backend = TracedBackend(project(tmp_path), Tracer(str(tmp_path / "trace.json")))
+    populateResults(backend, inputs(tmp_path), DEFAULT_MAPPING, workers=1, full=True)
+
+    assert discharges(backend, "Conduits", "Q_Ex_") == {"C1": flows(10), "C2": flows(20)}
+    assert discharges(backend, "Junctions", "Q_Ex_") == {"J1": flows(30), "J2": flows(40)}
+    assert discharges(backend, "Junctions", "Q_Fut_") == {"J1": flows(130), "J2": flows(140)}
+    # C2 has no row in the future links CSV
+    assert discharges(backend, "Conduits", "Q_Fut_") == {"C1": flows(110), "C2": [None] * len(RESULT_COLUMNS)}
+
+    # One update pass per feature class, and none over the feature classes not in the project
+    updates = [event["table"] for event in backend.tracer.events() if event["op"] == "updateRows"]
+    assert sorted(updates) == ["Conduits", "Junctions"]
+
+def test_populate_feature_changed_rows(tmp_path):
+    backend = project(tmp_path)
+    fields = ["Q_Ex_001", "Q_Fut_001"]
+    results = [{"J1": (1.0,), "J2": (2.0,)}, {"J1": (3.0,), "J2": (4.0,)}]
+    assert populateFeature(backend, "Junctions", fields, results) == 2
+    # Rows already holding the results are left alone
+    assert populateFeature(backend, "Junctions", fields, results) == 0
+    results[1]["J2"] = (5.0,)
+    assert populateFeature(backend, "Junctions", fields, results, {"J2"}) == 1
+    rows = dict((row[0], row[1:]) for row in backend.readRows("Junctions", ["NAME"] + fields))
+    assert rows == {"J1": (1.0, 3.0), "J2": (2.0, 5.0)}
+    assert populateFeature(backend, "Outfalls", fields, results) is None
+
+def traced(backend, path, run):
+    return TracedBackend(backend, Tracer(str(path), run))
+
+def updates(backend):
+    # {feature: rows changed} of the update passes of a traced run
+    return dict((event["table"], event["rows"]) for event in backend.tracer.events() if event["op"] == "updateRows")
+
+def test_populate_changed_row_only(tmp_path):
+    backend = project(tmp_path)
+    csvs = inputs(tmp_path)
+    first = traced(backend, tmp_path / "trace.json", "first")
+    populateResults(first, csvs, DEFAULT_MAPPING, workers=1)
+    assert updates(first) == {"Conduits": 2, "Junctions": 2}
+
+    # One node of the existing run changes: only that feature is written
+    writeCsv(tmp_path / "NodesEx.csv", "Node", [("J1", flows(30)), ("J2", flows(45))])
+    messages = []
+    second = traced(backend, tmp_path / "trace.json", "second")
+    second.message = messages.append
+    populateResults(second, csvs, DEFAULT_MAPPING, workers=1)
+    assert updates(second) == {"Junctions": 1}
+    assert "Future: results unchanged since the last run, skipped" in messages
+    assert discharges(backend, "Junctions", "Q_Ex_") == {"J1": flows(30), "J2": flows(45)}
+    assert discharges(backend, "Conduits", "Q_Ex_") == {"C1": flows(10), "C2": flows(20)}
+
+    # Nothing changed: nothing read or written
+    third = traced(backend, tmp_path / "trace.json", "third")
+    populateResults(third, csvs, DEFAULT_MAPPING, workers=1)
+    assert updates(third) == {}
+
+def test_populate_feature_class_added_later(tmp_path):
+    backend = createBackend(str(tmp_path), "Project", ".gpkg")
+    names = [textField("NAME", 50)]
+    importLayer(backend, "Junctions", "POINT", names, [(wkb.point(0, 0), "J1"), (wkb.point(1, 0), "J2")], CONSTANTS, GEOMETRY_WKB)
+    csvs = inputs(tmp_path)
+    populateResults(backend, csvs, DEFAULT_MAPPING, workers=1, full=False)
+    assert discharges(backend, "Junctions", "Q_Ex_") == {"J1": flows(30), "J2": flows(40)}
+
+    # Conduits is imported afterwards; the same CSVs populate it without --full
+    importLayer(backend, "Conduits", "POLYLINE", names, [(wkb.lineString([(0, 0), (1, 0)]), "C1"),
+                                                         (wkb.lineString([(1, 0), (2, 0)]), "C2")], CONSTANTS, GEOMETRY_WKB)
+    later = traced(backend, tmp_path / "trace.json", "later")
+    populateResults(later, csvs, DEFAULT_MAPPING, workers=1)
+    assert discharges(backend, "Conduits", "Q_Ex_") == {"C1": flows(10), "C2": flows(20)}
+    assert discharges(backend, "Conduits", "Q_Fut_") == {"C1": flows(110), "C2": [None] * len(RESULT_COLUMNS)}
+    # Junctions already holds its results
+    assert updates(later) == {"Conduits": 2, "Junctions": 0}
@@ -0,0 +1,58 @@
+# test_projection.py
+# The projections against their control points, and coordinates of towns in UTM zone 13N and
+# Colorado North transformed into Colorado Central against an independent implementation (PROJ).
+
+import numpy as np
+import pytest
+from projection import COLORADO_CENTRAL, Geographic, fromPrj, transform, transformer, validate
+
+def test_control_points():
+    for name, error, unit, roundTrip, ok in validate():
+        assert ok, (name, error, unit, roundTrip)
+
+def test_colorado_central_under_a_tenth_of_a_foot():
+    results = [(name, error) for name, error, unit, roundTrip, ok in validate() if unit == "ftUS"]
+    assert len(results) >= 4
+    assert all(error < 0.1 for name, error in results), results
+
+# The same towns in NAD 83 UTM zone 13N (metres), Colorado North (0501) and Colorado Central (0502,
+# both US survey feet), from NAD 83 geographic coordinates by PROJ 9.5 (EPSG:26913, 2231, 2232)
+UTM_13N = ('PROJCS["NAD_1983_UTM_Zone_13N",GEOGCS["GCS_North_American_1983",DATUM["D_North_American_1983",'
+           'SPHEROID["GRS_1980",6378137.0,298.257222101]],PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]],'
+           'PROJECTION["Transverse_Mercator"],PARAMETER["False_Easting",500000.0],PARAMETER["False_Northing",0.0],'
+           'PARAMETER["Central_Meridian",-105.0],PARAMETER["Scale_Factor",0.9996],PARAMETER["Latitude_Of_Origin",0.0],'
+           'UNIT["Meter",1.0]]')
+COLORADO_NORTH = ('PROJCS["NAD_1983_StatePlane_Colorado_North_FIPS_0501_Feet",GEOGCS["GCS_North_American_1983",'
+                  'DATUM["D_North_American_1983",SPHEROID["GRS_1980",6378137.0,298.257222101]],PRIMEM["Greenwich",0.0],'
+                  'UNIT["Degree",0.0174532925199433]],PROJECTION["Lambert_Conformal_Conic"],PARAMETER["False_Easting",3000000.0],'
+                  'PARAMETER["False_Northing",1000000.0],PARAMETER["Central_Meridian",-105.5],'
+                  'PARAMETER["Standard_Parallel_1",40.7833333333333],PARAMETER["Standard_Parallel_2",39.7166666666667],'
+                  'PARAMETER["Latitude_Of_Origin",39.3333333333333],UNIT["US survey foot",0.304800609601219]]')
+# town: (UTM 13N, Colorado North, Colorado Central)
+TOWNS = {
+    "Denver": ((500000.000, 4400343.220), (3140583.380, 1153268.331), (3140584.296, 1699547.148)),
+    "Golden": ((481059.822, 4400644.055), (3078414.832, 1153905.972), (3078415.397, 1700191.319)),
+    "Castle Rock": ((512395.010, 4358091.214), (3182049.888, 1014819.086), (3182026.963, 1561099.831)),
+    "Boulder": ((476915.239, 4429457.113), (3064281.036, 1248394.125), (3064287.334, 1794685.402)),
+}
+
+@pytest.mark.parametrize("prj, column", [(UTM_13N, 0), (COLORADO_NORTH, 1)])
+def test_into_colorado_central(prj, column):
+    source = np.array([coordinates[column] for coordinates in TOWNS.values()])
+    expected = np.array([coordinates[2] for coordinates in TOWNS.values()])
+    result = transformer(prj)(source)
+    assert np.abs(result - expected).max() < 0.1
+    # And back
+    assert np.abs(transform(result, COLORADO_CENTRAL, fromPrj(prj)) - source).max() < 0.03
+
+def test_central_meridian_easting():
+    # Every point of the central meridian has the false easting
+    x, y = COLORADO_CENTRAL.forward(np.full(3, -105.5), np.array([37.0, 39.75, 41.0]))
+    assert np.allclose(x, 3000000.0, atol=0.01)
+    assert np.all(np.diff(y) > 0)
+
+def test_round_trip_through_geographic():
+    random = np.random.default_rng(0)
+    grid = np.column_stack([random.uniform(2.9e6, 3.3e6, 1000), random.uniform(1.5e6, 1.9e6, 1000)])
+    geographic = transform(grid, COLORADO_CENTRAL, Geographic())
+    assert np.abs(transform(geographic, Geographic(), COLORADO_CENTRAL) - grid).max() < 1e-4
@@ -0,0 +1,115 @@
+# test_swmmnetwork.py
+# swmmnetwork.Network on small hand-built networks and random ones checked against a search from
+# every node, and CheckSWMMNetwork against the SQLite/GeoPackage stand-in.
+
+import numpy as np
+import wkb
+from CheckSWMMNetwork import checkNetwork
+from gisbackend import GEOMETRY_WKB, createBackend
+from mhfdschema import textField
+from swmmnetwork import Network, fromLayers
+from SWMMtoGDB import importLayer
+
+def network(links, kinds=None):
+    # Network of [(link, inlet, outlet)], nodes in order of first appearance
+    nodes = []
+    for link, inlet, outlet in links:
+        nodes += [name for name in (inlet, outlet) if name not in nodes]
+    return Network(nodes, [link for link, inlet, outlet in links], [inlet for link, inlet, outlet in links],
+                   [outlet for link, inlet, outlet in links], [kinds.get(name, "Junctions") for name in nodes] if kinds else None)
+
+def names(net, indexes):
+    return [net.nodes[i] for i in indexes]
+
+def test_order_and_cycles():
+    net = network([("1", "A", "B"), ("2", "B", "C"), ("3", "C", "D"), ("4", "X", "Y"), ("5", "Y", "Z"), ("6", "Z", "Y")])
+    levels, cyclic = net.order()
+    position = dict((net.nodes[i], depth) for depth, level in enumerate(levels) for i in level)
+    assert position["A"] < position["B"] < position["C"] < position["D"]
+    assert sorted(names(net, cyclic)) == ["Y", "Z"]
+    assert "X" in position and "Y" not in position
+
+def test_dangling_links():
+    net = Network(["A", "B"], ["1", "2"], ["A", "B"], ["B", "Missing"])
+    assert net.dangling == ["2"] and net.links == ["1"]
+
+def test_upstream_downstream():
+    net = network([("1", "A", "C"), ("2", "B", "C"), ("3", "C", "D"), ("4", "D", "O"), ("5", "E", "O")])
+    assert sorted(net.upstream("D")) == ["A", "B", "C"]
+    assert sorted(net.upstream("O")) == ["A", "B", "C", "D", "E"]
+    assert sorted(net.downstream("B")) == ["C", "D", "O"]
+    assert net.upstream("A") == [] and net.downstream("O") == []
+
+def test_parallel_links():
+    # A pipe P and a street overflow S from A to B are one path
+    net = network([("P", "A", "B"), ("S", "A", "B"), ("L", "B", "O")])
+    assert net.accumulate([10.0, 0.0, 0.0]).tolist() == [10.0, 10.0, 10.0]
+    # Two links from one node are one branch: B is no confluence, the outfall is a design point
+    assert names(net, net.designPoints([10.0, 0.0, 0.0])) == ["O"]
+
+def test_divider_diamond():
+    # The branches of divider D join again at O: A and D are counted once at O
+    net = network([("1", "A", "D"), ("2", "D", "X"), ("3", "D", "Y"), ("4", "X", "O"), ("5", "Y", "O"), ("6", "O", "F")], {"D": "Dividers"})
+    area = dict(A=1.0, D=2.0, X=4.0, Y=8.0, O=16.0, F=32.0)
+    total = dict(zip(net.nodes, net.accumulate([area[name] for name in net.nodes]).tolist()))
+    assert total == dict(A=1.0, D=3.0, X=7.0, Y=11.0, O=31.0, F=63.0)
+    assert names(net, net.designPoints([area[name] for name in net.nodes])) == ["O", "F"]
+
+def test_accumulate_against_search():
+    # Random networks with splits, rejoins and parallel links; more split nodes than a 64 bit word
+    random = np.random.default_rng(1)
+    for count, extra in ((40, 10), (400, 150)):
+        inlets = np.arange(count - 1)
+        outlets = np.minimum(count - 1, inlets + 1 + random.integers(0, 6, count - 1))
+        splits = random.integers(0, count - 1, extra)
+        inlets = np.concatenate([inlets, splits, splits[:5]])
+        outlets = np.concatenate([outlets, np.minimum(count - 1, splits + 1 + random.integers(0, 9, extra)), outlets[splits[:5]]])
+        nodes = ["N{}".format(i) for i in range(count)]
+        net = Network(nodes, ["L{}".format(i) for i in range(len(inlets))], [nodes[i] for i in inlets], [nodes[i] for i in outlets])
+        values = random.uniform(0, 10, count)
+        total = net.accumulate(values)
+        for i, name in enumerate(nodes):
+            expected = values[i] + sum(values[net.index[up]] for up in net.upstream(name))
+            assert abs(total[i] - expected) < 1e-9
+
+def test_decreasing_flows():
+    net = network([("1", "A", "B"), ("2", "B", "S"), ("3", "S", "C"), ("4", "C", "D"), ("5", "D", "E"), ("6", "E", "F")],
+                  {"S": "Storages", "D": "Dividers"})
+    q = dict(A=10.0, B=9.0, S=20.0, C=5.0, D=6.0, E=1.0, F=np.nan)
+    flagged = [net.links[i] for i in net.decreasingFlows([q[name] for name in net.nodes])]
+    # A -> B drops; drops below the storage and the divider are expected; blank F is not flagged
+    assert flagged == ["1"]
+    # Within the tolerance
+    assert len(net.decreasingFlows([10.0, 9.95, 20.0, 20.0, 20.0, 20.0, 20.0])) == 0
+
+def project(folder):
+    backend = createBackend(str(folder), "Project", ".gpkg")
+    constants = {"SOURCE": "Test"}
+    fields = [textField("NAME", 50)]
+    linkFields = fields + [textField("INLETNODE", 50), textField("OUTLETNODE", 50)]
+    importLayer(backend, "Junctions", "POINT", fields, [(wkb.point(i, 0), name) for i, name in enumerate("ABC")], constants, GEOMETRY_WKB)
+    importLayer(backend, "Dividers", "POINT", fields, [(wkb.point(3, 0), "D")], constants, GEOMETRY_WKB)
+    importLayer(backend, "Outfalls", "POINT", fields, [(wkb.point(4, 0), "O")], constants, GEOMETRY_WKB)
+    links = [("P", "A", "C"), ("S", "A", "C"), ("L", "B", "C"), ("M", "C", "D"), ("N", "D", "O"), ("X", "D", "Missing")]
+    importLayer(backend, "Conduits", "POLYLINE", linkFields, [(wkb.lineString([(0, 0), (1, 0)]),) + link for link in links],
+                constants, GEOMETRY_WKB)
+    backend.updateRows("Junctions", ["NAME", "Q_Ex_100"], lambda row: (row[0], dict(A=50.0, B=30.0, C=70.0)[row[0]]))
+    backend.updateRows("Outfalls", ["NAME", "Q_Ex_100"], lambda row: (row[0], 60.0))
+    return backend
+
+def test_check_network(tmp_path):
+    backend = project(tmp_path)
+    net, values = fromLayers(backend, ["Q_Ex_100"])
+    assert net.dangling == ["X"] and len(net.links) == 5
+    messages = []
+    backend.message = messages.append
+    checkNetwork(backend, fill=True)
+    text = "\n".join(messages)
+    assert "1 links to nodes that are not in the project GDB: X" in text
+    # Below the divider the drop is expected; C -> D has no discharge at D
+    assert "Q_Ex_100" not in text
+    # C is a confluence of A and B (the parallel links P and S are one branch), O the outfall
+    assert "2 suggested design points: C, O" in text
+    labels = dict(backend.readRows("Junctions", ["NAME", "DESIGNPT"]))
+    labels.update(backend.readRows("Outfalls", ["NAME", "DESIGNPT"]))
+    assert labels["C"] == "DP1" and labels["O"] == "DP2" and labels["A"] is None
@@ -0,0 +1,61 @@
+# test_swmmout.py
+# Round trip of writeOutput and SwmmOutput: names, series, peaks (also across the blocks peaks()
+# reads at a time) and the results of a folder of return period runs.
+
+import numpy as np
+import pytest
+import swmmout
+from swmmout import LINK, LINK_FLOW, NODE, NODE_TOTAL_INFLOW, SYSTEM, SwmmOutput, folderResults, writeOutput
+
+NODES = ["J1", "J2", "O1"]
+LINKS = ["C1", "C2"]
+PERIODS = 40
+
+def results(seed=0):
+    random = np.random.default_rng(seed)
+    return {NODE: random.uniform(0, 10, (PERIODS, len(NODES), 6)).astype("f4"),
+            LINK: random.uniform(-10, 10, (PERIODS, len(LINKS), 5)).astype("f4"),
+            SYSTEM: np.zeros((PERIODS, 1, 0))}
+
+def write(path, values):
+    return writeOutput(str(path), {NODE: NODES, LINK: LINKS}, values)
+
+def test_series(tmp_path):
+    values = results()
+    output = SwmmOutput(write(tmp_path / "Model_10yr.out", values))
+    assert output.names[NODE] == NODES and output.names[LINK] == LINKS
+    assert output.periods == PERIODS
+    assert np.array_equal(output.series(NODE, "J2", NODE_TOTAL_INFLOW), values[NODE][:, 1, NODE_TOTAL_INFLOW])
+    assert np.array_equal(output.series(LINK, 0, LINK_FLOW), values[LINK][:, 0, LINK_FLOW])
+    assert np.allclose(output.hours(), np.arange(1, PERIODS + 1) * 300 / 3600.0)
+    output.close()
+
+def test_peaks_across_blocks(tmp_path, monkeypatch):
+    values = results()
+    # The peak of J1 is in the last period of the first block, the peak |flow| of C2 in the
+    # first period of the second
+    values[NODE][6, 0, NODE_TOTAL_INFLOW] = 50.0
+    values[LINK][7, 1, LINK_FLOW] = -60.0
+    path = write(tmp_path / "Model_10yr.out", values)
+    output = SwmmOutput(path)
+    monkeypatch.setattr(swmmout, "CHUNK_BYTES", 7 * output.periodType.itemsize)
+    assert np.allclose(output.peaks(NODE, NODE_TOTAL_INFLOW), values[NODE][:, :, NODE_TOTAL_INFLOW].max(axis=0))
+    links = output.peaks(LINK, LINK_FLOW, absolute=True)
+    assert np.allclose(links, np.abs(values[LINK][:, :, LINK_FLOW]).max(axis=0))
+    assert links[1] == pytest.approx(60.0)
+    assert output.peaks(NODE, NODE_TOTAL_INFLOW)[0] == pytest.approx(50.0)
+    output.close()
+
+def test_folder_results(tmp_path):
+    runs = {"F10YR": results(1), "F100YR": results(2)}
+    write(tmp_path / "Model_10yr.out", runs["F10YR"])
+    write(tmp_path / "Model_100-YR.out", runs["F100YR"])
+    write(tmp_path / "Model_base.out", results(3))
+    messages = []
+    links, nodes = folderResults(str(tmp_path), warn=messages.append)
+    assert len(messages) == 1 and "Model_base.out" in messages[0]
+    assert nodes.columns[3] == "F10YR" and nodes.columns[6] == "F100YR"
+    assert nodes["O1"][3] == pytest.approx(runs["F10YR"][NODE][:, 2, NODE_TOTAL_INFLOW].max())
+    assert links["C1"][6] == pytest.approx(np.abs(runs["F100YR"][LINK][:, 0, LINK_FLOW]).max())
+    # Return periods without a run are blank
+    assert nodes["J1"][0] is None
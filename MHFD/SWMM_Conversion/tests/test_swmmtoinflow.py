@@ -0,0 +1,91 @@
+# test_swmmtoinflow.py
+# SWMMtoINFLOW on .out files written by swmmout.writeOutput: nodes summed into one grid element,
+# unmapped nodes, the lookup header row, small blocks and record batches, and failed writes.
+
+import numpy as np
+import pytest
+import SWMMtoINFLOW
+from swmmout import NODE, NODE_LATERAL_INFLOW, NODE_TOTAL_INFLOW, SYSTEM, writeOutput
+from SWMMtoINFLOW import readGridLookup, swmmToInflow, writeInflow
+
+NODES = ["J1", "J2", "J3", "O1", "Unmapped"]
+PERIODS = 30
+
+def results(seed=0):
+    random = np.random.default_rng(seed)
+    return {NODE: np.round(random.uniform(0, 50, (PERIODS, len(NODES), 6)), 2).astype("f4"), SYSTEM: np.zeros((PERIODS, 1, 0))}
+
+def writeLookup(path, rows, header=True):
+    with open(str(path), "w", newline="") as file:
+        if header:
+            file.write("SWMM Node,FLO-2D Grid\r\n")
+        for node, grid in rows:
+            file.write("{},{}\r\n".format(node, grid))
+    return str(path)
+
+def readInflow(path):
+    # {grid element: [(hours, flow)]} of an INFLOW .dat
+    hydrographs, grid = {}, None
+    with open(path) as file:
+        for line in file:
+            fields = line.split("\t")
+            if fields[0] == "F":
+                grid = int(fields[2])
+                hydrographs[grid] = []
+            else:
+                hydrographs[grid].append((float(fields[1]), float(fields[2])))
+    return hydrographs
+
+def expected(values, nodes, variable=NODE_TOTAL_INFLOW):
+    flow = sum(values[NODE][:, NODES.index(node), variable].astype("f8") for node in nodes)
+    return [0.0] + np.round(flow, 2).tolist()
+
+@pytest.mark.parametrize("chunkBytes, recordRows", [(SWMMtoINFLOW.CHUNK_BYTES, SWMMtoINFLOW.RECORD_ROWS), (1, 4), (100, 7)])
+def test_write_inflow(tmp_path, monkeypatch, chunkBytes, recordRows):
+    monkeypatch.setattr(SWMMtoINFLOW, "CHUNK_BYTES", chunkBytes)
+    monkeypatch.setattr(SWMMtoINFLOW, "RECORD_ROWS", recordRows)
+    values = results()
+    runs = tmp_path / "Runs"
+    runs.mkdir()
+    writeOutput(str(runs / "Model_100yr.out"), {NODE: NODES}, values)
+    # J1 and J2 share grid element 2001; Missing is not in the run; Unmapped is not in the lookup
+    lookup = writeLookup(tmp_path / "Lookup.csv", [("J1", 2001), ("J2", "2001.0"), ("J3", 1500), ("O1", 3002), ("Missing", 9)])
+    savefiles = swmmToInflow(str(runs), lookup, str(tmp_path), "US")
+    assert savefiles == [str(tmp_path / "INFLOW_US_100yr.dat")]
+    assert not (tmp_path / "INFLOW_US_100yr.dat.tmp").exists()
+
+    hydrographs = readInflow(savefiles[0])
+    # Grid elements in order, each from 0.00 0.00 at the start of the run
+    assert list(hydrographs) == [1500, 2001, 3002]
+    hours = [0.0] + np.round(np.arange(1, PERIODS + 1) * 300 / 3600.0, 2).tolist()
+    for grid, nodes in ((1500, ["J3"]), (2001, ["J1", "J2"]), (3002, ["O1"])):
+        assert [time for time, flow in hydrographs[grid]] == hours
+        assert [flow for time, flow in hydrographs[grid]] == pytest.approx(expected(values, nodes), abs=0.006)
+
+def test_lateral_inflow(tmp_path):
+    values = results(1)
+    path = writeOutput(str(tmp_path / "Model_10yr.out"), {NODE: NODES}, values)
+    savefile = str(tmp_path / "INFLOW_DS_10yr.dat")
+    assert writeInflow(path, {"J1": 7, "O1": 7}, savefile, NODE_LATERAL_INFLOW) == 1
+    assert [flow for time, flow in readInflow(savefile)[7]] == pytest.approx(expected(values, ["J1", "O1"], NODE_LATERAL_INFLOW), abs=0.006)
+
+def test_grid_lookup(tmp_path):
+    # The header row is skipped, blank rows too; a grid element that is not a number further down is an error
+    assert readGridLookup(writeLookup(tmp_path / "a.csv", [("J1", 1), ("", ""), ("J2", 2)])) == {"J1": 1, "J2": 2}
+    assert readGridLookup(writeLookup(tmp_path / "b.csv", [("J1", 1)], header=False)) == {"J1": 1}
+    with pytest.raises(ValueError, match="row 3"):
+        readGridLookup(writeLookup(tmp_path / "c.csv", [("J1", 1), ("J2", "x")]))
+    with pytest.raises(ValueError, match="mapped to grid elements 1 and 2"):
+        readGridLookup(writeLookup(tmp_path / "d.csv", [("J1", 1), ("J1", 2)]))
+
+def test_failed_write_leaves_no_temporary(tmp_path, monkeypatch):
+    path = writeOutput(str(tmp_path / "Model_5yr.out"), {NODE: NODES}, results())
+    savefile = str(tmp_path / "INFLOW_US_5yr.dat")
+
+    def fail(*arguments):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(SWMMtoINFLOW, "writeRecords", fail)
+    with pytest.raises(OSError):
+        writeInflow(path, {"J1": 1}, savefile)
+    assert not (tmp_path / "INFLOW_US_5yr.dat.tmp").exists() and not (tmp_path / "INFLOW_US_5yr.dat").exists()
@@ -0,0 +1,49 @@
+# test_tracing.py
+# Run IDs of traced tools run one after another in one process (as ArcGIS Pro runs script tools),
+# worker processes recording under the run of their tool, and failed steps.
+
+import os
+import pytest
+from gisbackend import openBackend
+from PopulateSWMMResults import populateResults
+from resultmapping import DEFAULT_MAPPING
+from test_populate import inputs, project
+from tracing import RUN_VARIABLE, TRACE_VARIABLE, readEvents, step
+
+@pytest.fixture
+def trace(tmp_path, monkeypatch):
+    path = str(tmp_path / "trace.json")
+    monkeypatch.setenv(TRACE_VARIABLE, path)
+    monkeypatch.delenv(RUN_VARIABLE, raising=False)
+    return path
+
+def test_runs_apart(tmp_path, trace):
+    workspace = project(tmp_path).workspace
+    first = openBackend(workspace)
+    list(first.readRows("Junctions", ["NAME"]))
+    list(first.readRows("Conduits", ["NAME"]))
+    second = openBackend(workspace)
+    list(second.readRows("Junctions", ["NAME"]))
+    assert first.tracer.run != second.tracer.run
+    assert RUN_VARIABLE not in os.environ
+    assert len(first.tracer.events()) == 2 and len(second.tracer.events()) == 1
+    # A worker opened with the run of its tool records under that run
+    worker = openBackend(workspace, second.tracer.run)
+    list(worker.readRows("Conduits", ["NAME"]))
+    assert len(second.tracer.events()) == 2
+
+def test_workers_record_under_the_run(tmp_path, trace):
+    project(tmp_path)
+    backend = openBackend(str(tmp_path / "Project.gpkg"))
+    populateResults(backend, inputs(tmp_path), DEFAULT_MAPPING, workers=2, full=True)
+    events = backend.tracer.events()
+    assert sorted(event["table"] for event in events if event["op"] == "updateRows") == ["Conduits", "Junctions"]
+    assert len(set(event["pid"] for event in events)) > 1
+    assert set(event["run"] for event in readEvents(trace, None) if event["op"] == "updateRows") == {backend.tracer.run}
+
+def test_failed_step(tmp_path, trace):
+    backend = openBackend(project(tmp_path).workspace)
+    with pytest.raises(ValueError):
+        with step(backend, "readResults", "Existing"):
+            raise ValueError("bad CSV")
+    assert [(event["op"], event["table"]) for event in backend.tracer.events()] == [("readResults", "Existing")]
@@ -0,0 +1,190 @@
+# tracing.py
+# Description: Timing of every geodatabase call of the SWMM conversion tools. With the MHFD_TRACE
+#   environment variable set to a file path, openBackend() and createBackend() wrap the backend in
+#   a TracedBackend that records, for each call, the operation, the table, the rows read or
+#   written, the wall time and the rows per second. Events are appended to the file as JSON lines,
+#   also by the worker processes of a parallel import, which are handed the run ID of their tool
+#   (runId(backend)). Every top-level backend starts a run of its own, so tools run one after another
+#   in one process (ArcGIS Pro runs script tools in-process) are reported apart; a caller timing
+#   several tools as one run sets MHFD_TRACE_RUN (see benchmark.py).
+#       report(backend)                 end-of-run hot-spot summary: the slowest operation/table
+#                                       pairs of the run, as tool messages
+#       step(backend, op, table)        context manager timing a step that is not a backend call
+#                                       (e.g. reading the CSVs); set rows on what it yields
+#       Progress(backend, total)        "n of total" messages with elapsed time and an estimate of
+#                                       the time left, with rows per second when traced
+#   Without MHFD_TRACE the backend is returned as it is, so tracing costs nothing; step() and
+#   Progress then only time the tool steps themselves. Rows of readRows and readSource are counted
+#   as they are consumed, so their time includes the work the caller does between rows.
+#   python tracing.py trace.json prints the summary of the last run in a trace file.
+
+######################################################################################################
+
+import itertools, json, os, sys, time
+from contextlib import contextmanager
+
+TRACE_VARIABLE = "MHFD_TRACE"
+RUN_VARIABLE = "MHFD_TRACE_RUN"
+
+# Backend methods that are traced: name -> position of the table argument
+TRACED_METHODS = {"listFields": 0, "readRows": 0, "updateRows": 0, "createFeatureClass": 0, "addFields": 0,
+                  "createTable": 0, "insertRows": 0, "sourceLayers": 0, "describeSource": 0, "readSource": 0,
+                  "sourceProjection": 0, "defineProjection": 0}
+
+# Methods returning rows as they are read, and methods returning the number of rows written
+READERS = ("readRows", "readSource")
+WRITERS = ("updateRows", "insertRows")
+
+# Operation/table pairs listed by report()
+HOT_SPOTS = 10
+
+RUN_COUNTER = itertools.count(1)
+
+def newRunId():
+    # Unique for a run: time in milliseconds, process and a counter of the runs of the process
+    return "{}-{}-{}".format(int(time.time() * 1000), os.getpid(), next(RUN_COUNTER))
+
+class Tracer:
+    # Appends one JSON line per event to path, tagged with the run and process
+
+    def __init__(self, path, run=None):
+        self.path = path
+        self.run = run or os.environ.get(RUN_VARIABLE) or newRunId()
+        self.start = time.perf_counter()
+        self.rows = 0
+
+    def record(self, op, table, rows, seconds):
+        event = {"run": self.run, "pid": os.getpid(), "op": op, "table": table, "rows": rows,
+                 "seconds": round(seconds, 6), "rowsPerSecond": round(rows / seconds, 1) if rows and seconds > 0 else None}
+        self.rows += rows or 0
+        with open(self.path, "a") as file:
+            file.write(json.dumps(event) + "\n")
+
+    def events(self):
+        # Events of this run from every process
+        return readEvents(self.path, self.run)
+
+class TracedBackend:
+    # Backend wrapper recording every traced call; other attributes pass through
+
+    def __init__(self, backend, tracer):
+        self.backend = backend
+        self.tracer = tracer
+
+    def __getattr__(self, name):
+        attribute = getattr(self.backend, name)
+        if name not in TRACED_METHODS:
+            return attribute
+
+        def traced(*arguments, **keywords):
+            position = TRACED_METHODS[name]
+            table = arguments[position] if len(arguments) > position else None
+            table = os.path.basename(table) if isinstance(table, str) else table
+            start = time.perf_counter()
+            result = attribute(*arguments, **keywords)
+            if name in READERS:
+                return self.countRows(name, table, result, start)
+            rows = result if name in WRITERS and isinstance(result, int) else None
+            self.tracer.record(name, table, rows, time.perf_counter() - start)
+            return result
+
+        return traced
+
+    def countRows(self, name, table, rows, start):
+        count = 0
+        try:
+            for row in rows:
+                count += 1
+                yield row
+        finally:
+            self.tracer.record(name, table, count, time.perf_counter() - start)
+
+def traced(backend, run=None):
+    # backend wrapped in a TracedBackend when MHFD_TRACE is set, otherwise backend itself; run is the
+    # run ID of the tool a worker process works for (None: a new run)
+    path = os.environ.get(TRACE_VARIABLE)
+    return TracedBackend(backend, Tracer(path, run)) if path else backend
+
+def runId(backend):
+    # Run ID to hand to the worker processes of a tool, None without tracing
+    tracer = getattr(backend, "tracer", None)
+    return tracer.run if tracer is not None else None
+
+@contextmanager
+def step(backend, op, table=None):
+    # Records a tool step as an event of a traced backend; the dictionary yielded takes "rows"
+    tracer = getattr(backend, "tracer", None)
+    info = {"rows": None}
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        # Failed steps are recorded too
+        if tracer is not None:
+            tracer.record(op, table, info["rows"], time.perf_counter() - start)
+
+class Progress:
+    # Progress messages over total units of work (e.g. feature classes)
+
+    def __init__(self, backend, total):
+        self.backend = backend
+        self.total = total
+        self.done = 0
+        self.start = time.perf_counter()
+        tracer = getattr(backend, "tracer", None)
+        self.startRows = tracer.rows if tracer is not None else 0
+
+    def step(self, label, units=1):
+        self.done += units
+        elapsed = time.perf_counter() - self.start
+        left = elapsed / self.done * (self.total - self.done) if self.done else 0.0
+        text = "{}: {} of {} done, {:.1f} s elapsed, about {:.1f} s left".format(label, self.done, self.total, elapsed, left)
+        tracer = getattr(self.backend, "tracer", None)
+        # Rows of worker processes are not counted here, only in the trace file
+        if tracer is not None and tracer.rows > self.startRows and elapsed > 0:
+            text += " ({:,.0f} rows/s)".format((tracer.rows - self.startRows) / elapsed)
+        self.backend.message(text)
+
+def readEvents(path, run=None):
+    # Events of a trace file, of one run (default the last one)
+    events = []
+    if not os.path.exists(path):
+        return events
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                events.append(json.loads(line))
+    run = run or (events[-1]["run"] if events else None)
+    return [event for event in events if event["run"] == run]
+
+def hotSpots(events, limit=HOT_SPOTS):
+    # [(op, table, calls, rows, seconds)] of the slowest operation/table pairs
+    totals = {}
+    for event in events:
+        total = totals.setdefault((event["op"], event["table"]), [0, 0, 0.0])
+        total[0] += 1
+        total[1] += event["rows"] or 0
+        total[2] += event["seconds"]
+    ranked = sorted(totals.items(), key=lambda item: -item[1][2])[:limit]
+    return [(op, table, calls, rows, seconds) for (op, table), (calls, rows, seconds) in ranked]
+
+def summaryLines(events, limit=HOT_SPOTS):
+    lines = ["{:20} {:28} {:>6} {:>10} {:>9} {:>11}".format("Operation", "Table", "Calls", "Rows", "Seconds", "Rows/s")]
+    for op, table, calls, rows, seconds in hotSpots(events, limit):
+        rate = "{:,.0f}".format(rows / seconds) if rows and seconds > 0 else ""
+        lines.append("{:20} {:28} {:>6} {:>10} {:>9.2f} {:>11}".format(op, str(table)[:28], calls, rows, seconds, rate))
+    return lines
+
+def report(backend):
+    # Hot-spot summary of the run as tool messages; nothing without tracing
+    tracer = getattr(backend, "tracer", None)
+    if tracer is None:
+        return
+    events = tracer.events()
+    backend.message("\nTrace: {} calls in {:.1f} s, written to {}".format(len(events), time.perf_counter() - tracer.start, tracer.path))
+    for line in summaryLines(events):
+        backend.message(line)
+
+if __name__ == "__main__":
+    for line in summaryLines(readEvents(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else HOT_SPOTS):
+        print(line)
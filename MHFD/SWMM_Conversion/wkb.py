@@ -0,0 +1,80 @@
+# wkb.py
+# Description: Well-known binary (little endian, 2D) encoding of the geometries written by the SWMM
+#   conversion tools. Coordinates are (n, 2) float64 NumPy arrays, so a whole line or ring is
+#   written with one tobytes() call. transformRuns() rewrites the coordinates of a binary geometry
+#   buffer (WKB or shapefile records) through one vectorized call, e.g. a projection.transform.
+
+######################################################################################################
+
+import struct
+import numpy as np
+
+POINT, LINESTRING, POLYGON, MULTIPOINT, MULTILINESTRING, MULTIPOLYGON = 1, 2, 3, 4, 5, 6
+
+def point(x, y):
+    return struct.pack("<BIdd", 1, POINT, x, y)
+
+def lineString(coords):
+    coords = np.ascontiguousarray(coords, "<f8")
+    return struct.pack("<BII", 1, LINESTRING, len(coords)) + coords.tobytes()
+
+def polygon(rings):
+    # rings: exterior first; each ring is closed if its last point is not its first
+    parts = [struct.pack("<BII", 1, POLYGON, len(rings))]
+    for ring in rings:
+        ring = np.ascontiguousarray(ring, "<f8")
+        if len(ring) and not np.array_equal(ring[0], ring[-1]):
+            ring = np.vstack([ring, ring[:1]])
+        parts.append(struct.pack("<I", len(ring)) + ring.tobytes())
+    return b"".join(parts)
+
+def multiLineString(lines):
+    return struct.pack("<BII", 1, MULTILINESTRING, len(lines)) + b"".join(lineString(line) for line in lines)
+
+def coordinateRuns(blob, position=0, runs=None):
+    # [(byte offset, points)] of the XY runs of a little endian 2D WKB geometry; returns (runs, end)
+    runs = [] if runs is None else runs
+    if blob[position] != 1:
+        raise ValueError("Only little endian WKB is supported")
+    geometryType = struct.unpack_from("<I", blob, position + 1)[0]
+    position += 5
+    if geometryType == POINT:
+        runs.append((position, 1))
+        return runs, position + 16
+    if geometryType == LINESTRING:
+        count = struct.unpack_from("<I", blob, position)[0]
+        runs.append((position + 4, count))
+        return runs, position + 4 + 16 * count
+    if geometryType == POLYGON:
+        rings = struct.unpack_from("<I", blob, position)[0]
+        position += 4
+        for ring in range(rings):
+            count = struct.unpack_from("<I", blob, position)[0]
+            runs.append((position + 4, count))
+            position += 4 + 16 * count
+        return runs, position
+    if geometryType in (MULTIPOINT, MULTILINESTRING, MULTIPOLYGON):
+        parts = struct.unpack_from("<I", blob, position)[0]
+        position += 4
+        for part in range(parts):
+            runs, position = coordinateRuns(blob, position, runs)
+        return runs, position
+    raise ValueError("Unsupported WKB geometry type {}".format(geometryType))
+
+def transformRuns(buffer, runs, function):
+    # Copy of buffer with the XY pairs of runs [(byte offset, points)] replaced by
+    # function((n, 2) array), called once for all of them
+    if not runs:
+        return bytes(buffer)
+    coords = np.frombuffer(b"".join(buffer[offset:offset + 16 * count] for offset, count in runs), "<f8").reshape(-1, 2)
+    projected = np.ascontiguousarray(function(coords), "<f8").tobytes()
+    result = bytearray(buffer)
+    position = 0
+    for offset, count in runs:
+        result[offset:offset + 16 * count] = projected[position:position + 16 * count]
+        position += 16 * count
+    return bytes(result)
+
+def transform(blob, function):
+    # WKB geometry with its coordinates passed through function
+    return None if blob is None else transformRuns(blob, coordinateRuns(blob)[0], function)